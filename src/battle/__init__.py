@@ -1,2 +1,3 @@
 # battle module
 from .battle_system import BattleSystem, BattleContext, BattleCallbacks, BattleEvent, BattleStatusData
+from .event_bus import CombatEventBus, EventCursor
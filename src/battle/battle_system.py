@@ -6,6 +6,7 @@
 from abc import ABC, abstractmethod
 from dataclasses import dataclass, field
 from typing import List, Dict, Optional, Tuple
+from src.battle.event_bus import CombatEventBus
 from src.models.general import General
 from src.models.team import Team
 from src.skills.skill_base import TargetType
@@ -154,6 +155,9 @@ class BattleSystem:
         self.turn_count = 0
         self.max_turns = max_turns
         self.battle_context = BattleContext(team1, team2)
+        # 双方共用一条表现事件总线，事件序号即全局发生顺序。
+        self.event_bus = CombatEventBus()
+        team1.event_bus = team2.event_bus = self.event_bus
 
         # 根据队伍名确定当前操作方
         if first_player_team_name == team1.team_name:
@@ -0,0 +1,80 @@
+"""
+战斗表现事件总线
+每场 BattleSystem 一条：事件按发生顺序获得单调递增的序号，存入有界环形缓冲，
+订阅方各自持有游标按序号读取，读取代价只与新事件数有关。
+"""
+
+from typing import Dict, List, Optional, Tuple
+
+DEFAULT_CAPACITY = 1024
+
+
+class CombatEventBus:
+    """有界环形缓冲的事件总线；写满后最旧的事件被覆盖，落后的游标会记录丢失数。"""
+
+    __slots__ = ("capacity", "enabled", "_buffer", "_next_seq")
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY, enabled: bool = True):
+        if capacity <= 0:
+            raise ValueError("事件总线容量必须为正数")
+        self.capacity = capacity
+        # 关闭后 publish 直接丢弃事件，供不需要表现/协同统计的 rollout 使用。
+        self.enabled = enabled
+        # 缓冲按需增长到 capacity，短局不必预先占满。
+        self._buffer: List[Tuple[object, Dict]] = []
+        self._next_seq = 0
+
+    @property
+    def next_seq(self) -> int:
+        """下一条事件将获得的序号，也即已发布事件总数。"""
+        return self._next_seq
+
+    @property
+    def oldest_seq(self) -> int:
+        """缓冲中仍可读取的最早序号。"""
+        return max(0, self._next_seq - self.capacity)
+
+    def publish(self, event: Dict, source=None) -> None:
+        """发布一条事件，写入 ``seq`` 字段；``source`` 通常是产生事件的队伍。"""
+        if not self.enabled:
+            return
+        event["seq"] = self._next_seq
+        entry = (source, event)
+        if len(self._buffer) < self.capacity:
+            self._buffer.append(entry)
+        else:
+            self._buffer[self._next_seq % self.capacity] = entry
+        self._next_seq += 1
+
+    def subscribe(self, position: Optional[int] = None) -> "EventCursor":
+        """创建游标；默认只读订阅之后的新事件，``position=0`` 从缓冲最早处读起。"""
+        return EventCursor(self, self._next_seq if position is None else position)
+
+    def read_from(self, position: int) -> List[Tuple[object, Dict]]:
+        """返回序号不小于 ``position`` 且仍在缓冲中的 ``(source, event)``。"""
+        start = max(position, self.oldest_seq)
+        return [self._buffer[seq % self.capacity] for seq in range(start, self._next_seq)]
+
+
+class EventCursor:
+    """一条总线上的独立读取位置。"""
+
+    __slots__ = ("bus", "position", "dropped")
+
+    def __init__(self, bus: CombatEventBus, position: int = 0):
+        self.bus = bus
+        self.position = position
+        self.dropped = 0  # 因缓冲被覆盖而未能读到的事件数
+
+    def read(self) -> List[Tuple[object, Dict]]:
+        """读取自上次以来的新事件并前移游标。"""
+        bus = self.bus
+        if self.position < bus.oldest_seq:
+            self.dropped += bus.oldest_seq - self.position
+        entries = bus.read_from(self.position)
+        self.position = bus.next_seq
+        return entries
+
+    def skip(self) -> None:
+        """丢弃尚未读取的事件，游标跳到最新位置。"""
+        self.position = self.bus.next_seq
@@ -39,7 +39,9 @@ def odd_even_judgment(guess: str = None) -> dict:
 
 class BraveryPassive(PassiveSkill):
     """勇猛被动技能"""
-    
+
+    __slots__ = ("last_judgment",)
+
     def __init__(self):
         super().__init__(
             skill_id="bravery_passive",
@@ -47,6 +49,9 @@ class BraveryPassive(PassiveSkill):
             description="血量低于一半时，普攻可以猜奇偶判定。成功则本次伤害*1.5（四舍五入）",
             attribute_type="BRAVERY"
         )
+        self.reset_battle_state()
+
+    def reset_battle_state(self) -> None:
         self.last_judgment = None
     
     def trigger_on_attack(self, caster, target, original_damage, guess: str = None) -> int:
@@ -65,7 +70,9 @@ class BraveryPassive(PassiveSkill):
 
 class CharismaPassive(PassiveSkill):
     """魅力被动技能"""
-    
+
+    __slots__ = ("last_judgment",)
+
     def __init__(self):
         super().__init__(
             skill_id="charisma_passive",
@@ -73,6 +80,9 @@ class CharismaPassive(PassiveSkill):
             description="受到致命伤害时猜奇偶判定。成功则对攻击者造成所受伤害一半（四舍五入）",
             attribute_type="CHARISMA"
         )
+        self.reset_battle_state()
+
+    def reset_battle_state(self) -> None:
         self.last_judgment = None
     
     def trigger_on_death(self, caster, attacker, fatal_damage, guess: str = None) -> int:
@@ -89,7 +99,9 @@ class CharismaPassive(PassiveSkill):
 
 class RecruitPassive(PassiveSkill):
     """募兵被动技能"""
-    
+
+    __slots__ = ()
+
     def __init__(self):
         super().__init__(
             skill_id="recruit_passive",
@@ -111,6 +123,8 @@ class RecruitPassive(PassiveSkill):
 class FencePassive(PassiveSkill):
     """防栅被动技能（一次性，破碎后不再重建）"""
 
+    __slots__ = ("is_active",)
+
     def __init__(self):
         super().__init__(
             skill_id="fence_passive",
@@ -118,6 +132,9 @@ class FencePassive(PassiveSkill):
             description="抵挡一次普攻，破碎后不再重建",
             attribute_type="FENCE"
         )
+        self.reset_battle_state()
+
+    def reset_battle_state(self) -> None:
         self.is_active = True  # 防栅状态
 
     def trigger_on_receive_damage(self, caster, damage, damage_source: str = "basic_attack") -> int:
@@ -134,7 +151,9 @@ class FencePassive(PassiveSkill):
 
 class ChainPassive(PassiveSkill):
     """连计被动技能"""
-    
+
+    __slots__ = ()
+
     def __init__(self):
         super().__init__(
             skill_id="chain_passive",
@@ -170,7 +189,9 @@ class ChainPassive(PassiveSkill):
 
 class RevivePassive(PassiveSkill):
     """复活被动技能"""
-    
+
+    __slots__ = ("has_revived",)
+
     def __init__(self):
         super().__init__(
             skill_id="revive_passive",
@@ -178,6 +199,9 @@ class RevivePassive(PassiveSkill):
             description="可以复活一次，复活后拥有50%的生命",
             attribute_type="REVIVE"
         )
+        self.reset_battle_state()
+
+    def reset_battle_state(self) -> None:
         self.has_revived = False  # 复活状态标记
     
     def trigger_on_death(self, caster) -> bool:
@@ -203,6 +227,8 @@ class AmbushPassive(PassiveSkill):
     - 若所有队友阵亡时仍未触发，效果自动丧失
     """
 
+    __slots__ = ("is_hidden", "triggered")
+
     def __init__(self):
         super().__init__(
             skill_id="ambush_passive",
@@ -210,6 +236,9 @@ class AmbushPassive(PassiveSkill):
             description="不可被普攻选中；邻格友军被攻时反击伤害的一半，每局一次",
             attribute_type="AMBUSH"
         )
+        self.reset_battle_state()
+
+    def reset_battle_state(self) -> None:
         self.is_hidden = True  # 隐藏状态（不可被普攻选中）
         self.triggered = False  # 是否已触发反击（每局一次）
 
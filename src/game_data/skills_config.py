@@ -1305,8 +1305,7 @@ class JiangdongBeautySkill(Skill):
 
         for general in affected_generals:
             if general.debuffs:
-                cleared_count = len(general.debuffs)
-                general.debuffs.clear()
+                cleared_count = general.clear_debuffs()
                 effect = "清除debuff"
                 details.append({
                     "target": general.name,
@@ -1590,6 +1589,7 @@ class TaipingArtsSkill(Skill):
                 general.is_alive = False
                 general.current_hp = 0
                 continue
+            general.sync_chain_effects()
             details.append({
                 "target": general.name,
                 "effect": "复活",
@@ -2418,7 +2418,7 @@ class SteadfastSkill(Skill):
         self.duration = 1
 
     def execute(self, caster, targets, battle_context):
-        caster.debuffs.clear()
+        caster.clear_debuffs()
         caster.add_buff("force_boost", self.force_boost, self.duration)
         caster.add_buff("debuff_immunity", 1, self.duration)
         return {
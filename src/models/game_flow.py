@@ -31,6 +31,11 @@ class Player:
         self.team = Team(f"{name}的队伍")
         self.selected_generals: List[General] = []
 
+    def reset_battle_state(self):
+        """清空已选武将并重置队伍，供同一玩家对象开始下一局。"""
+        self.selected_generals.clear()
+        self.team.reset_battle_state()
+
     def add_general_to_team(self, general: General):
         """添加武将到队伍"""
         self.selected_generals.append(general)
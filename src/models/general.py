@@ -3,7 +3,8 @@
 定义武将的基本属性和行为
 """
 
-from typing import List, Dict, Optional, TYPE_CHECKING
+from dataclasses import dataclass, replace
+from typing import Any, List, Dict, Optional, TYPE_CHECKING
 from enum import Enum
 import random
 
@@ -36,6 +37,79 @@ def odd_even_judgment(guess: str = None) -> dict:
     }
 
 
+@dataclass(slots=True)
+class Effect:
+    """一条增益/减益记录。
+
+    比字典紧凑得多；同时保留按键读写（``effect["duration"] -= 1``、
+    ``effect.get("type")``）的旧接口，规则、观测和 Web DTO 无需区分两者。
+    ``delay_turns`` 仅延迟生效的效果使用，其余为 None 并视为不存在的键。
+    """
+    type: str
+    value: Any
+    duration: int
+    delay_turns: Optional[int] = None
+
+    def _has(self, key) -> bool:
+        return key in self.__slots__ and (key != "delay_turns" or self.delay_turns is not None)
+
+    def __getitem__(self, key):
+        if not self._has(key):
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key, value):
+        if key not in self.__slots__:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def __contains__(self, key) -> bool:
+        return self._has(key)
+
+    def get(self, key, default=None):
+        return getattr(self, key) if self._has(key) else default
+
+    def copy(self) -> "Effect":
+        return replace(self)
+
+
+class ChainEffectGroup:
+    """同队存活连计武将共用的一份增益/减益列表。
+
+    成员的 ``buffs``/``debuffs`` 直接引用本组列表，施加、消耗和到期都只发生
+    一次，代价与连计人数无关。持续时间每回合由 ``members[0]`` 结算一次。
+    成员关系由 ``Team.sync_chain_group`` 维护。
+    """
+
+    __slots__ = ("buffs", "debuffs", "members")
+
+    def __init__(self, founder: "General"):
+        self.buffs = founder.buffs
+        self.debuffs = founder.debuffs
+        self.members = [founder]
+
+    @staticmethod
+    def _merge(shared: List[Effect], effects: List[Effect]) -> None:
+        # 取每种相同效果在单个武将上的最大叠加数，而不是把各成员的副本相加。
+        seen = []
+        for effect in effects:
+            seen.append(effect)
+            occurrence = sum(1 for item in seen if item == effect)
+            if sum(1 for item in shared if item == effect) < occurrence:
+                shared.append(effect)
+
+    def join(self, general: "General") -> None:
+        self._merge(self.buffs, general.buffs)
+        self._merge(self.debuffs, general.debuffs)
+        general.buffs = self.buffs
+        general.debuffs = self.debuffs
+
+    def leave(self, general: "General") -> None:
+        """退出的成员保留当时效果的独立副本，此后不再随组变化。"""
+        general.buffs = [effect.copy() for effect in self.buffs]
+        general.debuffs = [effect.copy() for effect in self.debuffs]
+
+
 class Camp(Enum):
     """阵营枚举"""
     WEI = "魏"
@@ -76,7 +150,19 @@ class Attribute(Enum):
 
 class General:
     """武将类"""
-    
+
+    __slots__ = (
+        "general_id", "name", "camp", "rarity", "cost", "force", "intelligence",
+        "max_hp", "current_hp", "attribute", "active_skill", "passive_skills",
+        "image_file", "position", "is_alive", "buffs", "debuffs", "pending_buffs",
+        "pending_debuffs", "active_skill_cooldown", "active_skill_usage_counts",
+        "last_attack_speed_judgment", "_has_attacked_this_turn",
+        "_extra_attack_available", "_has_used_skill_this_turn", "_combat_events",
+        "_team",
+        # 选将界面临时编号；仅在武将池展示期间存在。
+        "pool_index",
+    )
+
     def __init__(self,
                  general_id: int,
                  name: str,
@@ -112,50 +198,79 @@ class General:
         self.cost = cost
         self.force = force
         self.intelligence = intelligence
-        # 最大生命值 = 武力 + 智力
-        self.max_hp = force + intelligence
-        self.current_hp = self.max_hp
         self.attribute = attribute or []
         self.active_skill = active_skill
         self.passive_skills = passive_skills or []
         self.image_file = image_file  # 武将卡图片文件名
-        
+
         # 战斗状态
+        self.buffs: List[Effect] = []  # 增益效果
+        self.debuffs: List[Effect] = []  # 减益效果
+        self.pending_buffs: List[Effect] = []  # 延迟生效的增益效果
+        self.pending_debuffs: List[Effect] = []  # 延迟生效的减益效果
+        self.active_skill_usage_counts = {}  # 主动技能使用次数（按武将实例记录）
+        self.reset_battle_state()
+
+    def reset_battle_state(self) -> None:
+        """把局内状态恢复为刚创建时的样子，供对象池在下一局复用同一实例。
+
+        静态属性（ID、数值、技能）保持不变；被动技能实例的局内状态一并重置，
+        所属队伍引用解除，由 Team.add_general 重新绑定。
+        """
+        # 最大生命值 = 武力 + 智力（部分技能会在局内提高上限）
+        self.max_hp = self.force + self.intelligence
+        self.current_hp = self.max_hp
         self.position: Optional[Position] = None
         self.is_alive = True
-        self.buffs: List[Dict] = []  # 增益效果
-        self.debuffs: List[Dict] = []  # 减益效果
-        self.pending_buffs: List[Dict] = []  # 延迟生效的增益效果
-        self.pending_debuffs: List[Dict] = []  # 延迟生效的减益效果
-        
+        # 连计成员的效果列表与组内其他武将共用，不能原地清空。
+        self.buffs = []
+        self.debuffs = []
+        self.pending_buffs.clear()
+        self.pending_debuffs.clear()
+
         # 技能冷却管理
         self.active_skill_cooldown = 0  # 主动技能当前冷却时间
-        self.active_skill_usage_counts = {}  # 主动技能使用次数（按武将实例记录）
+        self.active_skill_usage_counts.clear()
         self.last_attack_speed_judgment = None
         self._has_attacked_this_turn = False  # 本回合是否已普攻
         self._extra_attack_available = False  # 攻速判定成功后可用的一次追加普攻
         self._has_used_skill_this_turn = False  # 本回合是否已使用技能
-        # 仅用于表现层的短期事件队列。战斗规则仍由模型本身结算，Web 前端
-        # 消费这些事件来按真实顺序播放防栅、护盾、复活等反馈。
-        self._combat_events: List[Dict] = []
+        # 未接入战斗事件总线时的表现事件暂存，按需创建。
+        self._combat_events: Optional[List[Dict]] = None
+        for passive_skill in self.passive_skills:
+            passive_skill.reset_battle_state()
 
         # 所属队伍弱引用（由 Team.add_general 设置，用于连环等需要团队信息的被动技能）
         self._team = None
 
+    def _publish_combat_event(self, event: Dict) -> None:
+        # 战斗规则仍由模型本身结算；表现事件进入所属 BattleSystem 的事件总线，
+        # Web 前端与训练统计按序号顺序消费，播放防栅、护盾、复活等反馈。
+        bus = self._team.event_bus if self._team is not None else None
+        if bus is not None:
+            bus.publish(event, self._team)
+            return
+        if self._combat_events is None:
+            self._combat_events = []
+        self._combat_events.append(event)
+
     def record_combat_event(self, event_type: str, **payload) -> None:
         """记录一次可视化战斗事件，不参与任何数值结算。"""
+        bus = self._team.event_bus if self._team is not None else None
+        if bus is not None and not bus.enabled:
+            return
         event = {
             "type": event_type,
             "general_id": self.general_id,
             "target": self.name,
         }
         event.update(payload)
-        self._combat_events.append(event)
+        self._publish_combat_event(event)
 
     def drain_combat_events(self) -> List[Dict]:
-        """取出并清空尚未被表现层消费的战斗事件。"""
-        events = list(self._combat_events)
-        self._combat_events.clear()
+        """取出并清空未接入战斗事件总线期间记录的事件（战斗中请读总线游标）。"""
+        events = self._combat_events or []
+        self._combat_events = None
         return events
         
     def take_damage(self, damage: int, attacker: 'General' = None,
@@ -435,41 +550,33 @@ class General:
     
     def add_buff(self, buff_type: str, value: int, duration: int):
         """添加增益效果"""
-        self.buffs.append({
-            'type': buff_type,
-            'value': value,
-            'duration': duration
-        })
-        self.sync_chain_effects()
+        self.buffs.append(Effect(buff_type, value, duration))
+        self._link_chain_effects()
 
     def add_pending_buff(self, buff_type: str, value: int, duration: int, delay_turns: int):
         """添加一个延迟生效的增益效果。"""
-        self.pending_buffs.append({
-            'type': buff_type,
-            'value': value,
-            'duration': duration,
-            'delay_turns': max(1, delay_turns),
-        })
+        self.pending_buffs.append(Effect(buff_type, value, duration, max(1, delay_turns)))
 
     def add_pending_debuff(self, debuff_type: str, value: int, duration: int, delay_turns: int):
         """添加一个延迟生效的减益效果。"""
-        self.pending_debuffs.append({
-            'type': debuff_type,
-            'value': value,
-            'duration': duration,
-            'delay_turns': max(1, delay_turns),
-        })
+        self.pending_debuffs.append(Effect(debuff_type, value, duration, max(1, delay_turns)))
     
     def add_debuff(self, debuff_type: str, value: int, duration: int):
         """添加减益效果"""
         if self.has_buff_type("debuff_immunity"):
             return
-        self.debuffs.append({
-            'type': debuff_type,
-            'value': value,
-            'duration': duration
-        })
-        self.sync_chain_effects()
+        self.debuffs.append(Effect(debuff_type, value, duration))
+        self._link_chain_effects()
+
+    def clear_debuffs(self) -> int:
+        """清除全部减益并返回清除数量。
+
+        连计武将共用同一份减益列表，净化其中任一成员即净化整个连计组，
+        与共享的增益（如减益免疫）一致。
+        """
+        cleared = len(self.debuffs)
+        self.debuffs.clear()
+        return cleared
 
     def has_buff_type(self, buff_type: str) -> bool:
         """检查当前是否拥有指定类型的增益状态。"""
@@ -539,14 +646,17 @@ class General:
         self._extra_attack_available = False
         self._has_used_skill_this_turn = False
 
-        self.buffs = [buff for buff in self.buffs if buff['duration'] > 1]
-        self.debuffs = [debuff for debuff in self.debuffs if debuff['duration'] > 1]
+        # 连计共用的效果每回合只由组内第一名成员结算一次。
+        group = self._team.chain_group if self._team else None
+        if group is None or self.buffs is not group.buffs or group.members[0] is self:
+            self.buffs[:] = [buff for buff in self.buffs if buff['duration'] > 1]
+            self.debuffs[:] = [debuff for debuff in self.debuffs if debuff['duration'] > 1]
 
-        # 减少持续时间
-        for buff in self.buffs:
-            buff['duration'] -= 1
-        for debuff in self.debuffs:
-            debuff['duration'] -= 1
+            # 减少持续时间
+            for buff in self.buffs:
+                buff['duration'] -= 1
+            for debuff in self.debuffs:
+                debuff['duration'] -= 1
 
         self.activate_pending_buffs()
         self.activate_pending_debuffs()
@@ -608,7 +718,7 @@ class General:
                     "amount": heal_amount,
                     "hp": self.current_hp,
                 }
-                self._combat_events.append(event)
+                self._publish_combat_event(event)
                 events.append(event)
         return events
     
@@ -639,36 +749,16 @@ class General:
         return self.get_passive_skill("连计")
 
     def sync_chain_effects(self):
-        """同步己方连计武将的增益和减益效果。"""
-        if not self.has_chain_passive() or not self._team:
-            return
-        chain_generals = [
-            g for g in self._team.generals
-            if g.is_alive and g.has_chain_passive()
-        ]
-        if len(chain_generals) <= 1:
-            return
+        """让己方存活的连计武将共用同一份增益和减益列表。"""
+        if self.has_chain_passive() and self._team:
+            self._team.sync_chain_group()
+
+    def _link_chain_effects(self):
+        """施加效果后的快速路径：已在连计组内时无需任何同步。"""
+        group = self._team.chain_group if self._team else None
+        if group is None or self.buffs is not group.buffs:
+            self.sync_chain_effects()
 
-        # 取每种相同效果在单个武将上的最大叠加数，而不是把每个已同步副本
-        # 再次相加。否则每次 update_effects 都会令列表指数增长。
-        def merge_effects(attribute):
-            merged = []
-            for general in chain_generals:
-                seen_on_general = []
-                for effect in getattr(general, attribute):
-                    occurrence = sum(1 for item in seen_on_general if item == effect) + 1
-                    seen_on_general.append(effect)
-                    existing = sum(1 for item in merged if item == effect)
-                    if existing < occurrence:
-                        merged.append(effect.copy())
-            return merged
-
-        all_buffs = merge_effects("buffs")
-        all_debuffs = merge_effects("debuffs")
-        for g in chain_generals:
-            g.buffs = [b.copy() for b in all_buffs]
-            g.debuffs = [d.copy() for d in all_debuffs]
-    
     def can_be_targeted_by_enemy(self, team_generals=None) -> bool:
         """检查是否可以被敌方选中（考虑伏兵等效果）"""
         if not self.is_alive:
@@ -11,6 +11,8 @@ if TYPE_CHECKING:
 # 导入阵营枚举
 from enum import Enum
 
+from .general import ChainEffectGroup
+
 class Camp(Enum):
     """阵营枚举"""
     WEI = "魏"
@@ -21,7 +23,13 @@ class Camp(Enum):
 
 class Team:
     """队伍类"""
-    
+
+    __slots__ = (
+        "team_name", "camp", "generals", "max_morale", "current_morale", "morale_spent",
+        "formation", "formation_setup_complete", "temporary_formation_effects",
+        "pending_morale_rewards", "defeated_positions", "chain_group", "event_bus",
+    )
+
     def __init__(self, team_name: str = "", camp: Camp = None, max_morale: int = 12):
         """
         初始化队伍
@@ -34,17 +42,34 @@ class Team:
         self.team_name = team_name
         self.camp = camp
         self.generals: List[General] = []
-        self.max_morale = 12  # 初始士气上限为12，可以通过技能修改
-        self.current_morale = 12
-        self.morale_spent = 0
-        
         # 阵型系统 - 3行4列的方格 (行, 列)
         self.formation: List[List[Optional[General]]] = [[None for _ in range(4)] for _ in range(3)]
-        self.formation_setup_complete = False
         self.temporary_formation_effects = []
         self.pending_morale_rewards = []
         # 记录阵亡前的位置，供复活技能把武将重新放回战场。
         self.defeated_positions: Dict['General', Tuple[int, int]] = {}
+        self.reset_battle_state()
+
+    def reset_battle_state(self) -> None:
+        """清空武将、阵型与士气，回到刚创建时的状态（队伍名与阵营保留）。
+
+        原有武将的队伍引用会被解除，便于对象池把它们重新分配到任一队伍。
+        """
+        for general in self.generals:
+            general._team = None
+        self.generals.clear()
+        self.max_morale = 12  # 初始士气上限为12，可以通过技能修改
+        self.current_morale = 12
+        self.morale_spent = 0
+        for row in self.formation:
+            row[:] = [None] * 4
+        self.formation_setup_complete = False
+        self.temporary_formation_effects.clear()
+        self.pending_morale_rewards.clear()
+        self.defeated_positions.clear()
+        self.chain_group = None
+        # 由 BattleSystem 绑定；未开战时武将事件暂存在各自身上。
+        self.event_bus = None
 
     def position_general(self, general: 'General', row: int, col: int) -> bool:
         """
@@ -431,6 +456,7 @@ class Team:
         if general not in self.generals:
             self.generals.append(general)
             general._team = self  # 设置队伍引用（用于连环等被动技能）
+            general.sync_chain_effects()
             return True
         return False
 
@@ -450,9 +476,36 @@ class Team:
             # 同时从阵型中移除
             self.remove_general_from_formation(general)
             self.defeated_positions.pop(general, None)
+            if self.chain_group is not None:
+                self.sync_chain_group()
             return True
         return False
     
+    def sync_chain_group(self) -> None:
+        """按当前存活的连计武将重建共用效果组的成员关系。
+
+        新成员的效果按单人最大叠加数并入组内；阵亡或离队的成员带走一份独立
+        副本；不足两人时解散，剩下的武将继续持有原列表。
+        """
+        linked = [
+            general for general in self.generals
+            if general.is_alive and general.has_chain_passive()
+        ]
+        group = self.chain_group
+        if group is not None:
+            for general in group.members:
+                if general not in linked:
+                    group.leave(general)
+        if len(linked) <= 1:
+            self.chain_group = None
+            return
+        if group is None:
+            group = self.chain_group = ChainEffectGroup(linked[0])
+        for general in linked:
+            if general.buffs is not group.buffs:
+                group.join(general)
+        group.members = linked
+
     def get_alive_generals(self) -> List['General']:
         """
         获取存活的武将列表
@@ -650,6 +703,9 @@ class Team:
         """更新队伍中所有武将的回合开始被动、效果持续时间和技能冷却"""
         events = []
         self.resolve_pending_morale_rewards()
+        # 先让本回合阵亡的连计武将带着独立副本离组，共用效果只由存活成员结算一次。
+        if self.chain_group is not None:
+            self.sync_chain_group()
         for general in self.generals:
             if general.is_alive:
                 events.extend(general.trigger_turn_start_passives())
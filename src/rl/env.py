@@ -2,18 +2,22 @@
 from __future__ import annotations
 
 import random
-from itertools import combinations
 from typing import Optional
 
 from src.battle.battle_system import BattleSystem
 from src.battle.rules_service import BattleRulesService
-from src.game_data.generals_config import create_general_from_data
 from src.game_data.generals_data import GENERALS_DATA
 from src.models.game_flow import GameFlowController
 from src.rl import actions
+from src.rl.general_pool import GeneralPool
 from src.rl.observation import build_debug_dict, build_observation
 from src.rl.opponents import RandomOpponent
+from src.rl.phase_timer import PhaseTimer
+from src.rl.replay import BattleReplay
 from src.rl.reward import RewardHandler
+from src.rl.roster_sampler import RosterSampler
+
+GENERALS_BY_ID = {data["id"]: data for data in GENERALS_DATA}
 
 
 class SanguoEnv:
@@ -22,36 +26,41 @@ class SanguoEnv:
 
     def __init__(self, opponent=None, *, team_size=3, min_team_size=1,
                  max_team_size=8, team_size_power=0.0,
-                 roster_candidate_samples=256, roster_cost_bias=0.75,
-                 cost_limit=8.0, max_turns=200, reward_config=None):
+                 roster_cost_bias=0.75,
+                 cost_limit=8.0, max_turns=200, reward_config=None,
+                 record_combat_events=True, phase_timing=False):
         self.opponent = opponent or RandomOpponent()
         self.team_size = int(team_size)
         self.min_team_size = max(1, int(min_team_size))
         self.max_team_size = min(12, max(self.min_team_size, int(max_team_size)))
         self.team_size_power = float(team_size_power)
-        self.roster_candidate_samples = max(1, int(roster_candidate_samples))
         self.roster_cost_bias = min(1.0, max(0.0, float(roster_cost_bias)))
         self.cost_limit = cost_limit
         self.max_turns = max_turns
         self.reward_handler = RewardHandler(reward_config)
+        # 表现事件只服务于协同统计；关闭后战斗中不再构造任何事件。
+        self.record_combat_events = bool(record_combat_events)
         self.rng = random.Random()
         self.seed_value = None
         self.controller = None
+        # 武将、被动技能与双方玩家/队伍在各局之间复用，重置时只恢复局内状态。
+        self.general_pool = GeneralPool()
         self.battle_system = None
         self.rules = None
+        self.event_cursor = None
+        self.replay = None
         self.learning_team = None
         self.enemy_team = None
         self.subphase = "skill"
         self.done = False
+        # 分阶段计时默认关闭；开启后各阶段耗时由 rollout worker 定期取出。
+        self.phase_timer = PhaseTimer().instrument(self) if phase_timing else None
 
     def reset(self, seed: Optional[int] = None, rosters=None, mirror=False):
         """重置一局；``rosters`` 可为两个武将 ID 列表，供受控平衡评估使用。"""
         if seed is not None:
-            self.seed_value = seed
-            self.rng = random.Random(seed)
-            random.seed(seed)
-        self.controller = GameFlowController()
-        p1, p2 = self.controller.player1, self.controller.player2
+            self._seed(seed)
+        p1, p2 = self._reset_players()
         roster = list(GENERALS_DATA)
         self.rng.shuffle(roster)
         if rosters is not None:
@@ -70,83 +79,117 @@ class SanguoEnv:
         d1 = d2 = 0
         while d1 == d2:
             d1, d2 = self.rng.randint(1, 6), self.rng.randint(1, 6)
-        first, second = (p1, p2) if d1 > d2 else (p2, p1)
+        return self._start_battle(p1 if d1 > d2 else p2, self.max_turns)
+
+    def reset_from_replay(self, replay):
+        """按回放记录的种子、阵容、阵位、先手与学习方重建开局。"""
+        self._seed(replay.seed)
+        players = self._reset_players()
+        for side, player in enumerate(players):
+            for general_id, _, _ in replay.sides[side]:
+                player.add_general_to_team(self.general_pool.acquire(side, GENERALS_BY_ID[general_id]))
+            for general, (_, row, col) in zip(player.selected_generals, replay.sides[side]):
+                player.team.position_general(general, row, col)
+            player.team.complete_formation_setup()
+        return self._start_battle(
+            players[replay.first_side], replay.max_turns, players[replay.learning_side].team,
+        )
+
+    def _seed(self, seed):
+        self.seed_value = seed
+        self.rng = random.Random(seed)
+        random.seed(seed)
+
+    def _reset_players(self):
+        if self.controller is None:
+            self.controller = GameFlowController()
+        p1, p2 = self.controller.player1, self.controller.player2
+        p1.reset_battle_state()
+        p2.reset_battle_state()
+        self.general_pool.release()
+        return p1, p2
+
+    def _start_battle(self, first, max_turns, learning_team=None):
+        p1, p2 = self.controller.player1, self.controller.player2
+        second = p2 if first is p1 else p1
         second.team.max_morale += 2
         second.team.current_morale += 2
         self.controller.first_player, self.controller.second_player = first, second
-        self.battle_system = BattleSystem(p1.team, p2.team, None, first.team.team_name, max_turns=self.max_turns)
+        self.battle_system = BattleSystem(p1.team, p2.team, None, first.team.team_name, max_turns=max_turns)
         self.rules = BattleRulesService(self.battle_system)
+        self.battle_system.event_bus.enabled = self.record_combat_events
+        self.event_cursor = self.battle_system.event_bus.subscribe(0)
         self.battle_system.turn_count = 1
         self.battle_system.current_side.update_effects()
         # 随机决定学习方身份，观察编码始终将其置于 self 侧。
-        self.learning_team = p1.team if self.rng.randrange(2) == 0 else p2.team
+        if learning_team is None:
+            learning_team = p1.team if self.rng.randrange(2) == 0 else p2.team
+        self.learning_team = learning_team
         self.enemy_team = p2.team if self.learning_team is p1.team else p1.team
         self.subphase = "skill"
         self.done = False
+        self.replay = BattleReplay(
+            seed=self.seed_value, max_turns=max_turns,
+            sides=tuple(
+                [(general.general_id, *player.team.get_general_position(general))
+                 for general in player.selected_generals]
+                for player in (p1, p2)
+            ),
+            first_side=0 if first is p1 else 1,
+            learning_side=self._side_of(self.learning_team),
+        )
         self.reward_handler.reset(self.learning_team, self.enemy_team)
         if self.battle_system.current_side is not self.learning_team:
             self._run_opponent_turn()
         return self.observation(), self.info()
 
+    def _side_of(self, team):
+        return 0 if team is self.controller.player1.team else 1
+
     def _choose_selection(self, source):
         """Sample a legal roster without imposing a hidden three-general cap.
 
-        ``team_size > 0`` keeps old checkpoints/configs reproducible. Setting it
-        to ``0`` enables variable-size sampling bounded only by cost, configured
-        size coverage and the twelve formation cells.
+        ``team_size > 0`` draws uniformly from every affordable roster of that
+        size. Setting it to ``0`` enables variable-size sampling bounded only by
+        cost, configured size coverage and the twelve formation cells: the size
+        is weighted by ``size ** team_size_power`` and the roster is drawn
+        uniformly from the most expensive ``1 - roster_cost_bias`` share of
+        legal rosters of that size (at least 2%).
         """
         source = list(source)
-        cheapest = sorted(source, key=lambda item: float(item["cost"]))
+        sampler = RosterSampler(
+            [item["cost"] for item in source], self.cost_limit,
+            max(self.team_size, self.max_team_size),
+        )
+        cheapest = min(source, key=lambda item: float(item["cost"]))
         if self.team_size > 0:
-            target_size = min(self.team_size, len(source))
-            affordable = [
-                combo for combo in combinations(source, target_size)
-                if sum(float(item["cost"]) for item in combo) <= self.cost_limit
-            ]
-            return self.rng.choice(affordable) if affordable else (cheapest[0],)
-        else:
-            feasible_sizes = [
-                size for size in range(self.min_team_size, min(self.max_team_size, len(source)) + 1)
-                if sum(float(item["cost"]) for item in cheapest[:size]) <= self.cost_limit
-            ]
+            chosen = sampler.sample(self.rng, min(self.team_size, len(source)))
+            return tuple(source[index] for index in chosen) if chosen else (cheapest,)
+        feasible_sizes = [
+            size for size in range(self.min_team_size, min(self.max_team_size, len(source)) + 1)
+            if sampler.count(size)
+        ]
         if not feasible_sizes:
-            return (cheapest[0],)
+            return (cheapest,)
         if len(feasible_sizes) == 1:
             target_size = feasible_sizes[0]
         else:
             weights = [float(size) ** self.team_size_power for size in feasible_sizes]
             target_size = self.rng.choices(feasible_sizes, weights=weights, k=1)[0]
-
-        candidates = []
-        seen = set()
-
-        def add_candidate(selection):
-            selection = tuple(selection)
-            key = tuple(sorted(int(item["id"]) for item in selection))
-            if key not in seen and sum(float(item["cost"]) for item in selection) <= self.cost_limit:
-                seen.add(key)
-                candidates.append(selection)
-
-        add_candidate(cheapest[:target_size])
-        for _ in range(self.roster_candidate_samples):
-            add_candidate(self.rng.sample(source, target_size))
-        if not candidates:
-            return (cheapest[0],)
-        candidates.sort(key=lambda combo: sum(float(item["cost"]) for item in combo), reverse=True)
         elite_fraction = max(0.02, 1.0 - self.roster_cost_bias)
-        elite_count = max(1, int(round(len(candidates) * elite_fraction)))
-        return self.rng.choice(candidates[:elite_count])
+        chosen = sampler.sample(self.rng, target_size, elite_fraction)
+        return tuple(source[index] for index in chosen)
 
     def _populate_data(self, player, selection):
+        side = 0 if player is self.controller.player1 else 1
         for data in selection:
-            player.add_general_to_team(create_general_from_data(data))
+            player.add_general_to_team(self.general_pool.acquire(side, data))
 
     def _populate_player(self, player, source):
         self._populate_data(player, self._choose_selection(source))
 
     def _populate_ids(self, player, ids):
-        by_id = {data["id"]: data for data in GENERALS_DATA}
-        selection = [by_id[general_id] for general_id in ids if general_id in by_id]
+        selection = [GENERALS_BY_ID[general_id] for general_id in ids if general_id in GENERALS_BY_ID]
         if not selection:
             raise ValueError("受控阵容必须至少包含一名有效武将")
         if sum(data["cost"] for data in selection) > self.cost_limit:
@@ -159,6 +202,10 @@ class SanguoEnv:
             player.team.position_general(general, row, col)
         player.team.complete_formation_setup()
 
+    def drain_combat_events(self):
+        """读取上次调用以来本局产生的 ``(team, event)`` 表现事件。"""
+        return self.event_cursor.read() if self.event_cursor is not None else []
+
     def observation(self):
         return build_observation(self)
 
@@ -188,10 +235,11 @@ class SanguoEnv:
         if not 0 <= action_id < self.action_size or mask[action_id]:
             raise ValueError(f"非法动作: {action_id}")
         action = self.decode_action(action_id)
+        self.replay.record(self._side_of(self.learning_team), action_id)
         result = self._apply_learning_action(action)
         self._finalize_if_over()
         if not self.done and action.kind == "end_attack":
-            self.rules.end_turn()
+            self._end_turn()
             self._run_opponent_turn()
             self._finalize_if_over()
         outcome = self.rules.outcome()
@@ -227,6 +275,9 @@ class SanguoEnv:
             return {"success": False, "message": "攻击者或目标阵位为空"}
         return self.rules.attack(attacker, target, guess=action.guess)
 
+    def _end_turn(self):
+        self.rules.end_turn()
+
     def _run_opponent_turn(self):
         if self.battle_system._is_game_over():
             return
@@ -240,15 +291,21 @@ class SanguoEnv:
         while guard and not self.battle_system._is_game_over():
             guard -= 1
             action_id = self.opponent.choose_action(self)
+            self.replay.record(self._side_of(self.learning_team), action_id)
             action = self.decode_action(action_id)
             self._apply_learning_action(action)
             if action.kind == "end_attack":
                 break
         if not self.battle_system._is_game_over():
-            self.rules.end_turn()
+            self._end_turn()
         self.learning_team, self.enemy_team = self.enemy_team, self.learning_team
         self.subphase = "skill"
 
     def _finalize_if_over(self):
         if self.battle_system._is_game_over() or self.battle_system.turn_count >= self.battle_system.max_turns:
             self.done = True
+            outcome = self.rules.outcome()
+            winner_side = None
+            if outcome.winner is not None:
+                winner_side = 0 if outcome.winner == self.controller.player1.team.team_name else 1
+            self.replay.finish(self.battle_system.turn_count, winner_side, outcome.timeout)
@@ -10,14 +10,15 @@ class SanguoEnv(BaseSanguoEnv):
 
     def __init__(self, opponent=None, *, team_size=3, min_team_size=1,
                  max_team_size=8, team_size_power=0.0,
-                 roster_candidate_samples=256, roster_cost_bias=0.75,
-                 cost_limit=8.0, max_turns=200, reward_config=None):
+                 roster_cost_bias=0.75,
+                 cost_limit=8.0, max_turns=200, reward_config=None,
+                 record_combat_events=True, phase_timing=False):
         super().__init__(
             opponent, team_size=team_size, min_team_size=min_team_size,
             max_team_size=max_team_size, team_size_power=team_size_power,
-            roster_candidate_samples=roster_candidate_samples,
             roster_cost_bias=roster_cost_bias, cost_limit=cost_limit,
             max_turns=max_turns, reward_config=reward_config,
+            record_combat_events=record_combat_events, phase_timing=phase_timing,
         )
         self.reward_handler = RewardHandler(reward_config)
 
@@ -28,10 +29,11 @@ class SanguoEnv(BaseSanguoEnv):
         if not 0 <= action_id < self.action_size or mask[action_id]:
             raise ValueError(f"非法动作: {action_id}")
         action = self.decode_action(action_id)
+        self.replay.record(self._side_of(self.learning_team), action_id)
         result = self._apply_learning_action(action)
         self._finalize_if_over()
         if not self.done and action.kind == "end_attack":
-            self.rules.end_turn()
+            self._end_turn()
             self._run_opponent_turn()
             self._finalize_if_over()
         outcome = self.rules.outcome()
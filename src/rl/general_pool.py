@@ -0,0 +1,35 @@
+"""环境内复用的武将对象池。
+
+每局重置都重新构造武将、被动技能和队伍会产生大量短命对象。对象池为每一方
+预先构造全部武将各一份，重置时只恢复局内状态并重新绑定到队伍；同一局里同一
+方重复出现的武将 ID 才临时新建实例。
+"""
+from __future__ import annotations
+
+from src.game_data.generals_config import create_general_from_data
+from src.game_data.generals_data import GENERALS_DATA
+
+
+class GeneralPool:
+    """按 (side, general_id) 缓存的武将实例，``side`` 为 0/1 对应双方玩家。"""
+
+    def __init__(self, generals_data=GENERALS_DATA, sides=2):
+        self.generals = [
+            {data["id"]: create_general_from_data(data) for data in generals_data}
+            for _ in range(sides)
+        ]
+        self.bound = [set() for _ in range(sides)]
+
+    def release(self):
+        """新一局开始前调用，之后每个池内实例都可再被取出一次。"""
+        for bound in self.bound:
+            bound.clear()
+
+    def acquire(self, side, data):
+        """取出已重置局内状态的武将；池中没有或本局已取出时新建。"""
+        general = self.generals[side].get(data["id"])
+        if general is None or data["id"] in self.bound[side]:
+            return create_general_from_data(data)
+        self.bound[side].add(data["id"])
+        general.reset_battle_state()
+        return general
@@ -0,0 +1,298 @@
+"""不依赖 PyTorch 的 PvE 推理运行时。
+
+`tools/rl/export_pve_numpy.py` 把发布 checkpoint 转为扁平 `.npz` 权重文件：
+`__header__` 保存 JSON schema 头，其余键为 `<模型>/<state_dict 键>`。
+这里的前向实现与 `actor_critic_v3.ActorCritic` 和 `prebattle.build_models`
+逐层一致，Web 在缺少 torch 时可直接用 NumPy 推理。
+
+`tools/rl/quantize_pve_models.py` 在同一格式上生成 fp16/int8 变体：fp16 直接
+保存半精度矩阵；int8 对每个二维权重按输出行对称量化，并以 `<键>.scale` 保存
+float32 缩放系数。bias 始终保持 float32，加载时统一还原为 float32 计算：NumPy 的
+fp16/int8 矩阵乘不走 BLAS，按低精度计算反而更慢，所以量化只用于减小发布体积。
+"""
+from __future__ import annotations
+
+import json
+import math
+import os
+from pathlib import Path
+
+import numpy as np
+
+from src.rl import actions
+from src.rl.actions import GRID_SIZE
+from src.rl.observation import GENERAL_FEATURES, GLOBAL_FEATURES
+
+NUMPY_WEIGHTS_SCHEMA = "sanguo-numpy-weights-v1"
+HEADER_KEY = "__header__"
+MASKED_LOGIT = -1e9
+# 本运行时实现的战斗模型结构；必须与 actor_critic_v3.MODEL_SCHEMA 相同。
+BATTLE_MODEL_SCHEMA = "sanguo-structured-action-actor-critic-v3"
+RUNTIMES = ("auto", "torch", "numpy")
+QUANTIZATIONS = ("fp32", "fp16", "int8")
+SCALE_SUFFIX = ".scale"
+
+
+def resolve_runtime(runtime="auto"):
+    """`auto` 在可导入 torch 时使用 torch，否则回退到 NumPy。"""
+    if runtime not in RUNTIMES:
+        raise ValueError(f"未知推理运行时: {runtime}")
+    if runtime != "auto":
+        return runtime
+    try:
+        import torch  # noqa: F401
+    except ImportError:
+        return "numpy"
+    return "torch"
+
+
+def weights_path(checkpoint, quantization="fp32"):
+    """发布 checkpoint 对应的 NumPy 权重文件路径，量化变体为 `<名>.<精度>.npz`。"""
+    checkpoint = Path(checkpoint)
+    if quantization not in QUANTIZATIONS:
+        raise ValueError(f"未知量化精度: {quantization}")
+    if quantization != "fp32":
+        return checkpoint.with_name(f"{checkpoint.name.split('.')[0]}.{quantization}.npz")
+    return checkpoint if checkpoint.suffix == ".npz" else checkpoint.with_suffix(".npz")
+
+
+def _to_numpy(value):
+    if hasattr(value, "detach"):
+        value = value.detach().cpu().numpy()
+    value = np.asarray(value)
+    if value.dtype in (np.int8, np.float16):
+        return np.ascontiguousarray(value)
+    return np.ascontiguousarray(value, dtype=np.float32)
+
+
+def quantize_weights(weights, quantization):
+    """按精度压缩二维权重；一维 bias 保持 float32 以免累积偏移。"""
+    if quantization not in QUANTIZATIONS:
+        raise ValueError(f"未知量化精度: {quantization}")
+    result = {}
+    for name, value in weights.items():
+        value = _to_numpy(value).astype(np.float32, copy=False)
+        if quantization == "fp32" or value.ndim < 2:
+            result[name] = value
+        elif quantization == "fp16":
+            result[name] = value.astype(np.float16)
+        else:
+            scale = np.abs(value).reshape(value.shape[0], -1).max(axis=1) / 127.0
+            scale = np.where(scale > 0, scale, 1.0).astype(np.float32)
+            rows = scale.reshape((-1,) + (1,) * (value.ndim - 1))
+            result[name] = np.clip(np.rint(value / rows), -127, 127).astype(np.int8)
+            result[name + SCALE_SUFFIX] = scale
+    return result
+
+
+def dequantize_weights(weights):
+    """把 fp16/int8 权重还原为 float32，返回与 state_dict 同名的数组。"""
+    result = {}
+    for name, value in weights.items():
+        if name.endswith(SCALE_SUFFIX):
+            continue
+        if value.dtype == np.int8:
+            scale = weights[name + SCALE_SUFFIX]
+            value = value.astype(np.float32) * scale.reshape((-1,) + (1,) * (value.ndim - 1))
+        result[name] = value.astype(np.float32, copy=False)
+    return result
+
+
+def save_weights(path, header, weights):
+    """原子写入带 schema 头的权重文件；header 必须可 JSON 序列化。"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    arrays = {name: _to_numpy(value) for name, value in weights.items()}
+    arrays[HEADER_KEY] = np.array(json.dumps(
+        {"schema": NUMPY_WEIGHTS_SCHEMA, **header}, ensure_ascii=False, sort_keys=True,
+    ))
+    temporary = path.with_suffix(path.suffix + ".tmp")
+    with temporary.open("wb") as stream:
+        np.savez(stream, **arrays)
+    os.replace(temporary, path)
+    return path
+
+
+def load_weights(path):
+    """读取 `(header, weights)`；禁止 pickle，文件只含数值数组和 JSON 头。"""
+    with np.load(Path(path), allow_pickle=False) as archive:
+        if HEADER_KEY not in archive.files:
+            raise ValueError(f"{path} 缺少 NumPy 权重 schema 头")
+        header = json.loads(str(archive[HEADER_KEY]))
+        weights = {name: archive[name] for name in archive.files if name != HEADER_KEY}
+    if header.get("schema") != NUMPY_WEIGHTS_SCHEMA:
+        raise ValueError(f"不兼容的 NumPy 权重 schema: {header.get('schema')}")
+    header.setdefault("quantization", "fp32")
+    return header, dequantize_weights(weights)
+
+
+def save_quantized(source, destination, quantization):
+    """从 fp32 `.npz` 生成量化变体，schema 头额外记录精度。"""
+    header, weights = load_weights(source)
+    if header["quantization"] != "fp32":
+        raise ValueError(f"{source} 已是 {header['quantization']} 权重，不能重复量化")
+    header["quantization"] = quantization
+    return save_weights(destination, header, quantize_weights(weights, quantization))
+
+
+def _prefixed(prefix, state_dict):
+    return {f"{prefix}/{name}": value for name, value in state_dict.items()}
+
+
+def _unprefixed(prefix, weights):
+    start = len(prefix) + 1
+    return {
+        name[start:]: value for name, value in weights.items()
+        if name.startswith(prefix + "/")
+    }
+
+
+def export_battle_checkpoint(state, path):
+    """把 ActorCritic v3 checkpoint 的模型权重导出为 `.npz`，不含优化器状态。"""
+    header = {
+        "kind": "battle",
+        "update": state.get("update"),
+        "observation_schema": state.get("observation_schema"),
+        "observation_size": state.get("observation_size"),
+        "action_size": state.get("action_size"),
+        "model_schema": state.get("model_schema"),
+    }
+    return save_weights(path, header, _prefixed("model", state["model"]))
+
+
+def export_prebattle_checkpoint(state, path):
+    """把选将/布阵价值模型 checkpoint 导出为 `.npz`。"""
+    header = {
+        "kind": "prebattle",
+        "prebattle_schema": state.get("schema"),
+        "general_ids": [int(item) for item in state.get("general_ids", ())],
+        "metadata": state.get("metadata") or {},
+    }
+    weights = _prefixed("draft_model", state["draft_model"])
+    weights.update(_prefixed("formation_model", state["formation_model"]))
+    return save_weights(path, header, weights)
+
+
+def _linear(inputs, weights, name):
+    return inputs @ weights[f"{name}.weight"].T + weights[f"{name}.bias"]
+
+
+def _action_descriptor_arrays():
+    """与 `actor_critic_v3._action_descriptors` 相同的固定动作字段。"""
+    type_map = {"end_skill": 0, "end_attack": 1, "skill_target": 2, "skill_area": 3, "attack": 4}
+    guess_map = {None: 0, "奇": 1, "偶": 2}
+    padding_slot = GRID_SIZE
+    rows = []
+    for action_id in range(actions.ACTION_SIZE):
+        action = actions.decode(action_id)
+        rows.append((
+            type_map[action.kind],
+            action.actor_slot if action.actor_slot >= 0 else padding_slot,
+            action.target_slot if action.target_slot >= 0 else padding_slot,
+            action.row * 4 + action.col if action.kind == "skill_area" else padding_slot,
+            guess_map.get(action.guess, 0),
+        ))
+    return tuple(np.asarray(column, dtype=np.int64) for column in zip(*rows))
+
+
+class NumpyActorCritic:
+    """ActorCritic v3 的 NumPy 前向；输入输出与 torch 版本的 `(logits, values)` 一致。"""
+
+    def __init__(self, weights, header=None):
+        self.weights = {name: np.asarray(value, dtype=np.float32) for name, value in weights.items()}
+        self.header = dict(header or {})
+        self.slot_count = GRID_SIZE * 2
+        (self.action_type_ids, self.action_actor_slots, self.action_target_slots,
+         self.action_area_slots, self.action_guess_ids) = _action_descriptor_arrays()
+        w = self.weights
+        encoder = w["action_encoder.0.weight"]
+        slot_size = w["action_slot_projection.weight"].shape[0]
+        # action_encoder 第一层对拼接输入是线性的：按 actor/self/enemy/静态字段拆分
+        # 权重后，静态部分只需在加载时计算一次，逐次推理只投影 13 个阵位。
+        self._actor_weight = encoder[:, :slot_size]
+        self._self_target_weight = encoder[:, slot_size:slot_size * 2]
+        self._enemy_target_weight = encoder[:, slot_size * 2:slot_size * 3]
+        static = np.concatenate((
+            w["action_type_embedding.weight"][self.action_type_ids],
+            w["area_embedding.weight"][self.action_area_slots],
+            w["guess_embedding.weight"][self.action_guess_ids],
+        ), axis=-1)
+        self._static_keys = static @ encoder[:, slot_size * 3:].T + w["action_encoder.0.bias"]
+
+    @classmethod
+    def from_file(cls, path):
+        header, weights = load_weights(path)
+        if header.get("kind") != "battle":
+            raise ValueError(f"{path} 不是战斗模型权重")
+        return cls(_unprefixed("model", weights), header)
+
+    def eval(self):
+        return self
+
+    def __call__(self, observations, action_masks=None):
+        w = self.weights
+        observations = np.asarray(observations, dtype=np.float32)
+        if observations.ndim == 1:
+            observations = observations[None, :]
+        batch = observations.shape[0]
+        global_state = observations[:, :GLOBAL_FEATURES]
+        raw_slots = observations[:, GLOBAL_FEATURES:].reshape(batch, self.slot_count, GENERAL_FEATURES)
+        encoded = np.tanh(_linear(raw_slots, w, "slot_encoder.0"))
+        encoded = np.tanh(_linear(encoded, w, "slot_encoder.2"))
+        features = np.concatenate((global_state, encoded.reshape(batch, -1)), axis=-1)
+        features = np.tanh(_linear(features, w, "body.0"))
+        features = np.tanh(_linear(features, w, "body.2"))
+
+        projected = _linear(encoded, w, "action_slot_projection")
+        padding = np.zeros((batch, 1, projected.shape[-1]), dtype=np.float32)
+        self_slots = np.concatenate((projected[:, :GRID_SIZE], padding), axis=1)
+        enemy_slots = np.concatenate((projected[:, GRID_SIZE:], padding), axis=1)
+        hidden = (
+            (self_slots @ self._actor_weight.T)[:, self.action_actor_slots]
+            + (self_slots @ self._self_target_weight.T)[:, self.action_target_slots]
+            + (enemy_slots @ self._enemy_target_weight.T)[:, self.action_target_slots]
+            + self._static_keys
+        )
+        action_keys = np.tanh(_linear(np.tanh(hidden), w, "action_encoder.2"))
+        query = _linear(features, w, "action_query")
+        logits = np.einsum("bak,bk->ba", action_keys, query) / math.sqrt(action_keys.shape[-1])
+        logits = logits + _linear(features, w, "type_bias")[:, self.action_type_ids]
+        if action_masks is not None:
+            masks = np.asarray(action_masks, dtype=bool)
+            logits = np.where(masks.reshape(logits.shape), np.float32(MASKED_LOGIT), logits)
+        values = _linear(features, w, "critic")[:, 0]
+        return logits.astype(np.float32, copy=False), values.astype(np.float32, copy=False)
+
+
+class NumpyValueNet:
+    """`prebattle.build_models` 中 Linear/ReLU 价值网络的 NumPy 前向。"""
+
+    def __init__(self, weights):
+        self.weights = {name: np.asarray(value, dtype=np.float32) for name, value in weights.items()}
+        self.layers = sorted(
+            {name.rsplit(".", 1)[0] for name in self.weights},
+            key=lambda name: int(name.rsplit(".", 1)[-1]),
+        )
+
+    def eval(self):
+        return self
+
+    def __call__(self, features):
+        values = np.asarray(features, dtype=np.float32)
+        for index, layer in enumerate(self.layers):
+            values = _linear(values, self.weights, layer)
+            if index < len(self.layers) - 1:
+                values = np.maximum(values, 0.0)
+        return values[..., 0]
+
+
+def load_prebattle_models(path):
+    """读取预战权重，返回 `(draft_model, formation_model, header)`。"""
+    header, weights = load_weights(path)
+    if header.get("kind") != "prebattle":
+        raise ValueError(f"{path} 不是预战模型权重")
+    return (
+        NumpyValueNet(_unprefixed("draft_model", weights)),
+        NumpyValueNet(_unprefixed("formation_model", weights)),
+        header,
+    )
@@ -0,0 +1,95 @@
+"""rollout 分阶段计时（默认关闭）。
+
+``PhaseTimer.instrument(env)`` 在环境实例上包装 ``step``、``reset``、规则结算、
+``action_mask``、``observation`` 与 ``_run_opponent_turn``；每个阶段只累计自身
+耗时（扣除嵌套的子阶段），因此各阶段之和等于被计时的总时间，不会重复计数。
+worker 另行用 ``add`` 记录模型前向、轨迹打包与队列传输。未启用时环境不做任何
+包装，热路径没有额外开销。
+"""
+from __future__ import annotations
+
+from time import perf_counter
+
+# 环境方法名与阶段名；规则结算包含学习方与对手两侧的子动作及回合结束处理。
+ENV_PHASES = (
+    ("step", "env_step"),
+    ("reset", "env_reset"),
+    ("_apply_learning_action", "rules"),
+    ("_end_turn", "rules"),
+    ("action_mask", "action_mask"),
+    ("observation", "observation"),
+    ("_run_opponent_turn", "opponent_turn"),
+)
+
+
+class PhaseTimer:
+    """按阶段累计秒数与调用次数；``drain`` 取出并清零，随 rollout 片段回传。"""
+
+    __slots__ = ("_slots", "_stack")
+
+    def __init__(self):
+        # 阶段 -> [秒, 次数]；包装函数直接持有该列表，热路径上不做字典查找。
+        self._slots = {}
+        # 每层嵌套一个累加器，记录子阶段占用的时间，供父阶段扣除。
+        self._stack = []
+
+    def _slot(self, phase):
+        return self._slots.setdefault(phase, [0.0, 0])
+
+    def add(self, phase, seconds, count=1):
+        slot = self._slot(phase)
+        slot[0] += seconds
+        slot[1] += count
+
+    def wrap(self, phase, function):
+        slot = self._slot(phase)
+        stack = self._stack
+
+        def timed(*args, **kwargs):
+            stack.append(0.0)
+            started = perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                elapsed = perf_counter() - started
+                slot[0] += elapsed - stack.pop()
+                slot[1] += 1
+                if stack:
+                    stack[-1] += elapsed
+
+        return timed
+
+    def instrument(self, env):
+        for name, phase in ENV_PHASES:
+            setattr(env, name, self.wrap(phase, getattr(env, name)))
+        return self
+
+    def drain(self):
+        timings = {}
+        for phase, slot in self._slots.items():
+            if slot[1]:
+                timings[phase] = (slot[0], slot[1])
+            slot[0], slot[1] = 0.0, 0
+        return timings
+
+
+def merge_timings(items):
+    """合并多个 ``drain`` 结果；``None`` 表示该片段未启用计时。"""
+    merged = {}
+    for timings in items:
+        for phase, (seconds, count) in (timings or {}).items():
+            total, calls = merged.get(phase, (0.0, 0))
+            merged[phase] = (total + seconds, calls + count)
+    return merged
+
+
+def timing_metrics(timings):
+    """展开为 ``perf/`` 标量：各阶段总毫秒、单次微秒、调用次数与时间占比。"""
+    overall = sum(seconds for seconds, _ in timings.values())
+    metrics = {}
+    for phase, (seconds, count) in sorted(timings.items()):
+        metrics[f"{phase}_ms"] = seconds * 1e3
+        metrics[f"{phase}_us_per_call"] = seconds * 1e6 / max(1, count)
+        metrics[f"{phase}_calls"] = count
+        metrics[f"{phase}_share"] = seconds / overall if overall > 0 else 0.0
+    return metrics
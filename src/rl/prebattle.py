@@ -5,6 +5,8 @@ from itertools import combinations, permutations
 import random
 from pathlib import Path
 
+import numpy as np
+
 from src.game_data.generals_data import GENERALS_DATA
 
 
@@ -22,15 +24,32 @@ def _torch():
 
 
 def build_models():
-    """Create the two small value networks without importing torch at module import."""
+    """Create the two small value networks without importing torch at module import.
+
+    The first layer accepts either dense multi-hot rows or integer index rows from
+    ``draft_indices``/``formation_indices`` padded with ``-1``; the index path sums
+    the selected weight columns, which equals the dense ``Linear`` on the same
+    multi-hot vector. Parameter names and shapes match ``nn.Linear``, so
+    ``PREBATTLE_SCHEMA`` checkpoints and NumPy exports load unchanged.
+    """
     torch = _torch()
     nn = torch.nn
+    functional = torch.nn.functional
+
+    class SparseInputLinear(nn.Linear):
+        def forward(self, features):
+            if features.is_floating_point():
+                return super().forward(features)
+            # 末尾追加的零行吸收 -1 填充，不需要 padding_idx。
+            table = torch.cat((self.weight.t(), self.weight.new_zeros(1, self.out_features)))
+            indices = torch.where(features < 0, self.in_features, features.long())
+            return functional.embedding_bag(indices, table, mode="sum") + self.bias
 
     class DraftValueNet(nn.Module):
         def __init__(self):
             super().__init__()
             self.network = nn.Sequential(
-                nn.Linear(DRAFT_FEATURES, 128), nn.ReLU(),
+                SparseInputLinear(DRAFT_FEATURES, 128), nn.ReLU(),
                 nn.Linear(128, 64), nn.ReLU(), nn.Linear(64, 1),
             )
 
@@ -41,7 +60,7 @@ def build_models():
         def __init__(self):
             super().__init__()
             self.network = nn.Sequential(
-                nn.Linear(FORMATION_FEATURES, 256), nn.ReLU(),
+                SparseInputLinear(FORMATION_FEATURES, 256), nn.ReLU(),
                 nn.Linear(256, 64), nn.ReLU(), nn.Linear(64, 1),
             )
 
@@ -51,35 +70,92 @@ def build_models():
     return DraftValueNet(), FormationValueNet()
 
 
-def encode_draft(roster_self, roster_enemy):
-    vector = [0.0] * DRAFT_FEATURES
-    for general_id in roster_self:
-        index = GENERAL_INDEX.get(int(general_id))
-        if index is not None:
-            vector[index] = 1.0
-    offset = len(GENERAL_IDS)
-    for general_id in roster_enemy:
-        index = GENERAL_INDEX.get(int(general_id))
-        if index is not None:
-            vector[offset + index] = 1.0
-    return vector
+def draft_indices(roster_self, roster_enemy):
+    """Sorted positions of the ones in ``encode_draft``."""
+    indices = set()
+    for offset, roster in ((0, roster_self), (len(GENERAL_IDS), roster_enemy)):
+        for general_id in roster:
+            index = GENERAL_INDEX.get(int(general_id))
+            if index is not None:
+                indices.add(offset + index)
+    return sorted(indices)
 
 
-def encode_formation(roster_self, roster_enemy, formation_self, formation_enemy):
-    vector = encode_draft(roster_self, roster_enemy)
-    vector.extend([0.0] * (FORMATION_FEATURES - DRAFT_FEATURES))
+def formation_indices(roster_self, roster_enemy, formation_self, formation_enemy):
+    """Sorted positions of the ones in ``encode_formation``."""
+    indices = set(draft_indices(roster_self, roster_enemy))
     side_size = len(GENERAL_IDS) * CELL_COUNT
     for side, formation in enumerate((formation_self, formation_enemy)):
         side_offset = DRAFT_FEATURES + side * side_size
         for position in formation:
-            general_id = int(position["general_id"])
-            index = GENERAL_INDEX.get(general_id)
+            index = GENERAL_INDEX.get(int(position["general_id"]))
             row, col = int(position["row"]), int(position["col"])
             if index is not None and 0 <= row < 3 and 0 <= col < 4:
-                vector[side_offset + index * CELL_COUNT + row * 4 + col] = 1.0
+                indices.add(side_offset + index * CELL_COUNT + row * 4 + col)
+    return sorted(indices)
+
+
+_GENERAL_LOOKUP = np.full(max(GENERAL_IDS) + 1, -1, dtype=np.int64)
+_GENERAL_LOOKUP[list(GENERAL_IDS)] = np.arange(len(GENERAL_IDS))
+
+
+def _general_slots(ids):
+    ids = np.asarray(ids, dtype=np.int64)
+    known = (ids >= 0) & (ids < len(_GENERAL_LOOKUP))
+    return np.where(known, _GENERAL_LOOKUP[np.where(known, ids, 0)], -1)
+
+
+def _compact_rows(indices):
+    """Drop duplicate and ``-1`` entries per row; rows stay padded with ``-1``."""
+    if not indices.size:
+        return np.full((len(indices), 1), -1, dtype=np.int16)
+    padding = np.iinfo(np.int64).max
+    indices = np.sort(np.where(indices < 0, padding, indices), axis=1)
+    indices[:, 1:][indices[:, 1:] == indices[:, :-1]] = padding
+    indices = np.sort(indices, axis=1)
+    width = max(1, int((indices != padding).sum(axis=1).max(initial=0)))
+    indices = indices[:, :width]
+    return np.where(indices == padding, -1, indices).astype(np.int16)
+
+
+def draft_index_matrix(roster_self, roster_enemy):
+    """Vectorised ``draft_indices`` over ``(n, slots)`` id matrices padded with -1."""
+    enemy = _general_slots(roster_enemy)
+    return _compact_rows(np.concatenate(
+        (_general_slots(roster_self), np.where(enemy >= 0, enemy + len(GENERAL_IDS), -1)), axis=1,
+    ))
+
+
+def formation_index_matrix(roster_self, roster_enemy, ids_self, cells_self, ids_enemy, cells_enemy):
+    """Vectorised ``formation_indices``; cells are ``row * 4 + col`` with -1 for empty slots."""
+    parts = [draft_index_matrix(roster_self, roster_enemy).astype(np.int64)]
+    side_size = len(GENERAL_IDS) * CELL_COUNT
+    for side, (ids, cells) in enumerate(((ids_self, cells_self), (ids_enemy, cells_enemy))):
+        slots = _general_slots(ids)
+        cells = np.asarray(cells, dtype=np.int64)
+        valid = (slots >= 0) & (cells >= 0) & (cells < CELL_COUNT)
+        parts.append(np.where(valid, DRAFT_FEATURES + side * side_size + slots * CELL_COUNT + cells, -1))
+    return _compact_rows(np.concatenate(parts, axis=1))
+
+
+def _dense(indices, size):
+    vector = [0.0] * size
+    for index in indices:
+        vector[index] = 1.0
     return vector
 
 
+def encode_draft(roster_self, roster_enemy):
+    return _dense(draft_indices(roster_self, roster_enemy), DRAFT_FEATURES)
+
+
+def encode_formation(roster_self, roster_enemy, formation_self, formation_enemy):
+    return _dense(
+        formation_indices(roster_self, roster_enemy, formation_self, formation_enemy),
+        FORMATION_FEATURES,
+    )
+
+
 def snapshot_formation(team):
     return [
         {"general_id": general.general_id, "row": row, "col": col}
@@ -91,8 +167,10 @@ def snapshot_formation(team):
 class PrebattlePolicy:
     """Search legal draft/formation choices with learned value networks."""
 
-    def __init__(self, checkpoint=None, *, device="cpu"):
+    def __init__(self, checkpoint=None, *, device="cpu", runtime="auto"):
         self.device = device
+        self.runtime = runtime
+        self.active_runtime = None
         self.draft_model = self.formation_model = None
         self.metadata = {}
         if checkpoint:
@@ -103,8 +181,16 @@ class PrebattlePolicy:
         return self.draft_model is not None and self.formation_model is not None
 
     def load(self, checkpoint):
+        from src.rl.models import numpy_runtime
+        checkpoint = Path(checkpoint)
+        runtime = (
+            "numpy" if checkpoint.suffix == ".npz"
+            else numpy_runtime.resolve_runtime(self.runtime)
+        )
+        if runtime == "numpy":
+            return self._load_numpy(numpy_runtime.weights_path(checkpoint))
         torch = _torch()
-        state = torch.load(Path(checkpoint), map_location=self.device, weights_only=False)
+        state = torch.load(checkpoint, map_location=self.device, weights_only=False)
         if state.get("schema") != PREBATTLE_SCHEMA:
             raise ValueError(f"不兼容的预战模型 schema: {state.get('schema')}")
         if tuple(state.get("general_ids", ())) != GENERAL_IDS:
@@ -115,8 +201,30 @@ class PrebattlePolicy:
         self.draft_model.to(self.device).eval()
         self.formation_model.to(self.device).eval()
         self.metadata = dict(state.get("metadata") or {})
+        self.active_runtime = "torch"
         return self
 
+    def _load_numpy(self, path):
+        from src.rl.models.numpy_runtime import load_prebattle_models
+        draft_model, formation_model, header = load_prebattle_models(path)
+        if header.get("prebattle_schema") != PREBATTLE_SCHEMA:
+            raise ValueError(f"不兼容的预战模型 schema: {header.get('prebattle_schema')}")
+        if tuple(header.get("general_ids", ())) != GENERAL_IDS:
+            raise ValueError("预战模型的武将注册表与当前游戏不一致")
+        self.draft_model, self.formation_model = draft_model, formation_model
+        self.metadata = dict(header.get("metadata") or {})
+        self.active_runtime = "numpy"
+        return self
+
+    def _values(self, model, features):
+        """Score encoded rows with whichever runtime loaded the value networks."""
+        if self.active_runtime == "numpy":
+            return model(np.asarray(features, dtype=np.float32))
+        torch = _torch()
+        with torch.no_grad():
+            values = model(torch.tensor(features, dtype=torch.float32, device=self.device))
+        return values.cpu().numpy()
+
     @staticmethod
     def _ids(generals):
         return [int(g.general_id) for g in generals]
@@ -145,15 +253,12 @@ class PrebattlePolicy:
         ]
         if not self.available:
             return list(max(candidates, key=self._fallback_draft_score))
-        torch = _torch()
         enemy_ids = self._ids(enemy_generals)
-        features = torch.tensor(
+        values = self._values(
+            self.draft_model,
             [encode_draft(self._ids(combo), enemy_ids) for combo in candidates],
-            dtype=torch.float32, device=self.device,
         )
-        with torch.no_grad():
-            index = int(self.draft_model(features).argmax().item())
-        return list(candidates[index])
+        return list(candidates[int(values.argmax())])
 
     @staticmethod
     def _fallback_draft_score(combo):
@@ -193,29 +298,25 @@ class PrebattlePolicy:
         if not self.available:
             chosen = candidates[0]
         else:
-            torch = _torch()
             self_ids, enemy_ids = self._ids(generals), self._ids(enemy_generals)
             best_index, best_value = 0, float("-inf")
             batch_size = 512
-            with torch.no_grad():
-                for start in range(0, len(candidates), batch_size):
-                    batch = candidates[start:start + batch_size]
-                    features = []
-                    for positions in batch:
-                        formation = [
-                            {"general_id": general.general_id, "row": cell[0], "col": cell[1]}
-                            for general, cell in zip(generals, positions)
-                        ]
-                        features.append(encode_formation(
-                            self_ids, enemy_ids, formation, enemy_formation,
-                        ))
-                    values = self.formation_model(torch.tensor(
-                        features, dtype=torch.float32, device=self.device,
+            for start in range(0, len(candidates), batch_size):
+                batch = candidates[start:start + batch_size]
+                features = []
+                for positions in batch:
+                    formation = [
+                        {"general_id": general.general_id, "row": cell[0], "col": cell[1]}
+                        for general, cell in zip(generals, positions)
+                    ]
+                    features.append(encode_formation(
+                        self_ids, enemy_ids, formation, enemy_formation,
                     ))
-                    value, offset = values.max(dim=0)
-                    if float(value.item()) > best_value:
-                        best_value = float(value.item())
-                        best_index = start + int(offset.item())
+                values = self._values(self.formation_model, features)
+                offset = int(values.argmax())
+                if float(values[offset]) > best_value:
+                    best_value = float(values[offset])
+                    best_index = start + offset
             chosen = candidates[best_index]
         return [
             {"general_id": general.general_id, "row": row, "col": col}
@@ -1,9 +1,12 @@
 """Server-side PvE bridge for draft, formation and PPO battle inference."""
 from __future__ import annotations
 
+import json
 import os
 from pathlib import Path
 
+import numpy as np
+
 from src.paths import PVE_MODELS_DIR
 from src.rl.prebattle import PrebattlePolicy, snapshot_formation
 
@@ -23,6 +26,51 @@ BATTLE_MISTAKE_RATES = {"easy": 0.0, "normal": 0.30, "hard": 0.0}
 # Backward-compatible aliases for callers that expect one default bundle.
 DEFAULT_BATTLE_MODEL = DEFAULT_BATTLE_MODELS[DEFAULT_DIFFICULTY]
 DEFAULT_PREBATTLE_MODEL = DEFAULT_PREBATTLE_MODELS[DEFAULT_DIFFICULTY]
+PVE_MANIFEST = PVE_MODELS_DIR / "manifest.json"
+
+
+def deployed_quantization(difficulty, manifest_path=PVE_MANIFEST):
+    """Return the gated precision recorded for a tier, or fp32 when none passed."""
+    try:
+        manifest = json.loads(Path(manifest_path).read_text(encoding="utf-8"))
+        quantized = manifest["difficulties"][difficulty].get("quantized") or {}
+    except (OSError, ValueError, KeyError, AttributeError):
+        return "fp32"
+    files = [quantized.get(part, {}).get("file") for part in ("battle", "prebattle")]
+    if not quantized.get("mode") or not all(files):
+        return "fp32"
+    directory = Path(manifest_path).parent
+    if not all((directory / name).is_file() for name in files):
+        return "fp32"
+    return quantized["mode"]
+
+
+def deployed_student(difficulty, manifest_path=PVE_MANIFEST):
+    """Return ``(checkpoint, runtime_policy)`` of a calibrated student, or None.
+
+    Students are compact distilled battle policies registered by
+    ``tools/rl/distill_pve_students.py``; only entries that passed calibration
+    and whose files are present are used.
+    """
+    if os.environ.get("SANGUO_PVE_STUDENTS", "1") == "0":
+        return None
+    try:
+        manifest = json.loads(Path(manifest_path).read_text(encoding="utf-8"))
+        student = manifest["difficulties"][difficulty].get("student") or {}
+    except (OSError, ValueError, KeyError, AttributeError):
+        return None
+    name = (student.get("battle") or {}).get("file")
+    if not name or not (student.get("gate") or {}).get("passed"):
+        return None
+    checkpoint = Path(manifest_path).parent / name
+    from src.rl.models.numpy_runtime import resolve_runtime, weights_path
+    try:
+        runtime = resolve_runtime(os.environ.get("SANGUO_PVE_RUNTIME", "auto"))
+    except ValueError:
+        return None
+    if not (weights_path(checkpoint) if runtime == "numpy" else checkpoint).is_file():
+        return None
+    return checkpoint, dict(student.get("runtime_policy") or {})
 
 
 class _BattleView:
@@ -62,24 +110,39 @@ class PVEController:
 
     def __init__(self, battle_checkpoint=None, prebattle_checkpoint=None, *,
                  difficulty=DEFAULT_DIFFICULTY, device="cpu", battle_temperature=None,
-                 mistake_rate=None):
+                 mistake_rate=None, runtime=None, quantization=None, seed=None):
         if difficulty not in PVE_DIFFICULTIES:
             raise ValueError(f"未知 PvE 难度: {difficulty}")
         self.difficulty = difficulty
         self.device = device
+        # auto: torch 可用时加载 .pt，否则加载同名 .npz 并用 NumPy 推理。
+        self.runtime = runtime or os.environ.get("SANGUO_PVE_RUNTIME", "auto")
+        self.active_runtime = None
+        self._rng = np.random.default_rng(seed)
+        default_bundle = battle_checkpoint is None and prebattle_checkpoint is None
+        battle_override = os.environ.get(f"SANGUO_PVE_BATTLE_MODEL_{difficulty.upper()}")
+        # 发布目录登记了通过校准的蒸馏学生模型时，默认改用它及其校准后的采样设置。
+        student = (
+            deployed_student(difficulty)
+            if default_bundle and battle_override is None and quantization is None else None
+        )
+        runtime_policy = student[1] if student else {
+            "temperature": BATTLE_TEMPERATURES[difficulty],
+            "legal_exploration_rate": BATTLE_MISTAKE_RATES[difficulty],
+        }
+        self.student = student is not None
         self.battle_temperature = (
-            BATTLE_TEMPERATURES[difficulty]
+            runtime_policy.get("temperature")
             if battle_temperature is None
             else battle_temperature
         )
         self.mistake_rate = (
-            BATTLE_MISTAKE_RATES[difficulty] if mistake_rate is None else mistake_rate
+            runtime_policy.get("legal_exploration_rate") or 0.0
+            if mistake_rate is None else mistake_rate
         )
         self.battle_checkpoint = Path(
-            battle_checkpoint or os.environ.get(
-                f"SANGUO_PVE_BATTLE_MODEL_{difficulty.upper()}",
-                DEFAULT_BATTLE_MODELS[difficulty],
-            )
+            battle_checkpoint or battle_override
+            or (student[0] if student else DEFAULT_BATTLE_MODELS[difficulty])
         )
         self.prebattle_checkpoint = Path(
             prebattle_checkpoint or os.environ.get(
@@ -87,8 +150,17 @@ class PVEController:
                 DEFAULT_PREBATTLE_MODELS[difficulty],
             )
         )
+        # 量化权重加载时还原为 float32 计算，只省磁盘不省延迟和内存，因此默认仍用 fp32；
+        # "deployed" 表示采用 manifest 中通过精度门控的量化精度（仅限默认发布模型）。
+        quantization = (
+            quantization or ("fp32" if student else os.environ.get("SANGUO_PVE_QUANTIZATION"))
+            or "fp32"
+        )
+        if quantization == "deployed":
+            quantization = deployed_quantization(difficulty) if default_bundle else "fp32"
+        self.quantization = quantization
         self.battle_model = None
-        self.prebattle = PrebattlePolicy(device=device)
+        self.prebattle = PrebattlePolicy(device=device, runtime=self.runtime)
         self.load_errors = []
         self._loaded = False
 
@@ -102,29 +174,63 @@ class PVEController:
             return self
         self._loaded = True
         try:
-            import torch
-            from src.rl import actions
-            from src.rl.models.actor_critic_v3 import ActorCritic, MODEL_SCHEMA
-            from src.rl.observation import OBSERVATION_SCHEMA, OBSERVATION_SIZE
-            from src.rl.training.checkpoint import CheckpointManager
-            state = torch.load(self.battle_checkpoint, map_location=self.device, weights_only=False)
-            CheckpointManager.validate_schema(
-                state, observation_schema=OBSERVATION_SCHEMA,
-                observation_size=OBSERVATION_SIZE, action_size=actions.ACTION_SIZE,
-                model_schema=MODEL_SCHEMA,
+            from src.rl.models import numpy_runtime
+            # 量化权重只以 .npz 发布，始终由 NumPy 前向执行。
+            self.active_runtime = (
+                "numpy"
+                if self.battle_checkpoint.suffix == ".npz" or self.quantization != "fp32"
+                else numpy_runtime.resolve_runtime(self.runtime)
             )
-            self.battle_model = ActorCritic(OBSERVATION_SIZE, actions.ACTION_SIZE)
-            self.battle_model.load_state_dict(state["model"])
-            self.battle_model.to(self.device).eval()
+            if self.active_runtime == "numpy":
+                self.battle_model = self._load_numpy_battle_model()
+            else:
+                self.battle_model = self._load_torch_battle_model()
         except Exception as exc:  # Web must remain playable when an artifact is absent.
             self.load_errors.append(f"战斗模型加载失败: {exc}")
             self.battle_model = None
         try:
-            self.prebattle.load(self.prebattle_checkpoint)
+            prebattle_checkpoint = self.prebattle_checkpoint
+            if self.quantization != "fp32":
+                from src.rl.models.numpy_runtime import weights_path
+                prebattle_checkpoint = weights_path(prebattle_checkpoint, self.quantization)
+            self.prebattle.load(prebattle_checkpoint)
         except Exception as exc:
             self.load_errors.append(f"预战模型加载失败: {exc}")
         return self
 
+    @staticmethod
+    def _validate_battle_schema(state):
+        from src.rl import actions
+        from src.rl.models.numpy_runtime import BATTLE_MODEL_SCHEMA
+        from src.rl.observation import OBSERVATION_SCHEMA, OBSERVATION_SIZE
+        from src.rl.training.checkpoint import CheckpointManager
+        CheckpointManager.validate_schema(
+            state, observation_schema=OBSERVATION_SCHEMA,
+            observation_size=OBSERVATION_SIZE, action_size=actions.ACTION_SIZE,
+            model_schema=BATTLE_MODEL_SCHEMA,
+        )
+
+    def _load_torch_battle_model(self):
+        import torch
+        from src.rl import actions
+        from src.rl.models.actor_critic_v3 import ActorCritic
+        from src.rl.observation import OBSERVATION_SIZE
+        state = torch.load(self.battle_checkpoint, map_location=self.device, weights_only=False)
+        self._validate_battle_schema(state)
+        # 蒸馏学生模型沿用同一结构，仅宽度不同，尺寸记录在 model_config。
+        model = ActorCritic(OBSERVATION_SIZE, actions.ACTION_SIZE, **(state.get("model_config") or {}))
+        model.load_state_dict(state["model"])
+        return model.to(self.device).eval()
+
+    def _load_numpy_battle_model(self):
+        from src.rl.models.numpy_runtime import NumpyActorCritic, weights_path
+        model = NumpyActorCritic.from_file(
+            weights_path(self.battle_checkpoint, self.quantization),
+        )
+        # 导出文件的 schema 头与 checkpoint 字段同名，沿用同一校验。
+        self._validate_battle_schema(model.header)
+        return model
+
     def choose_draft(self, pool, enemy_generals, cost_limit):
         self.load()
         return self.prebattle.choose_draft(pool, enemy_generals, cost_limit)
@@ -135,11 +241,28 @@ class PVEController:
             generals, enemy_player.selected_generals, snapshot_formation(enemy_player.team),
         )
 
+    def battle_logits(self, observation, action_mask):
+        """Masked logits as a NumPy vector, independent of the loaded runtime."""
+        self.load()
+        if self.battle_model is None:
+            return None
+        if self.active_runtime == "numpy":
+            return self.battle_model(observation, action_mask)[0][0]
+        import torch
+        with torch.no_grad():
+            logits, _ = self.battle_model(
+                torch.as_tensor(observation, dtype=torch.float32, device=self.device).unsqueeze(0),
+                torch.as_tensor(action_mask, dtype=torch.bool, device=self.device).unsqueeze(0),
+            )
+        return logits[0].cpu().numpy()
+
     def choose_battle_action(self, observation, action_mask):
         """Select an action with the same difficulty behavior used by Web PvE."""
         self.load()
         if self.battle_model is None:
             return None
+        if self.active_runtime == "numpy":
+            return self._choose_numpy_action(observation, action_mask)
         import torch
         with torch.no_grad():
             observation = torch.as_tensor(
@@ -159,6 +282,18 @@ class PVEController:
                 return int(torch.multinomial(probabilities, 1).item())
             return int(logits.argmax(dim=-1).item())
 
+    def _choose_numpy_action(self, observation, action_mask):
+        mask = np.asarray(action_mask, dtype=bool)
+        logits = self.battle_model(observation, mask)[0][0]
+        if self.mistake_rate and self._rng.random() < self.mistake_rate:
+            legal = np.flatnonzero(~mask)
+            return int(legal[self._rng.integers(len(legal))])
+        if self.battle_temperature is not None:
+            scaled = logits.astype(np.float64) / self.battle_temperature
+            probabilities = np.exp(scaled - scaled.max())
+            return int(self._rng.choice(len(probabilities), p=probabilities / probabilities.sum()))
+        return int(logits.argmax())
+
     def _choose_battle_action(self, view):
         action_id = self.choose_battle_action(view.observation(), view.action_mask())
         if action_id is None:
@@ -205,8 +340,21 @@ class PVEController:
         position = team.get_general_position(general) if general is not None else None
         return {"row": position[0], "col": position[1]} if position else None
 
-    def step_battle_turn(self, state, ai_team, enemy_team, subphase="skill"):
-        """Execute one visible AI sub-action without hiding intermediate game state."""
+    def decide_battle_action(self, battle, ai_team, enemy_team, subphase="skill"):
+        """Choose the next sub-action without applying it; None when no decision is due."""
+        self.load()
+        if battle is None or battle.current_side is not ai_team:
+            return None
+        if battle._is_game_over() or battle.turn_count >= battle.max_turns:
+            return None
+        return self._choose_battle_action(_BattleView(battle, ai_team, enemy_team, subphase))
+
+    def step_battle_turn(self, state, ai_team, enemy_team, subphase="skill", action_id=None):
+        """Execute one visible AI sub-action without hiding intermediate game state.
+
+        ``action_id`` may carry a decision already made by ``decide_battle_action``
+        for this exact state; otherwise the policy is queried here.
+        """
         self.load()
         battle = state.battle_system
         if battle is None or battle.current_side is not ai_team:
@@ -217,7 +365,8 @@ class PVEController:
 
         from src.rl import actions
         view = _BattleView(battle, ai_team, enemy_team, subphase)
-        action_id = self._choose_battle_action(view)
+        if action_id is None:
+            action_id = self._choose_battle_action(view)
         action = actions.decode(action_id)
         actor = actions.general_at(ai_team, action.actor_slot)
         target_team = enemy_team
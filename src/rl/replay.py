@@ -0,0 +1,222 @@
+"""紧凑二进制战斗回放与确定性重演。
+
+战斗规则的骰子只消耗 ``random`` 全局流，环境在 reset 时用局种子重设它；双方
+策略的选择（包括 RandomOpponent 使用的 ``env.rng``）都体现在动作序列里。因此
+一局只需保存种子、双方阵容与阵位、先手、学习方以及按发生顺序排列的子动作编号，
+即可在 ``SanguoEnv`` 中逐步复原任意时刻的状态与 observation。
+
+单局二进制布局（小端）::
+
+    header  <3sBBqHHBBBI   magic, version, flags, seed, max_turns, turns,
+                           winner, p1 人数, p2 人数, 动作数
+    general <HB            武将 ID、阵位 row * 4 + col（先 p1 后 p2）
+    action  <H             动作编号 | 行动方 << 15（0=p1, 1=p2）
+
+动作编号使用行动方视角的 ``src.rl.actions`` 编码。多局文件由 ``<I`` 长度前缀
+的记录顺序拼接，可以直接追加写入。
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from pathlib import Path
+import struct
+from typing import Iterator, List, Optional, Tuple
+
+import numpy as np
+
+MAGIC = b"SGR"
+VERSION = 1
+HEADER = struct.Struct("<3sBBqHHBBBI")
+GENERAL = struct.Struct("<HB")
+LENGTH = struct.Struct("<I")
+SIDE_BIT = 15
+ACTION_BITS = (1 << SIDE_BIT) - 1
+
+FLAG_HAS_SEED = 1
+FLAG_SECOND_FIRST = 2
+FLAG_SECOND_LEARNS = 4
+FLAG_TIMEOUT = 8
+
+
+@dataclass
+class BattleReplay:
+    """一局战斗的最小可重演记录；``sides[i]`` 为 ``(武将 ID, row, col)`` 列表。"""
+    seed: Optional[int]
+    max_turns: int
+    sides: Tuple[list, list]
+    first_side: int
+    learning_side: int
+    actions: List[Tuple[int, int]] = field(default_factory=list)
+    turns: int = 0
+    winner_side: Optional[int] = None
+    timeout: bool = False
+
+    def record(self, side, action_id):
+        self.actions.append((side, int(action_id)))
+
+    def finish(self, turns, winner_side, timeout):
+        self.turns = int(turns)
+        self.winner_side = winner_side
+        self.timeout = bool(timeout)
+
+    def side_actions(self, side):
+        return [action_id for actor, action_id in self.actions if actor == side]
+
+    def to_bytes(self) -> bytes:
+        flags = (
+            (FLAG_HAS_SEED if self.seed is not None else 0)
+            | (FLAG_SECOND_FIRST if self.first_side else 0)
+            | (FLAG_SECOND_LEARNS if self.learning_side else 0)
+            | (FLAG_TIMEOUT if self.timeout else 0)
+        )
+        winner = 0 if self.winner_side is None else self.winner_side + 1
+        parts = [HEADER.pack(
+            MAGIC, VERSION, flags, self.seed or 0, self.max_turns, self.turns,
+            winner, len(self.sides[0]), len(self.sides[1]), len(self.actions),
+        )]
+        for side in self.sides:
+            parts.extend(GENERAL.pack(general_id, row * 4 + col) for general_id, row, col in side)
+        codes = np.fromiter(
+            (action_id | (actor << SIDE_BIT) for actor, action_id in self.actions),
+            dtype="<u2", count=len(self.actions),
+        )
+        parts.append(codes.tobytes())
+        return b"".join(parts)
+
+    @classmethod
+    def from_bytes(cls, data) -> "BattleReplay":
+        data = memoryview(data)
+        (magic, version, flags, seed, max_turns, turns, winner,
+         count1, count2, action_count) = HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise ValueError("不是战斗回放数据")
+        if version != VERSION:
+            raise ValueError(f"不支持的回放版本: {version}")
+        offset = HEADER.size
+        sides = ([], [])
+        for side, count in ((0, count1), (1, count2)):
+            for _ in range(count):
+                general_id, cell = GENERAL.unpack_from(data, offset)
+                sides[side].append((general_id, cell // 4, cell % 4))
+                offset += GENERAL.size
+        codes = np.frombuffer(data, dtype="<u2", count=action_count, offset=offset)
+        return cls(
+            seed=seed if flags & FLAG_HAS_SEED else None,
+            max_turns=max_turns,
+            sides=sides,
+            first_side=int(bool(flags & FLAG_SECOND_FIRST)),
+            learning_side=int(bool(flags & FLAG_SECOND_LEARNS)),
+            actions=[(int(code) >> SIDE_BIT, int(code) & ACTION_BITS) for code in codes],
+            turns=turns,
+            winner_side=winner - 1 if winner else None,
+            timeout=bool(flags & FLAG_TIMEOUT),
+        )
+
+
+def append_replays(path, replays) -> int:
+    """把若干局（``BattleReplay`` 或已编码 bytes）追加到文件，返回写入局数。"""
+    count = 0
+    with Path(path).open("ab") as handle:
+        for replay in replays:
+            data = replay if isinstance(replay, (bytes, bytearray)) else replay.to_bytes()
+            handle.write(LENGTH.pack(len(data)))
+            handle.write(data)
+            count += 1
+    return count
+
+
+def read_replays(path) -> Iterator[Optional[BattleReplay]]:
+    """按顺序读出文件中的各局；空记录（未录制的 episode）产出 ``None``。"""
+    data = Path(path).read_bytes()
+    offset = 0
+    while offset < len(data):
+        (length,) = LENGTH.unpack_from(data, offset)
+        offset += LENGTH.size
+        if offset + length > len(data):
+            raise ValueError(f"回放文件在偏移 {offset} 处被截断")
+        yield BattleReplay.from_bytes(data[offset:offset + length]) if length else None
+        offset += length
+
+
+class ReplayOpponent:
+    """按记录顺序给出非学习方动作的对手。"""
+
+    def __init__(self, action_ids):
+        self.action_ids = list(action_ids)
+        self.index = 0
+
+    def choose_action(self, env):
+        if self.index >= len(self.action_ids):
+            raise ValueError("回放中的对手动作已耗尽，记录与当前规则不一致")
+        action_id = self.action_ids[self.index]
+        self.index += 1
+        return action_id
+
+
+def _prepare(replay, env):
+    if replay.seed is None:
+        raise ValueError("回放缺少局种子，无法重演骰子结果")
+    if env is None:
+        from src.rl.env import SanguoEnv
+        env = SanguoEnv(max_turns=replay.max_turns)
+    return env, ReplayOpponent(replay.side_actions(1 - replay.learning_side))
+
+
+def _check_finished(replay, env, opponent):
+    if opponent.index != len(opponent.action_ids):
+        raise ValueError("回放中仍有未执行的对手动作")
+    result = env.replay
+    if (result.turns, result.winner_side, result.timeout) != (
+            replay.turns, replay.winner_side, replay.timeout):
+        raise ValueError(
+            f"重演结果与记录不符: turns={result.turns}/{replay.turns} "
+            f"winner={result.winner_side}/{replay.winner_side}"
+        )
+
+
+def resimulate(replay, env=None) -> Iterator[Tuple[object, int]]:
+    """逐个产出 ``(env, 学习方动作)``；产出时 env 处于该动作执行前的状态。
+
+    生成器结束时 env 停在终局，并已校验动作全部消耗、回合数与胜负和记录一致；
+    不一致说明规则或数据已变化，抛出 ``ValueError``。
+    """
+    env, opponent = _prepare(replay, env)
+    previous_opponent, env.opponent = env.opponent, opponent
+    try:
+        env.reset_from_replay(replay)
+        for action_id in replay.side_actions(replay.learning_side):
+            if env.done:
+                raise ValueError("回放在记录结束前已分出胜负")
+            yield env, action_id
+            env.step(action_id)
+    finally:
+        env.opponent = previous_opponent
+    _check_finished(replay, env, opponent)
+
+
+def trajectory(replay, env=None):
+    """重演一局，返回学习方视角的逐步数组，可直接用于离线训练或分析。"""
+    env, opponent = _prepare(replay, env)
+    previous_opponent, env.opponent = env.opponent, opponent
+    observations, masks, rewards, dones = [], [], [], []
+    actions = replay.side_actions(replay.learning_side)
+    try:
+        observation, info = env.reset_from_replay(replay)
+        for action_id in actions:
+            if env.done:
+                raise ValueError("回放在记录结束前已分出胜负")
+            observations.append(observation)
+            masks.append(info["action_mask"])
+            observation, reward, done, info = env.step(action_id)
+            rewards.append(reward)
+            dones.append(done)
+    finally:
+        env.opponent = previous_opponent
+    _check_finished(replay, env, opponent)
+    return {
+        "observations": np.asarray(observations, dtype=np.float32),
+        "masks": np.asarray(masks, dtype=np.bool_),
+        "actions": np.asarray(actions, dtype=np.int64),
+        "rewards": np.asarray(rewards, dtype=np.float32),
+        "dones": np.asarray(dones, dtype=np.bool_),
+    }
@@ -0,0 +1,90 @@
+"""费用约束下的阵容采样。
+
+武将费用都是 0.5 的整数倍，因此可以对候选武将做一次背包式计数：
+``counts[i, k, c]`` 为前 i 名武将中恰好选 k 名、费用恰为 c 个单位的组合数。
+有了这张表，给定人数的全部合法阵容按费用分桶的数量可以直接读出，抽样时先按
+排名选定费用桶，再在桶内均匀抽一个名次并据此还原阵容，不再需要枚举组合或
+反复抽候选再排序。``counts[i, k, c]`` 随 i 单调不减，相邻两项之差正是第 i 名
+武将作为最后一名入选者的组合数，因此每名入选武将可由一次二分定位，单次抽样
+只访问入选的武将，代价为 O(size · log n)。计数表只依赖候选费用的多重集合：
+候选先按费用排序再建表，每局洗牌得到的不同候选顺序共用同一张缓存表。
+"""
+from __future__ import annotations
+
+from bisect import bisect_right
+from functools import lru_cache
+import math
+
+import numpy as np
+
+COST_UNIT = 0.5
+
+
+def cost_units(cost) -> int:
+    units = float(cost) / COST_UNIT
+    if abs(units - round(units)) > 1e-9:
+        raise ValueError(f"武将费用必须是 {COST_UNIT} 的整数倍: {cost}")
+    return int(round(units))
+
+
+@lru_cache(maxsize=256)
+def counting_table(units, capacity, max_size):
+    """返回只读的 ``(len(units) + 1, max_size + 1, capacity + 1)`` 组合计数表。"""
+    counts = np.zeros((len(units) + 1, max_size + 1, capacity + 1), dtype=np.int64)
+    counts[0, 0, 0] = 1
+    for index, weight in enumerate(units):
+        counts[index + 1] = counts[index]
+        if weight <= capacity:
+            counts[index + 1, 1:, weight:] += counts[index, :-1, :capacity + 1 - weight]
+    counts.setflags(write=False)
+    return counts
+
+
+class RosterSampler:
+    """在一组候选武将上按人数与费用排名抽取合法阵容下标。"""
+
+    def __init__(self, costs, cost_limit, max_size):
+        units = [cost_units(cost) for cost in costs]
+        # 计数表建在按费用排序后的序列上，``order`` 把排序位置映射回候选下标。
+        self.order = sorted(range(len(units)), key=units.__getitem__)
+        self.units = tuple(units[index] for index in self.order)
+        self.capacity = max(0, math.floor(float(cost_limit) / COST_UNIT + 1e-9))
+        self.max_size = max(0, min(int(max_size), len(self.units)))
+        self.counts = counting_table(self.units, self.capacity, self.max_size)
+
+    def count(self, size):
+        """恰好 ``size`` 人且不超费用上限的阵容数。"""
+        if not 0 <= size <= self.max_size:
+            return 0
+        return int(self.counts[-1, size].sum())
+
+    def sample(self, rng, size, elite_fraction=1.0):
+        """在费用从高到低排名前 ``elite_fraction`` 的合法阵容中均匀抽取一个。
+
+        返回按候选顺序排列的下标列表；没有合法阵容时返回 ``None``。排名边界上
+        同费用的阵容之间均匀取舍。
+        """
+        total = self.count(size)
+        if not total:
+            return None
+        elite = total if elite_fraction >= 1.0 else max(1, int(round(total * elite_fraction)))
+        by_cost = self.counts[-1, size]
+        offset = rng.randrange(elite)
+        cost = self.capacity
+        while offset >= by_cost[cost]:
+            offset -= int(by_cost[cost])
+            cost -= 1
+        # 边界桶只有部分名次落在 elite 内，重新在整个桶内均匀抽名次。
+        rank = rng.randrange(int(by_cost[cost]))
+        chosen = []
+        end = len(self.units)
+        for remaining in range(size, 0, -1):
+            # 前 end 名中选 remaining 人、费用为 cost 的组合按最后一名入选者分段：
+            # 以 j 结尾的恰为 counts[j, remaining, cost] 到 counts[j + 1, ...] 的名次。
+            column = self.counts[:, remaining, cost]
+            last = bisect_right(column, rank, 0, end + 1) - 1
+            rank -= int(column[last])
+            chosen.append(self.order[last])
+            cost -= self.units[last]
+            end = last
+        return sorted(chosen)
@@ -0,0 +1,244 @@
+"""3x4 阵型的列镜像对称：observation、action mask 与动作编号的置换。
+
+把四列左右翻转（col -> 3 - col）后，只依赖列相邻关系的规则结算结果不变，
+因此一条样本的镜像也是一条合法样本。并非所有技能都满足这一点：多数区域技能
+把 ``(row, col)`` 解释为矩形左上角并夹紧到边界，石兵八阵还按行优先顺序逆序
+重排，镜像选区后的结算结果不同。``COLUMN_ASYMMETRIC_SKILLS`` 记录已知不对称的
+技能，双方阵容含有其中任一技能的 episode 不参与镜像增广；
+``check_column_symmetry`` 通过双局重放校验这份清单。
+
+本模块只处理稠密 observation/mask；rollout 压缩存储上的镜像在
+``src.rl.training.augmentation`` 中实现。
+"""
+from __future__ import annotations
+
+import numpy as np
+
+from src.rl import actions
+from src.rl.actions import ACTION_SIZE, GRID_SIZE, SKILL_AREA_BASE, SKILL_BASE
+from src.rl.observation import (
+    ATTRIBUTES, CAMPS, GENERAL_FEATURES, GENERAL_IDS, GENERAL_SCALARS,
+    GLOBAL_FEATURES, OBSERVATION_SIZE, SKILL_IDS, TARGET_TYPES,
+)
+from src.skills.skill_base import TargetType
+
+# 由 check_column_symmetry 对每个区域技能重放得到；新增技能后需重新校验。
+COLUMN_ASYMMETRIC_SKILLS = frozenset({
+    "bandit_suppression_order", "discord_strategy", "jiangdong_beauty",
+    "meticulous_offense", "momentary_order", "spear_wheel_tactics",
+    "stone_sentinel_maze", "taunt", "thunder_strike", "tooth_for_tooth",
+})
+
+COLUMN_FEATURE = 17  # GENERAL_SCALARS 中的 pos[1] / 3.0
+FORCED_TARGET_OFFSET = GENERAL_FEATURES - GRID_SIZE
+TARGET_TYPE_OFFSET = (
+    GENERAL_SCALARS + len(GENERAL_IDS) + len(SKILL_IDS) + len(CAMPS) + len(ATTRIBUTES)
+)
+# 这些目标类型的 skill_target 动作以 target 0 作为占位，镜像时不得置换目标。
+_TARGETED_TYPES = {
+    TargetType.SINGLE_ENEMY.name, TargetType.SINGLE_ALLY.name,
+    TargetType.FRONT_ROW_ENEMY.name, TargetType.BACK_ROW_ENEMY.name,
+    TargetType.FRONT_ROW_ALLY.name, TargetType.BACK_ROW_ALLY.name,
+}
+PLACEHOLDER_TARGET_TYPES = np.asarray([
+    name not in _TARGETED_TYPES
+    and name not in (TargetType.AREA_ENEMY.name, TargetType.AREA_ALLY.name)
+    for name in TARGET_TYPES
+])
+
+
+def mirror_slot(slot):
+    return slot - slot % 4 + 3 - slot % 4
+
+
+SLOT_MIRROR = np.asarray([mirror_slot(slot) for slot in range(GRID_SIZE)])
+
+
+def _action_mirror():
+    mirrored = np.arange(ACTION_SIZE)
+    for action_id in range(SKILL_BASE, ACTION_SIZE):
+        action = actions.decode(action_id)
+        if action.kind == "skill_target":
+            mirrored[action_id] = actions.encode(actions.Action(
+                "skill_target", SLOT_MIRROR[action.actor_slot], SLOT_MIRROR[action.target_slot],
+            ))
+        elif action.kind == "skill_area":
+            mirrored[action_id] = actions.encode(actions.Action(
+                "skill_area", SLOT_MIRROR[action.actor_slot],
+                row=action.row, col=3 - action.col,
+            ))
+        else:
+            mirrored[action_id] = actions.encode(actions.Action(
+                "attack", SLOT_MIRROR[action.actor_slot], SLOT_MIRROR[action.target_slot],
+                guess=action.guess,
+            ))
+    return mirrored
+
+
+ACTION_MIRROR = _action_mirror()
+
+
+def _observation_permutation():
+    permutation = np.arange(OBSERVATION_SIZE)
+    for side in range(2):
+        side_offset = GLOBAL_FEATURES + side * GRID_SIZE * GENERAL_FEATURES
+        for slot in range(GRID_SIZE):
+            source = side_offset + slot * GENERAL_FEATURES
+            destination = side_offset + SLOT_MIRROR[slot] * GENERAL_FEATURES
+            block = np.arange(source, source + GENERAL_FEATURES)
+            forced = block[FORCED_TARGET_OFFSET:]
+            block[FORCED_TARGET_OFFSET:] = forced[SLOT_MIRROR]
+            permutation[destination:destination + GENERAL_FEATURES] = block
+    return permutation
+
+
+OBSERVATION_PERMUTATION = _observation_permutation()
+_COLUMN_INDICES = np.asarray([
+    GLOBAL_FEATURES + slot * GENERAL_FEATURES + COLUMN_FEATURE
+    for slot in range(GRID_SIZE * 2)
+])
+_PRESENT_INDICES = _COLUMN_INDICES - COLUMN_FEATURE
+
+
+def placeholder_actors(observations):
+    """(N, 12) bool：己方各槽位武将的 skill_target 动作是否使用占位目标。"""
+    observations = np.asarray(observations).reshape(-1, OBSERVATION_SIZE)
+    self_slots = observations[:, GLOBAL_FEATURES:GLOBAL_FEATURES + GRID_SIZE * GENERAL_FEATURES]
+    self_slots = self_slots.reshape(len(observations), GRID_SIZE, GENERAL_FEATURES)
+    target_types = self_slots[..., TARGET_TYPE_OFFSET:TARGET_TYPE_OFFSET + len(TARGET_TYPES)]
+    return (target_types[..., PLACEHOLDER_TARGET_TYPES] > 0).any(axis=-1)
+
+
+def mirror_observations(observations):
+    observations = np.asarray(observations, dtype=np.float32)
+    mirrored = observations[..., OBSERVATION_PERMUTATION]
+    present = mirrored[..., _PRESENT_INDICES] > 0
+    mirrored[..., _COLUMN_INDICES] = np.where(
+        present, 1.0 - mirrored[..., _COLUMN_INDICES], mirrored[..., _COLUMN_INDICES],
+    )
+    return mirrored
+
+
+def _keep_placeholder_targets(source, destination, placeholders):
+    samples, slots = np.nonzero(placeholders)
+    if not len(samples):
+        return
+    targets = np.arange(GRID_SIZE)
+    blocks = SKILL_BASE + slots[:, None] * GRID_SIZE + targets
+    mirrored_blocks = SKILL_BASE + SLOT_MIRROR[slots][:, None] * GRID_SIZE + targets
+    destination[samples[:, None], mirrored_blocks] = source[samples[:, None], blocks]
+
+
+def mirror_masks(masks, observations=None, *, placeholders=None):
+    """镜像 action mask；占位目标技能的 target 0 保持不动。
+
+    ``placeholders`` 为 ``placeholder_actors`` 的结果，已算好时可代替 observation 传入。
+    """
+    if placeholders is None:
+        placeholders = placeholder_actors(observations)
+    masks = np.asarray(masks)
+    mirrored = np.empty_like(masks)
+    mirrored[:, ACTION_MIRROR] = masks
+    _keep_placeholder_targets(masks, mirrored, placeholders)
+    return mirrored
+
+
+def mirror_actions(action_ids, observations=None, *, placeholders=None):
+    action_ids = np.asarray(action_ids, dtype=np.int64)
+    mirrored = ACTION_MIRROR[action_ids]
+    if placeholders is None:
+        placeholders = placeholder_actors(observations)
+    skill_target = (action_ids >= SKILL_BASE) & (action_ids < SKILL_AREA_BASE)
+    actor = np.where(skill_target, (action_ids - SKILL_BASE) // GRID_SIZE, 0)
+    keep_target = skill_target & placeholders[np.arange(len(action_ids)), actor]
+    target = (action_ids - SKILL_BASE) % GRID_SIZE
+    mirrored[keep_target] = SKILL_BASE + SLOT_MIRROR[actor[keep_target]] * GRID_SIZE + target[keep_target]
+    return mirrored
+
+
+def roster_is_column_symmetric(*teams):
+    """双方阵容都不含已知不对称技能时，本局样本可以镜像。"""
+    return not any(
+        general.active_skill and general.active_skill.skill_id in COLUMN_ASYMMETRIC_SKILLS
+        for team in teams for general in team.generals
+    )
+
+
+def check_column_symmetry(rosters, seed, *, max_steps=400, opponent_seed=0):
+    """以相同种子分别对原阵型和列镜像阵型重放同一局，逐步比较镜像后的状态。
+
+    学习方和对手都使用随机合法动作；镜像局执行对应的镜像动作。返回首个不一致
+    步的描述，完全一致时返回 ``None``。
+    """
+    from src.rl.env import SanguoEnv
+    from src.rl.observation import build_observation
+
+    class _Recorder:
+        def __init__(self, rng):
+            self.rng = rng
+            self.history = []
+
+        def choose_action(self, env):
+            legal = np.flatnonzero(env.action_mask() == 0)
+            action = int(self.rng.choice(legal))
+            self.history.append((build_observation(env), env.action_mask(), action))
+            return action
+
+    class _Replayer:
+        def __init__(self, history):
+            self.history = iter(history)
+            self.mismatch = None
+
+        def choose_action(self, env):
+            recorded = next(self.history, None)
+            if recorded is None:
+                self.mismatch = self.mismatch or "opponent turn length"
+                return int(np.flatnonzero(env.action_mask() == 0)[-1])
+            observation, mask, action = recorded
+            expected = mirror_observations(observation[None])[0]
+            if self.mismatch is None and not np.allclose(build_observation(env), expected, atol=1e-6):
+                self.mismatch = "opponent observation"
+            if self.mismatch is None and not np.array_equal(
+                env.action_mask(), mirror_masks(mask[None], observation[None])[0],
+            ):
+                self.mismatch = "opponent action mask"
+            return int(mirror_actions([action], observation[None])[0])
+
+    class _MirroredEnv(SanguoEnv):
+        def _place_randomly(self, player):
+            cells = self.rng.sample([(r, c) for r in range(3) for c in range(4)], len(player.selected_generals))
+            for general, (row, col) in zip(player.selected_generals, cells):
+                player.team.position_general(general, row, 3 - col)
+            player.team.complete_formation_setup()
+
+    rng = np.random.default_rng(opponent_seed)
+    recorder = _Recorder(rng)
+    original = SanguoEnv(recorder, max_turns=60)
+    observation, info = original.reset(seed, rosters=rosters)
+    trajectory = [(observation, info["action_mask"], None)]
+    for _ in range(max_steps):
+        legal = np.flatnonzero(info["action_mask"] == 0)
+        action = int(rng.choice(legal))
+        trajectory[-1] = (observation, info["action_mask"], action)
+        observation, _, done, info = original.step(action)
+        if done:
+            break
+        trajectory.append((observation, info["action_mask"], None))
+
+    replayer = _Replayer(recorder.history)
+    mirrored = _MirroredEnv(replayer, max_turns=60)
+    observation, info = mirrored.reset(seed, rosters=rosters)
+    for step, (expected, expected_mask, action) in enumerate(trajectory):
+        if replayer.mismatch:
+            return f"step {step}: {replayer.mismatch}"
+        if not np.allclose(observation, mirror_observations(expected[None])[0], atol=1e-6):
+            return f"step {step}: observation"
+        if not np.array_equal(info["action_mask"], mirror_masks(expected_mask[None], expected[None])[0]):
+            return f"step {step}: action mask"
+        if action is None:
+            break
+        try:
+            observation, _, _, info = mirrored.step(int(mirror_actions([action], expected[None])[0]))
+        except ValueError:
+            return f"step {step}: mirrored action is illegal"
+    return replayer.mismatch
@@ -0,0 +1,117 @@
+"""PPO batch 的列镜像数据增广（可选）。
+
+阵容不含列不对称技能的样本会追加一份列镜像副本：observation 槽位、action
+mask 与动作编号按 ``src.rl.symmetry`` 置换，advantage/return 沿用原样本；
+压缩存储（``CompressedObservations``/``PackedMasks``）上的镜像也在这里完成。
+PPO 的比率需要行为策略在镜像样本上的 log-prob；同步采样时 learner 在更新前的
+权重就是行为策略，所以这里用当前模型重新计算，而不是复制原 log-prob。
+"""
+from __future__ import annotations
+
+import numpy as np
+
+from src.rl import symmetry
+from src.rl.actions import GRID_SIZE
+from src.rl.observation import GENERAL_SCALARS, TARGET_TYPES
+from src.rl.training import rollout_storage
+from src.rl.training.rollout_storage import IDENTITY_FEATURES, CompressedObservations, PackedMasks
+
+AUGMENTED_KEYS = ("observations", "masks", "actions", "log_probs", "advantages", "returns")
+
+
+def placeholder_actors(observations):
+    """``symmetry.placeholder_actors`` 的压缩存储版本：按身份表逐行判断一次再查表。"""
+    if not isinstance(observations, CompressedObservations):
+        return symmetry.placeholder_actors(observations)
+    start = symmetry.TARGET_TYPE_OFFSET - GENERAL_SCALARS
+    rows = observations.identity_rows[:, start:start + len(TARGET_TYPES)]
+    per_row = np.append((rows[:, symmetry.PLACEHOLDER_TARGET_TYPES] > 0).any(axis=1), False)
+    return per_row[observations.identity_index[:, :GRID_SIZE]]
+
+
+def mirror_compressed(observations):
+    """在压缩存储上镜像：身份表不变，动态表变换一次，槽位索引按列翻转。"""
+    dynamic = observations.dynamic_rows.copy()
+    dynamic[:, symmetry.COLUMN_FEATURE] = 1.0 - dynamic[:, symmetry.COLUMN_FEATURE]
+    forced_offset = symmetry.FORCED_TARGET_OFFSET - IDENTITY_FEATURES
+    dynamic[:, forced_offset:] = dynamic[:, forced_offset:][:, symmetry.SLOT_MIRROR]
+    slot_permutation = np.concatenate((symmetry.SLOT_MIRROR, symmetry.SLOT_MIRROR + GRID_SIZE))
+    identity_index = np.empty_like(observations.identity_index)
+    dynamic_index = np.empty_like(observations.dynamic_index)
+    identity_index[:, slot_permutation] = observations.identity_index
+    dynamic_index[:, slot_permutation] = observations.dynamic_index
+    return CompressedObservations(
+        global_features=observations.global_features.copy(),
+        identity_rows=observations.identity_rows,
+        dynamic_rows=dynamic,
+        identity_index=identity_index,
+        dynamic_index=dynamic_index,
+    )
+
+
+def mirror_masks(masks, placeholders):
+    if isinstance(masks, PackedMasks):
+        dense = symmetry.mirror_masks(masks.dense(), placeholders=placeholders)
+        return PackedMasks.from_dense(dense, masks.action_size)
+    return symmetry.mirror_masks(masks, placeholders=placeholders)
+
+
+def mirrored_samples(batch):
+    """返回 batch 中可镜像样本的镜像副本（不含 log_probs），没有时返回 None。"""
+    symmetric = batch.get("column_symmetric")
+    if symmetric is None:
+        return None
+    selected = np.flatnonzero(symmetric)
+    if not len(selected):
+        return None
+    observations = rollout_storage.take(batch["observations"], selected)
+    if isinstance(observations, CompressedObservations):
+        mirrored_observations = mirror_compressed(observations)
+    else:
+        mirrored_observations = symmetry.mirror_observations(observations)
+    placeholders = placeholder_actors(observations)
+    return {
+        "observations": mirrored_observations,
+        "masks": mirror_masks(rollout_storage.take(batch["masks"], selected), placeholders),
+        "actions": symmetry.mirror_actions(
+            np.asarray(batch["actions"])[selected], placeholders=placeholders,
+        ),
+        "advantages": np.asarray(batch["advantages"])[selected],
+        "returns": np.asarray(batch["returns"])[selected],
+    }
+
+
+def behavior_log_probs(model, observations, masks, actions, *, device, chunk_size=512):
+    import torch
+
+    observations = rollout_storage.to_device(observations, device, torch.float32)
+    masks = rollout_storage.to_device(masks, device, torch.bool)
+    actions = torch.as_tensor(actions, dtype=torch.long, device=device)
+    log_probs = []
+    with torch.no_grad():
+        for start in range(0, len(actions), chunk_size):
+            selected = slice(start, start + chunk_size)
+            logits, _ = model(observations[selected], masks[selected])
+            distribution = torch.distributions.Categorical(logits=logits)
+            log_probs.append(distribution.log_prob(actions[selected]).cpu())
+    return torch.cat(log_probs).numpy().astype(np.float32)
+
+
+def augment_column_mirror(batch, model, *, device, chunk_size=512):
+    """追加列镜像样本，返回 (新 batch, 镜像样本数)。"""
+    mirrored = mirrored_samples(batch)
+    if mirrored is None:
+        return batch, 0
+    mirrored["log_probs"] = behavior_log_probs(
+        model, mirrored["observations"], mirrored["masks"], mirrored["actions"],
+        device=device, chunk_size=chunk_size,
+    )
+    augmented = dict(batch)
+    for key in AUGMENTED_KEYS:
+        augmented[key] = rollout_storage.concatenate([batch[key], mirrored[key]])
+    # 镜像样本不再参与下一轮增广。
+    augmented["column_symmetric"] = np.concatenate((
+        np.asarray(batch["column_symmetric"], dtype=np.bool_),
+        np.zeros(len(mirrored["actions"]), dtype=np.bool_),
+    ))
+    return augmented, len(mirrored["actions"])
@@ -1,32 +1,90 @@
-"""可恢复、原子化的 PPO checkpoint 管理。"""
+"""可恢复、原子化的 PPO checkpoint 管理。
+
+``save`` 在调用线程里只做一次张量到 CPU 的快照，序列化、写盘、latest/best
+别名与 prune 都交给后台写线程；同一时刻最多一个写入在进行，新的 save 会先等上
+一个完成。别名优先用硬链接指向编号文件，文件系统不支持时退化为复制，二者都经
+临时文件加 ``os.replace`` 原子替换。
+"""
 from __future__ import annotations
 
 import os
 from pathlib import Path
+import shutil
+import threading
+
+
+def cpu_snapshot(value):
+    """递归复制 state 中的张量到 CPU，使训练继续原地更新参数时不影响待写快照。"""
+    import torch
+    if isinstance(value, torch.Tensor):
+        return value.detach().to("cpu", copy=True)
+    if isinstance(value, dict):
+        return type(value)((key, cpu_snapshot(item)) for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        return type(value)(cpu_snapshot(item) for item in value)
+    return value
 
 
 class CheckpointManager:
-    def __init__(self, directory="artifacts/rl/checkpoints", keep_last=5):
+    def __init__(self, directory="artifacts/rl/checkpoints", keep_last=5, *, background=True):
         self.directory = Path(directory)
         self.directory.mkdir(parents=True, exist_ok=True)
         self.keep_last = keep_last
+        self.background = background
+        self._writer = None
+        self._error = None
 
     def save(self, state, update, *, is_best=False):
-        import torch
+        """提交一次 checkpoint，返回编号文件路径；后台模式下返回时文件可能尚未落盘。"""
         numbered = self.directory / f"ppo_step_{update:06d}.pt"
+        snapshot = cpu_snapshot(state)
+        self.wait()
+        if not self.background:
+            self._write(snapshot, numbered, is_best)
+            return numbered
+        self._writer = threading.Thread(
+            target=self._write_in_background, args=(snapshot, numbered, is_best),
+            name="checkpoint-writer",
+        )
+        self._writer.start()
+        return numbered
+
+    def wait(self):
+        """等待进行中的写入；后台写入失败时在这里重新抛出。"""
+        if self._writer is not None:
+            self._writer.join()
+            self._writer = None
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
+
+    close = wait
+
+    def _write_in_background(self, snapshot, numbered, is_best):
+        try:
+            self._write(snapshot, numbered, is_best)
+        except BaseException as error:  # 交给下一次 wait 在训练线程里抛出
+            self._error = error
+
+    def _write(self, snapshot, numbered, is_best):
+        import torch
         temporary = numbered.with_suffix(".tmp")
-        torch.save(state, temporary)
+        torch.save(snapshot, temporary)
         os.replace(temporary, numbered)
-        self._atomic_save(torch, state, self.directory / "ppo_latest.pt")
+        self._alias(numbered, self.directory / "ppo_latest.pt")
         if is_best:
-            self._atomic_save(torch, state, self.directory / "ppo_best.pt")
+            self._alias(numbered, self.directory / "ppo_best.pt")
         self.prune()
-        return numbered
 
     @staticmethod
-    def _atomic_save(torch, state, path):
+    def _alias(source, path):
         temporary = path.with_suffix(".tmp")
-        torch.save(state, temporary)
+        if temporary.exists():
+            temporary.unlink()
+        try:
+            os.link(source, temporary)
+        except OSError:
+            shutil.copyfile(source, temporary)
         os.replace(temporary, path)
 
     def prune(self):
@@ -0,0 +1,347 @@
+"""按列存储的 episode telemetry。
+
+取代逐行 JSON 的 ``episodes.jsonl``：每一列是一个只追加的原始小端二进制文件，
+定长列可以直接 ``np.memmap``，变长列（字符串、协同事件 JSON）用 Arrow 式的
+``数据 + 结束偏移`` 两个文件保存。``meta.json`` 记录列类型与已提交行数，追加时
+先写列文件再原子替换 meta，进程中断只会留下被下次打开截掉的尾部。
+
+阵容、阵位与武将统计按最多 12 个槽位补齐，空槽的武将 ID 为 -1。``update`` 列
+在训练中单调不减时按二分查找切片，否则退化为布尔筛选。
+"""
+from __future__ import annotations
+
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+
+STORE_SCHEMA = "sanguo-episode-store-v1"
+MAX_SLOTS = 12
+OUTCOMES = ("loss", "win", "draw")
+ACTION_KINDS = ("skill", "attack", "end")
+
+FIXED_COLUMNS = {
+    "update": ("<i4", ()),
+    "outcome": ("i1", ()),
+    "timeout": ("?", ()),
+    "turns": ("<i4", ()),
+    "steps": ("<i4", ()),
+    "episode_reward": ("<f4", ()),
+    "no_progress_count": ("<i4", ()),
+    "seed": ("<i8", ()),
+    "action_counts": ("<i4", (len(ACTION_KINDS),)),
+    "roster_self": ("<i2", (MAX_SLOTS,)),
+    "roster_enemy": ("<i2", (MAX_SLOTS,)),
+    "formation_self_ids": ("<i2", (MAX_SLOTS,)),
+    "formation_self_cells": ("i1", (MAX_SLOTS,)),
+    "formation_enemy_ids": ("<i2", (MAX_SLOTS,)),
+    "formation_enemy_cells": ("i1", (MAX_SLOTS,)),
+    "self_general_ids": ("<i2", (MAX_SLOTS,)),
+    "self_hp_fraction": ("<f4", (MAX_SLOTS,)),
+    "self_survived": ("?", (MAX_SLOTS,)),
+    "self_damage": ("<f4", (MAX_SLOTS,)),
+    "self_skill_uses": ("<i4", (MAX_SLOTS,)),
+    "enemy_general_ids": ("<i2", (MAX_SLOTS,)),
+    "enemy_hp_fraction": ("<f4", (MAX_SLOTS,)),
+    "enemy_survived": ("?", (MAX_SLOTS,)),
+}
+RAGGED_COLUMNS = (
+    "winner_name", "learning_team_name", "enemy_team_name", "opponent_id", "synergy_events",
+)
+
+
+def pad_ids(values):
+    """武将 ID 列表补齐为 ``MAX_SLOTS`` 个槽位，空槽为 -1。"""
+    row = np.full(MAX_SLOTS, -1, dtype=np.int16)
+    ids = [int(value) for value in values][:MAX_SLOTS]
+    row[:len(ids)] = ids
+    return row
+
+
+def pad_formation(items):
+    """阵位字典列表转换为补齐的 (武将 ID, 格子 row * 4 + col) 两行。"""
+    ids = np.full(MAX_SLOTS, -1, dtype=np.int16)
+    cells = np.full(MAX_SLOTS, -1, dtype=np.int8)
+    for slot, item in enumerate(list(items)[:MAX_SLOTS]):
+        ids[slot] = int(item["general_id"])
+        cells[slot] = int(item["row"]) * 4 + int(item["col"])
+    return ids, cells
+
+
+def _general_records(records, damage=None, skill_uses=None):
+    ids = np.full(MAX_SLOTS, -1, dtype=np.int16)
+    hp = np.zeros(MAX_SLOTS, dtype=np.float32)
+    survived = np.zeros(MAX_SLOTS, dtype=np.bool_)
+    damage_row = np.zeros(MAX_SLOTS, dtype=np.float32)
+    uses_row = np.zeros(MAX_SLOTS, dtype=np.int32)
+    # JSONL 中字典键已变成字符串，这里统一按整数武将 ID 查找。
+    damage = {int(key): float(value) for key, value in (damage or {}).items()}
+    skill_uses = {int(key): int(value) for key, value in (skill_uses or {}).items()}
+    for slot, record in enumerate(list(records)[:MAX_SLOTS]):
+        general_id = int(record["general_id"])
+        ids[slot] = general_id
+        hp[slot] = float(record["hp_fraction"])
+        survived[slot] = bool(record["survived"])
+        damage_row[slot] = damage.pop(general_id, 0.0)
+        uses_row[slot] = skill_uses.pop(general_id, 0)
+    return ids, hp, survived, damage_row, uses_row
+
+
+def encode_rows(payloads):
+    """把 EpisodeSummary 字典（含 ``update``）转换为 ``{列名: 数组或 bytes 列表}``。"""
+    fixed = {name: [] for name in FIXED_COLUMNS}
+    ragged = {name: [] for name in RAGGED_COLUMNS}
+    for item in payloads:
+        outcome = item.get("outcome")
+        fixed["update"].append(int(item.get("update", 0)))
+        fixed["outcome"].append(OUTCOMES.index(outcome) if outcome in OUTCOMES else -1)
+        fixed["timeout"].append(bool(item.get("timeout")))
+        for name in ("turns", "steps", "no_progress_count", "seed"):
+            fixed[name].append(int(item.get(name) or 0))
+        fixed["episode_reward"].append(float(item.get("episode_reward") or 0.0))
+        counts = item.get("action_counts") or {}
+        fixed["action_counts"].append([int(counts.get(kind, 0)) for kind in ACTION_KINDS])
+        fixed["roster_self"].append(pad_ids(item.get("roster_self") or []))
+        fixed["roster_enemy"].append(pad_ids(item.get("roster_enemy") or []))
+        for side in ("self", "enemy"):
+            ids, cells = pad_formation(item.get(f"formation_{side}") or [])
+            fixed[f"formation_{side}_ids"].append(ids)
+            fixed[f"formation_{side}_cells"].append(cells)
+        ids, hp, survived, damage, uses = _general_records(
+            item.get("learning_generals") or [], item.get("damage_by_general_id"),
+            item.get("skill_usage_by_general_id"),
+        )
+        fixed["self_general_ids"].append(ids)
+        fixed["self_hp_fraction"].append(hp)
+        fixed["self_survived"].append(survived)
+        fixed["self_damage"].append(damage)
+        fixed["self_skill_uses"].append(uses)
+        ids, hp, survived, _, _ = _general_records(item.get("enemy_generals") or [])
+        fixed["enemy_general_ids"].append(ids)
+        fixed["enemy_hp_fraction"].append(hp)
+        fixed["enemy_survived"].append(survived)
+        for name in RAGGED_COLUMNS[:-1]:
+            ragged[name].append(str(item.get(name) or "").encode("utf-8"))
+        events = item.get("synergy_events") or []
+        ragged["synergy_events"].append(
+            json.dumps(events, ensure_ascii=False).encode("utf-8") if events else b""
+        )
+    columns = {
+        name: np.asarray(values, dtype=FIXED_COLUMNS[name][0]).reshape((-1,) + FIXED_COLUMNS[name][1])
+        for name, values in fixed.items()
+    }
+    columns.update(ragged)
+    return columns
+
+
+class EpisodeStore:
+    """只追加的列式 episode 写入端；同一目录同一时刻只应有一个写入者。"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        meta_path = self.path / "meta.json"
+        if meta_path.exists():
+            self.meta = json.loads(meta_path.read_text(encoding="utf-8"))
+            if self.meta.get("schema") != STORE_SCHEMA:
+                raise ValueError(f"不支持的 episode store: {self.meta.get('schema')}")
+        else:
+            self.meta = {
+                "schema": STORE_SCHEMA, "rows": 0, "sorted": True, "last_update": None,
+                "columns": {name: {"dtype": dtype, "shape": list(shape)}
+                            for name, (dtype, shape) in FIXED_COLUMNS.items()},
+                "ragged": {name: 0 for name in RAGGED_COLUMNS},
+            }
+        self._truncate_uncommitted()
+
+    @property
+    def rows(self):
+        return self.meta["rows"]
+
+    def _truncate_uncommitted(self):
+        rows = self.meta["rows"]
+        for name, (dtype, shape) in FIXED_COLUMNS.items():
+            self._truncate(f"{name}.bin", rows * np.dtype(dtype).itemsize * int(np.prod(shape)))
+        for name in RAGGED_COLUMNS:
+            self._truncate(f"{name}.offsets.bin", rows * 8)
+            self._truncate(f"{name}.bin", self.meta["ragged"][name])
+
+    def _truncate(self, filename, size):
+        path = self.path / filename
+        with path.open("ab") as handle:
+            if handle.tell() != size:
+                handle.truncate(size)
+
+    def append(self, payloads):
+        """追加一批 EpisodeSummary 字典，返回写入行数。"""
+        payloads = list(payloads)
+        if not payloads:
+            return 0
+        columns = encode_rows(payloads)
+        for name in FIXED_COLUMNS:
+            with (self.path / f"{name}.bin").open("ab") as handle:
+                handle.write(np.ascontiguousarray(columns[name]).tobytes())
+        ragged_sizes = dict(self.meta["ragged"])
+        for name in RAGGED_COLUMNS:
+            values = columns[name]
+            ends = ragged_sizes[name] + np.cumsum([len(value) for value in values], dtype=np.int64)
+            with (self.path / f"{name}.bin").open("ab") as handle:
+                handle.write(b"".join(values))
+            with (self.path / f"{name}.offsets.bin").open("ab") as handle:
+                handle.write(ends.astype("<i8").tobytes())
+            ragged_sizes[name] = int(ends[-1])
+        updates = columns["update"]
+        last = self.meta["last_update"]
+        ordered = bool(np.all(np.diff(updates) >= 0)) and (last is None or int(updates[0]) >= last)
+        self.meta.update({
+            "rows": self.meta["rows"] + len(payloads),
+            "sorted": self.meta["sorted"] and ordered,
+            "last_update": int(updates[-1]),
+            "ragged": ragged_sizes,
+        })
+        temporary = self.path / "meta.json.tmp"
+        temporary.write_text(json.dumps(self.meta, ensure_ascii=False, indent=2), encoding="utf-8")
+        os.replace(temporary, self.path / "meta.json")
+        return len(payloads)
+
+
+class EpisodeTable:
+    """只读视图：定长列按需 memmap，打开时不解析任何数据。"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.meta = json.loads((self.path / "meta.json").read_text(encoding="utf-8"))
+        if self.meta.get("schema") != STORE_SCHEMA:
+            raise ValueError(f"不支持的 episode store: {self.meta.get('schema')}")
+        self.rows = int(self.meta["rows"])
+        self._columns = {}
+
+    def __len__(self):
+        return self.rows
+
+    def __getitem__(self, name):
+        return self.column(name)
+
+    def column(self, name):
+        if name not in self._columns:
+            spec = self.meta["columns"][name]
+            shape = (self.rows, *spec["shape"])
+            if self.rows == 0:
+                self._columns[name] = np.empty(shape, dtype=spec["dtype"])
+            else:
+                self._columns[name] = np.memmap(
+                    self.path / f"{name}.bin", dtype=spec["dtype"], mode="r", shape=shape,
+                )
+        return self._columns[name]
+
+    def strings(self, name, rows=None):
+        """解码变长列；``rows`` 为下标数组或切片，默认全部。"""
+        if self.rows == 0:
+            return []
+        ends = np.memmap(self.path / f"{name}.offsets.bin", dtype="<i8", mode="r", shape=(self.rows,))
+        data = np.memmap(self.path / f"{name}.bin", dtype=np.uint8, mode="r") if ends[-1] else None
+        indices = np.arange(self.rows)[rows if rows is not None else slice(None)]
+        values = []
+        for index in np.atleast_1d(indices):
+            start = int(ends[index - 1]) if index else 0
+            end = int(ends[index])
+            values.append(bytes(data[start:end]).decode("utf-8") if end > start else "")
+        return values
+
+    def update_rows(self, min_update=None, max_update=None):
+        """返回 ``min_update <= update < max_update`` 的行下标。"""
+        updates = self.column("update")
+        if self.meta.get("sorted", False):
+            start = 0 if min_update is None else int(np.searchsorted(updates, min_update, "left"))
+            end = self.rows if max_update is None else int(np.searchsorted(updates, max_update, "left"))
+            return np.arange(start, max(start, end))
+        keep = np.ones(self.rows, dtype=np.bool_)
+        if min_update is not None:
+            keep &= updates >= min_update
+        if max_update is not None:
+            keep &= updates < max_update
+        return np.flatnonzero(keep)
+
+    def records(self, rows=None):
+        """把所选行还原成 ``episodes.jsonl`` 行格式的字典（武将快照不含名字）。"""
+        indices = np.atleast_1d(np.arange(self.rows)[rows if rows is not None else slice(None)])
+        strings = {name: self.strings(name, indices) for name in RAGGED_COLUMNS}
+        column = self.column
+        result = []
+        for position, index in enumerate(indices):
+            def ids(name):
+                return [int(value) for value in column(name)[index] if value >= 0]
+
+            def formation(side):
+                return [
+                    {"general_id": int(general_id), "row": int(cell) // 4, "col": int(cell) % 4}
+                    for general_id, cell in zip(column(f"formation_{side}_ids")[index],
+                                                column(f"formation_{side}_cells")[index])
+                    if general_id >= 0
+                ]
+
+            def generals(side):
+                return [
+                    {"general_id": int(general_id), "hp_fraction": float(hp), "survived": bool(alive)}
+                    for general_id, hp, alive in zip(column(f"{side}_general_ids")[index],
+                                                     column(f"{side}_hp_fraction")[index],
+                                                     column(f"{side}_survived")[index])
+                    if general_id >= 0
+                ]
+
+            self_ids = column("self_general_ids")[index]
+            outcome = int(column("outcome")[index])
+            events = strings["synergy_events"][position]
+            result.append({
+                "outcome": OUTCOMES[outcome] if outcome >= 0 else "",
+                "winner_name": strings["winner_name"][position],
+                "timeout": bool(column("timeout")[index]),
+                "turns": int(column("turns")[index]),
+                "steps": int(column("steps")[index]),
+                "episode_reward": float(column("episode_reward")[index]),
+                "no_progress_count": int(column("no_progress_count")[index]),
+                "action_counts": dict(zip(ACTION_KINDS, map(int, column("action_counts")[index]))),
+                "damage_by_general_id": {
+                    int(general_id): float(value)
+                    for general_id, value in zip(self_ids, column("self_damage")[index])
+                    if general_id >= 0 and value
+                },
+                "learning_team_name": strings["learning_team_name"][position],
+                "enemy_team_name": strings["enemy_team_name"][position],
+                "learning_generals": generals("self"),
+                "enemy_generals": generals("enemy"),
+                "opponent_id": strings["opponent_id"][position],
+                "seed": int(column("seed")[index]),
+                "roster_self": ids("roster_self"),
+                "roster_enemy": ids("roster_enemy"),
+                "formation_self": formation("self"),
+                "formation_enemy": formation("enemy"),
+                "skill_usage_by_general_id": {
+                    int(general_id): int(value)
+                    for general_id, value in zip(self_ids, column("self_skill_uses")[index])
+                    if general_id >= 0 and value
+                },
+                "synergy_events": json.loads(events) if events else [],
+                "update": int(column("update")[index]),
+            })
+        return result
+
+
+def convert_jsonl(source, destination, batch_size=4096):
+    """把旧的 ``episodes.jsonl`` 追加转换进列式 store，返回 (写入行数, 跳过行数)。"""
+    store = EpisodeStore(destination)
+    written = skipped = 0
+    batch = []
+    with Path(source).open(encoding="utf-8") as stream:
+        for line in stream:
+            try:
+                batch.append(json.loads(line))
+            except json.JSONDecodeError:
+                skipped += 1
+                continue
+            if len(batch) >= batch_size:
+                written += store.append(batch)
+                batch = []
+    written += store.append(batch)
+    return written, skipped
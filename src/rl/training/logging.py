@@ -1,22 +1,39 @@
-"""训练标量的控制台、CSV 与 TensorBoard 输出。"""
+"""训练标量的控制台、CSV 与 TensorBoard 输出。
+
+episode telemetry 写入 ``episodes/`` 列式 store（见 ``episode_store``）；回放按
+``src.rl.replay`` 的二进制格式追加到 ``replays.bin``，第 n 行 episode 与第 n 条
+回放记录对应。
+
+``log``/``log_episodes`` 只把记录放进有界队列，由写线程成批写 CSV、store、回放、
+TensorBoard 与控制台，并按 ``flush_interval`` 秒刷新 CSV；``flush`` 等待队列写
+完，``close`` 写完剩余记录后关闭文件。写线程出错时在下一次调用中重新抛出。"""
 from __future__ import annotations
 
 import csv
 from dataclasses import asdict, is_dataclass
 import json
 from pathlib import Path
-from time import strftime
+import queue
+import threading
+from time import monotonic, strftime
+
+from src.rl.replay import append_replays
+from src.rl.training.episode_store import EpisodeStore
+
+_STOP = object()
 
 
 class TrainLogger:
-    def __init__(self, root="artifacts/rl/runs", run_name=None, config=None):
+    def __init__(self, root="artifacts/rl/runs", run_name=None, config=None, *,
+                 flush_interval=2.0, queue_size=1024):
         name = run_name or f"ppo-{strftime('%Y%m%d-%H%M%S')}"
         self.path = Path(root) / name
         self.path.mkdir(parents=True, exist_ok=True)
         self.csv_file = (self.path / "metrics.csv").open("w", newline="", encoding="utf-8")
         self.writer = csv.DictWriter(self.csv_file, fieldnames=("step", "tag", "value"))
         self.writer.writeheader()
-        self.episodes_file = (self.path / "episodes.jsonl").open("a", encoding="utf-8")
+        self.episodes = EpisodeStore(self.path / "episodes")
+        self.replays_path = self.path / "replays.bin"
         self.summary_writer = None
         try:
             from torch.utils.tensorboard import SummaryWriter
@@ -27,6 +44,12 @@ class TrainLogger:
             (self.path / "resolved_config.json").write_text(
                 json.dumps(config, ensure_ascii=False, indent=2), encoding="utf-8"
             )
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._error = None
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="train-logger", daemon=True)
+        self._thread.start()
 
     def log(self, step, metrics, prefix=None):
         flattened = {}
@@ -34,23 +57,83 @@ class TrainLogger:
             tag = f"{prefix}/{key}" if prefix else key
             if isinstance(value, (int, float)):
                 flattened[tag] = float(value)
-                if self.summary_writer:
-                    self.summary_writer.add_scalar(tag, value, step)
-        for tag, value in flattened.items():
-            self.writer.writerow({"step": step, "tag": tag, "value": value})
-        self.csv_file.flush()
-        print({"update": step, **{key: round(value, 5) for key, value in flattened.items()}}, flush=True)
+        self._put(("metrics", step, flattened))
 
     def log_episodes(self, step, summaries):
-        for summary in summaries:
-            payload = asdict(summary) if is_dataclass(summary) else dict(summary)
-            payload["update"] = step
-            self.episodes_file.write(json.dumps(payload, ensure_ascii=False) + "\n")
         if summaries:
-            self.episodes_file.flush()
+            self._put(("episodes", step, list(summaries)))
+
+    def flush(self):
+        """阻塞到已提交的记录全部写出并刷新到磁盘。"""
+        self._check()
+        self._queue.put(("flush",))
+        self._queue.join()
+        self._check()
 
     def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._thread.join()
         if self.summary_writer:
             self.summary_writer.close()
-        self.episodes_file.close()
         self.csv_file.close()
+        self._check()
+
+    def _put(self, item):
+        self._check()
+        self._queue.put(item)
+
+    def _check(self):
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
+
+    def _run(self):
+        last_flush = monotonic()
+        stopping = False
+        while not stopping:
+            try:
+                batch = [self._queue.get(timeout=self.flush_interval)]
+            except queue.Empty:
+                batch = []
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stopping = _STOP in batch
+            force = stopping or any(item[0] == "flush" for item in batch if item is not _STOP)
+            try:
+                self._write([item for item in batch if item is not _STOP and item[0] != "flush"])
+                if force or monotonic() - last_flush >= self.flush_interval:
+                    self.csv_file.flush()
+                    last_flush = monotonic()
+            except BaseException as error:  # 交给训练线程的下一次调用抛出
+                self._error = error
+            for _ in batch:
+                self._queue.task_done()
+
+    def _write(self, batch):
+        rows, payloads, replays = [], [], []
+        for item in batch:
+            if item[0] == "metrics":
+                _, step, flattened = item
+                rows.extend({"step": step, "tag": tag, "value": value} for tag, value in flattened.items())
+                if self.summary_writer:
+                    for tag, value in flattened.items():
+                        self.summary_writer.add_scalar(tag, value, step)
+                print({"update": step, **{key: round(value, 5) for key, value in flattened.items()}}, flush=True)
+            else:
+                _, step, summaries = item
+                for summary in summaries:
+                    payload = asdict(summary) if is_dataclass(summary) else dict(summary)
+                    replays.append(payload.pop("replay", b""))
+                    payload["update"] = step
+                    payloads.append(payload)
+        if rows:
+            self.writer.writerows(rows)
+        if payloads:
+            self.episodes.append(payloads)
+            append_replays(self.replays_path, replays)
@@ -1,6 +1,8 @@
 """单进程 PPO 更新。PyTorch 为训练阶段可选依赖。"""
 from __future__ import annotations
 
+from src.rl.training.rollout_storage import to_device
+
 
 def ppo_update(model, optimizer, batch, *, clip_ratio=0.2, value_coef=0.5,
                entropy_coef=0.01, epochs=4, minibatch_size=128,
@@ -8,8 +10,9 @@ def ppo_update(model, optimizer, batch, *, clip_ratio=0.2, value_coef=0.5,
     import torch
 
     device = device or next(model.parameters()).device
-    observations = torch.as_tensor(batch["observations"], dtype=torch.float32, device=device)
-    masks = torch.as_tensor(batch["masks"], dtype=torch.bool, device=device)
+    # 压缩 rollout 只在取 minibatch 时于设备上还原成稠密 observation/mask。
+    observations = to_device(batch["observations"], device, torch.float32)
+    masks = to_device(batch["masks"], device, torch.bool)
     actions = torch.as_tensor(batch["actions"], dtype=torch.long, device=device)
     old_log_probs = torch.as_tensor(batch["log_probs"], dtype=torch.float32, device=device)
     returns = torch.as_tensor(batch["returns"], dtype=torch.float32, device=device)
@@ -56,7 +59,7 @@ def ppo_update(model, optimizer, batch, *, clip_ratio=0.2, value_coef=0.5,
         if early_stop:
             break
     with torch.no_grad():
-        _, all_values = model(observations, masks)
+        _, all_values = model(observations[:], masks[:])
         variance = torch.var(returns)
         explained = 1.0 - torch.var(returns - all_values) / (variance + 1e-8)
     metrics["explained_variance"] = float(explained.detach())
@@ -3,20 +3,33 @@ from __future__ import annotations
 
 import math
 
+from src.rl.training.rollout_storage import to_device
+
 
 def ppo_update(model, optimizer, batch, *, clip_ratio=0.2, value_coef=0.5,
                entropy_coef=0.01, epochs=4, minibatch_size=128,
-               grad_clip=0.5, target_kl=0.015, device=None):
+               grad_clip=0.5, target_kl=0.015, device=None,
+               rank=0, world_size=1, generator=None, all_reduce=None):
+    """执行一次 PPO update 并返回 metrics。
+
+    ``rank``/``world_size``/``generator``/``all_reduce`` 供数据并行 learner 使用：
+    各 rank 用同一 ``generator`` 得到相同的 minibatch 划分，只对 ``selected[rank::world_size]``
+    前向和反向，梯度与损失/KL 之和经 ``all_reduce`` 求和后再 clip 和 step。
+    损失始终按整个 minibatch 的样本数归一，单进程即 ``world_size=1`` 的特例；
+    非 0 rank 返回 None。
+    """
     import torch
 
     device = device or next(model.parameters()).device
-    observations = torch.as_tensor(batch["observations"], dtype=torch.float32, device=device)
-    masks = torch.as_tensor(batch["masks"], dtype=torch.bool, device=device)
+    # 压缩 rollout 只在取 minibatch 时于设备上还原成稠密 observation/mask。
+    observations = to_device(batch["observations"], device, torch.float32)
+    masks = to_device(batch["masks"], device, torch.bool)
     actions = torch.as_tensor(batch["actions"], dtype=torch.long, device=device)
     old_log_probs = torch.as_tensor(batch["log_probs"], dtype=torch.float32, device=device)
     returns = torch.as_tensor(batch["returns"], dtype=torch.float32, device=device)
     raw_advantages = torch.as_tensor(batch["advantages"], dtype=torch.float32, device=device)
     advantages = (raw_advantages - raw_advantages.mean()) / (raw_advantages.std() + 1e-8)
+    parameters = [parameter for parameter in model.parameters() if parameter.requires_grad]
     accumulated = {key: 0.0 for key in (
         "policy_loss", "value_loss", "entropy", "total_loss", "approx_kl",
         "clip_fraction", "grad_norm",
@@ -30,37 +43,63 @@ def ppo_update(model, optimizer, batch, *, clip_ratio=0.2, value_coef=0.5,
 
     for _ in range(epochs):
         epoch_kls = []
-        indices = torch.randperm(len(actions), device=device)
+        if generator is None:
+            indices = torch.randperm(len(actions), device=device)
+        else:
+            indices = torch.randperm(len(actions), generator=generator).to(device)
         for selected in indices.split(minibatch_size):
-            logits, values = model(observations[selected], masks[selected])
-            distribution = torch.distributions.Categorical(logits=logits)
-            log_probs = distribution.log_prob(actions[selected])
-            log_ratio = log_probs - old_log_probs[selected]
-            ratio = log_ratio.exp()
-            unclipped = ratio * advantages[selected]
-            clipped = ratio.clamp(1.0 - clip_ratio, 1.0 + clip_ratio) * advantages[selected]
-            policy_loss = -torch.minimum(unclipped, clipped).mean()
-            value_loss = torch.nn.functional.mse_loss(values, returns[selected])
-            entropy = distribution.entropy().mean()
-            total_loss = policy_loss + value_coef * value_loss - entropy_coef * entropy
+            count = len(selected)
+            shard = selected[rank::world_size]
             optimizer.zero_grad()
-            total_loss.backward()
-            grad_norm = torch.nn.utils.clip_grad_norm_(model.parameters(), grad_clip)
+            # 策略损失、价值损失、熵、KL 与 clip 数量在本分片上的和。
+            sums = torch.zeros(5, device=device)
+            if len(shard):
+                logits, values = model(observations[shard], masks[shard])
+                distribution = torch.distributions.Categorical(logits=logits)
+                log_probs = distribution.log_prob(actions[shard])
+                log_ratio = log_probs - old_log_probs[shard]
+                ratio = log_ratio.exp()
+                unclipped = ratio * advantages[shard]
+                clipped = ratio.clamp(1.0 - clip_ratio, 1.0 + clip_ratio) * advantages[shard]
+                policy_sum = -torch.minimum(unclipped, clipped).sum()
+                value_sum = (values - returns[shard]).square().sum()
+                entropy_sum = distribution.entropy().sum()
+                total_loss = (policy_sum + value_coef * value_sum - entropy_coef * entropy_sum) / count
+                total_loss.backward()
+                with torch.no_grad():
+                    sums = torch.stack((
+                        policy_sum, value_sum, entropy_sum,
+                        0.5 * log_ratio.square().sum(),
+                        ((ratio - 1.0).abs() > clip_ratio).float().sum(),
+                    ))
+            if all_reduce is not None:
+                # 梯度与统计量拼成一个缓冲区，每个 minibatch 只做一次 all_reduce。
+                buffer = torch.cat([
+                    (parameter.grad if parameter.grad is not None else torch.zeros_like(parameter)).reshape(-1)
+                    for parameter in parameters
+                ] + [sums])
+                all_reduce(buffer)
+                offset = 0
+                for parameter in parameters:
+                    size = parameter.numel()
+                    parameter.grad = buffer[offset:offset + size].view_as(parameter).clone()
+                    offset += size
+                sums = buffer[offset:]
+            grad_norm = torch.nn.utils.clip_grad_norm_(parameters, grad_clip)
             optimizer.step()
 
-            approx_kl = 0.5 * log_ratio.square().mean()
-            clip_fraction = ((ratio - 1.0).abs() > clip_ratio).float().mean()
+            policy_loss, value_loss, entropy, approx_kl, clip_fraction = (sums / count).tolist()
             values_to_add = {
                 "policy_loss": policy_loss, "value_loss": value_loss,
-                "entropy": entropy, "total_loss": total_loss,
+                "entropy": entropy,
+                "total_loss": policy_loss + value_coef * value_loss - entropy_coef * entropy,
                 "approx_kl": approx_kl, "clip_fraction": clip_fraction,
-                "grad_norm": grad_norm,
+                "grad_norm": float(grad_norm),
             }
             for key, value in values_to_add.items():
-                accumulated[key] += float(value.detach())
-            kl_value = float(approx_kl.detach())
-            epoch_kls.append(kl_value)
-            max_minibatch_kl = max(max_minibatch_kl, kl_value)
+                accumulated[key] += value
+            epoch_kls.append(approx_kl)
+            max_minibatch_kl = max(max_minibatch_kl, approx_kl)
             batches += 1
 
         epochs_completed += 1
@@ -69,6 +108,9 @@ def ppo_update(model, optimizer, batch, *, clip_ratio=0.2, value_coef=0.5,
             early_stop = True
             break
 
+    if rank != 0:
+        return None
+
     # v3 的结构化动作头会为每条 observation 展开全部 722 个动作。
     # 即使这里只需要 value，一次前向整个 rollout 仍会构造巨大的 actor
     # 中间张量；按训练 minibatch 分块可保持 explained variance 的结果不变。
@@ -93,4 +135,6 @@ def ppo_update(model, optimizer, batch, *, clip_ratio=0.2, value_coef=0.5,
         "last_epoch_mean_kl": last_epoch_mean_kl,
         "max_minibatch_kl": max_minibatch_kl,
     })
+    if world_size > 1:
+        metrics["learner_processes"] = float(world_size)
     return metrics
@@ -0,0 +1,145 @@
+"""PPO v3 的 CPU 数据并行 learner：本机多进程 + ``torch.distributed`` gloo。
+
+训练主进程即 rank 0，另有 K-1 个常驻 spawn 子进程。每次 update 由 rank 0 广播
+模型/优化器状态、rollout batch 和本次的随机种子；所有 rank 以相同顺序遍历
+minibatch，由 ``ppo_v3.ppo_update`` 只对自己的分片做前向和反向，梯度与损失/KL
+统计在一次 all_reduce 中求和，随后各自执行相同的 clip 和 ``optimizer.step()``。
+因此每一步更新都与单进程 update 等价，按全局 epoch 平均 KL 的提前停止在所有
+rank 上一致。
+"""
+from __future__ import annotations
+
+import copy
+import socket
+
+from src.rl.training.ppo_v3 import ppo_update
+
+
+def _free_port():
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _all_reduce(buffer):
+    import torch.distributed as dist
+    dist.all_reduce(buffer, op=dist.ReduceOp.SUM)
+
+
+def _generator(seed):
+    import torch
+    return torch.Generator().manual_seed(seed)
+
+
+def _worker_main(rank, world_size, init_method, threads):
+    """Top-level target：rank 1..K-1 常驻循环，等待 rank 0 广播的 update 命令。"""
+    import torch
+    import torch.distributed as dist
+
+    torch.set_num_threads(threads)
+    dist.init_process_group("gloo", init_method=init_method, rank=rank, world_size=world_size)
+    model = optimizer = None
+    try:
+        while True:
+            message = [None]
+            dist.broadcast_object_list(message, src=0)
+            command = message[0]
+            if command is None:
+                break
+            if "model" in command:
+                model = command["model"]
+                optimizer = command["optimizer_type"](model.parameters(), **command["optimizer_defaults"])
+            model.load_state_dict(command["model_state"])
+            optimizer.load_state_dict(command["optimizer_state"])
+            ppo_update(
+                model, optimizer, command["batch"], device="cpu", rank=rank,
+                world_size=world_size, generator=_generator(command["seed"]),
+                all_reduce=_all_reduce, **command["options"],
+            )
+    finally:
+        dist.destroy_process_group()
+
+
+class DataParallelLearner:
+    """与 ``ppo_v3.ppo_update`` 同签名的可调用对象；首次调用时才拉起子进程。"""
+
+    def __init__(self, world_size, *, threads_per_process=1):
+        if world_size < 1:
+            raise ValueError(f"learner 进程数必须 >= 1，实际为 {world_size}")
+        self.world_size = int(world_size)
+        self.threads_per_process = max(1, int(threads_per_process))
+        self.processes = []
+        self._started = False
+        self._model_id = None
+
+    def start(self):
+        if self._started or self.world_size == 1:
+            return
+        import multiprocessing as mp
+        import torch.distributed as dist
+
+        init_method = f"tcp://127.0.0.1:{_free_port()}"
+        context = mp.get_context("spawn")
+        self.processes = [context.Process(
+            target=_worker_main,
+            args=(rank, self.world_size, init_method, self.threads_per_process),
+            daemon=True,
+        ) for rank in range(1, self.world_size)]
+        for process in self.processes:
+            process.start()
+        dist.init_process_group("gloo", init_method=init_method, rank=0, world_size=self.world_size)
+        self._started = True
+
+    def __call__(self, model, optimizer, batch, *, device=None, **options):
+        import torch
+
+        if device is not None and torch.device(device).type != "cpu":
+            raise ValueError(f"数据并行 learner 只支持 CPU，实际为 {device}")
+        if next(model.parameters()).device.type != "cpu":
+            raise ValueError("数据并行 learner 需要 CPU 上的模型")
+        seed = int(torch.randint(2 ** 62, ()).item())
+        if self.world_size == 1:
+            return ppo_update(model, optimizer, batch, device="cpu", generator=_generator(seed), **options)
+        self.start()
+        import torch.distributed as dist
+
+        command = {
+            "model_state": model.state_dict(),
+            "optimizer_state": optimizer.state_dict(),
+            "batch": batch,
+            "seed": seed,
+            "options": options,
+        }
+        # 子进程只在模型对象变化时重建模型与优化器，之后每轮只同步状态。
+        if self._model_id != id(model):
+            command.update(
+                model=copy.deepcopy(model),
+                optimizer_type=type(optimizer),
+                optimizer_defaults=optimizer.defaults,
+            )
+            self._model_id = id(model)
+        dist.broadcast_object_list([command], src=0)
+        threads = torch.get_num_threads()
+        torch.set_num_threads(self.threads_per_process)
+        try:
+            return ppo_update(
+                model, optimizer, batch, device="cpu", rank=0, world_size=self.world_size,
+                generator=_generator(seed), all_reduce=_all_reduce, **options,
+            )
+        finally:
+            torch.set_num_threads(threads)
+
+    def close(self):
+        if not self._started:
+            return
+        import torch.distributed as dist
+
+        dist.broadcast_object_list([None], src=0)
+        dist.destroy_process_group()
+        for process in self.processes:
+            process.join(timeout=10)
+            if process.is_alive():
+                process.terminate()
+        self.processes = []
+        self._started = False
+        self._model_id = None
@@ -0,0 +1,291 @@
+"""压缩的 rollout observation / action mask 存储。
+
+observation v2 中每个武将槽位有一大段身份 one-hot（武将、技能、阵营、属性、
+目标类型、技能类型），整局不变；其余运行状态每步只有少数槽位变化。worker
+端把每步拆成全局特征 + 每槽位的身份行索引与动态行索引，身份行和动态行都按内容
+去重存入表中，空槽位索引为 -1。action mask 按位打包。
+
+还原是无损的：learner 把表和索引搬到设备上后，按 minibatch 下标现场拼回稠密
+observation，因此 PPO 的数值结果与稠密存储完全一致。
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+import numpy as np
+
+from src.rl.actions import GRID_SIZE
+from src.rl.observation import (
+    ATTRIBUTES, CAMPS, GENERAL_FEATURES, GENERAL_IDS, GENERAL_SCALARS,
+    GLOBAL_FEATURES, OBSERVATION_SIZE, SKILL_IDS, SKILL_TYPES, TARGET_TYPES,
+)
+
+SLOT_COUNT = GRID_SIZE * 2
+IDENTITY_FEATURES = (
+    len(GENERAL_IDS) + len(SKILL_IDS) + len(CAMPS)
+    + len(ATTRIBUTES) + len(TARGET_TYPES) + len(SKILL_TYPES)
+)
+IDENTITY_START = GENERAL_SCALARS
+IDENTITY_END = GENERAL_SCALARS + IDENTITY_FEATURES
+DYNAMIC_FEATURES = GENERAL_FEATURES - IDENTITY_FEATURES
+EMPTY_SLOT = -1
+
+
+def _split_slots(observation):
+    slots = np.asarray(observation, dtype=np.float32)[GLOBAL_FEATURES:].reshape(
+        SLOT_COUNT, GENERAL_FEATURES,
+    )
+    identity = slots[:, IDENTITY_START:IDENTITY_END]
+    dynamic = np.concatenate((slots[:, :IDENTITY_START], slots[:, IDENTITY_END:]), axis=1)
+    return slots, identity, dynamic
+
+
+class _RowTable:
+    """按字节内容去重的定长 float32 行表。"""
+
+    def __init__(self, width):
+        self.width = width
+        self.rows = []
+        self.lookup = {}
+
+    def index(self, row):
+        key = row.tobytes()
+        found = self.lookup.get(key)
+        if found is None:
+            found = self.lookup[key] = len(self.rows)
+            self.rows.append(row.copy())
+        return found
+
+    def array(self):
+        if not self.rows:
+            return np.zeros((0, self.width), dtype=np.float32)
+        return np.stack(self.rows).astype(np.float32, copy=False)
+
+
+@dataclass
+class CompressedObservations:
+    """一段 rollout 的压缩 observation；`dense()` 可还原任意下标的稠密数组。"""
+    global_features: np.ndarray
+    identity_rows: np.ndarray
+    dynamic_rows: np.ndarray
+    identity_index: np.ndarray
+    dynamic_index: np.ndarray
+
+    def __len__(self):
+        return len(self.global_features)
+
+    @property
+    def occupancy(self):
+        return self.dynamic_index != EMPTY_SLOT
+
+    @property
+    def nbytes(self):
+        return sum(array.nbytes for array in (
+            self.global_features, self.identity_rows, self.dynamic_rows,
+            self.identity_index, self.dynamic_index,
+        ))
+
+    @classmethod
+    def from_dense(cls, observations):
+        builder = ObservationBuilder()
+        for observation in observations:
+            builder.append(observation)
+        return builder.build()
+
+    @classmethod
+    def concatenate(cls, parts):
+        identity_offset = dynamic_offset = 0
+        identity_indices, dynamic_indices = [], []
+        for part in parts:
+            identity_indices.append(np.where(
+                part.identity_index == EMPTY_SLOT, EMPTY_SLOT,
+                part.identity_index + identity_offset,
+            ))
+            dynamic_indices.append(np.where(
+                part.dynamic_index == EMPTY_SLOT, EMPTY_SLOT,
+                part.dynamic_index + dynamic_offset,
+            ))
+            identity_offset += len(part.identity_rows)
+            dynamic_offset += len(part.dynamic_rows)
+        return cls(
+            global_features=np.concatenate([part.global_features for part in parts]),
+            identity_rows=np.concatenate([part.identity_rows for part in parts]),
+            dynamic_rows=np.concatenate([part.dynamic_rows for part in parts]),
+            identity_index=np.concatenate(identity_indices).astype(np.int32),
+            dynamic_index=np.concatenate(dynamic_indices).astype(np.int32),
+        )
+
+    def take(self, index):
+        return CompressedObservations(
+            global_features=self.global_features[index],
+            identity_rows=self.identity_rows,
+            dynamic_rows=self.dynamic_rows,
+            identity_index=self.identity_index[index],
+            dynamic_index=self.dynamic_index[index],
+        )
+
+    def dense(self, index=None):
+        selected = slice(None) if index is None else index
+        global_features = self.global_features[selected]
+        identity = np.concatenate((
+            np.zeros((1, IDENTITY_FEATURES), dtype=np.float32), self.identity_rows,
+        ))[self.identity_index[selected] + 1]
+        dynamic = np.concatenate((
+            np.zeros((1, DYNAMIC_FEATURES), dtype=np.float32), self.dynamic_rows,
+        ))[self.dynamic_index[selected] + 1]
+        slots = np.concatenate((
+            dynamic[..., :IDENTITY_START], identity, dynamic[..., IDENTITY_START:],
+        ), axis=-1)
+        return np.concatenate(
+            (global_features, slots.reshape(len(global_features), -1)), axis=1,
+        )
+
+    def to(self, device):
+        return DeviceObservations(self, device)
+
+
+class ObservationBuilder:
+    """worker 端逐步追加 observation，结束时生成 `CompressedObservations`。"""
+
+    def __init__(self):
+        self.global_features = []
+        self.identity_index = []
+        self.dynamic_index = []
+        self.identity_table = _RowTable(IDENTITY_FEATURES)
+        self.dynamic_table = _RowTable(DYNAMIC_FEATURES)
+
+    def __len__(self):
+        return len(self.global_features)
+
+    def append(self, observation):
+        observation = np.asarray(observation, dtype=np.float32)
+        if observation.shape != (OBSERVATION_SIZE,):
+            raise ValueError(f"observation 维度应为 {OBSERVATION_SIZE}，实际为 {observation.shape}")
+        slots, identity, dynamic = _split_slots(observation)
+        occupied = slots.any(axis=1)
+        identity_index = np.full(SLOT_COUNT, EMPTY_SLOT, dtype=np.int32)
+        dynamic_index = np.full(SLOT_COUNT, EMPTY_SLOT, dtype=np.int32)
+        for slot in np.flatnonzero(occupied):
+            identity_index[slot] = self.identity_table.index(identity[slot])
+            dynamic_index[slot] = self.dynamic_table.index(dynamic[slot])
+        self.global_features.append(observation[:GLOBAL_FEATURES].copy())
+        self.identity_index.append(identity_index)
+        self.dynamic_index.append(dynamic_index)
+
+    def build(self):
+        steps = len(self.global_features)
+        return CompressedObservations(
+            global_features=np.asarray(self.global_features, dtype=np.float32).reshape(steps, GLOBAL_FEATURES),
+            identity_rows=self.identity_table.array(),
+            dynamic_rows=self.dynamic_table.array(),
+            identity_index=np.asarray(self.identity_index, dtype=np.int32).reshape(steps, SLOT_COUNT),
+            dynamic_index=np.asarray(self.dynamic_index, dtype=np.int32).reshape(steps, SLOT_COUNT),
+        )
+
+
+@dataclass
+class PackedMasks:
+    """按位打包的 action mask（1 = 非法），每步占 ceil(action_size / 8) 字节。"""
+    bits: np.ndarray
+    action_size: int
+
+    def __len__(self):
+        return len(self.bits)
+
+    @property
+    def nbytes(self):
+        return self.bits.nbytes
+
+    @classmethod
+    def from_dense(cls, masks, action_size=None):
+        masks = np.asarray(masks, dtype=np.bool_)
+        action_size = masks.shape[-1] if action_size is None else action_size
+        return cls(np.packbits(masks.reshape(-1, action_size), axis=1), int(action_size))
+
+    @classmethod
+    def concatenate(cls, parts):
+        return cls(np.concatenate([part.bits for part in parts]), parts[0].action_size)
+
+    def take(self, index):
+        return PackedMasks(self.bits[index], self.action_size)
+
+    def dense(self, index=None):
+        selected = slice(None) if index is None else index
+        return np.unpackbits(self.bits[selected], axis=1, count=self.action_size).astype(np.bool_)
+
+    def to(self, device):
+        return DeviceMasks(self, device)
+
+
+class DeviceObservations:
+    """设备上的压缩 observation；下标访问时才拼出稠密 minibatch。"""
+
+    def __init__(self, storage, device):
+        import torch
+
+        def table(rows, width):
+            padded = np.concatenate((np.zeros((1, width), dtype=np.float32), rows))
+            return torch.as_tensor(padded, dtype=torch.float32, device=device)
+
+        self.global_features = torch.as_tensor(storage.global_features, dtype=torch.float32, device=device)
+        self.identity_rows = table(storage.identity_rows, IDENTITY_FEATURES)
+        self.dynamic_rows = table(storage.dynamic_rows, DYNAMIC_FEATURES)
+        # 0 号行为全零填充行，空槽位（-1）平移后正好指向它。
+        self.identity_index = torch.as_tensor(storage.identity_index, dtype=torch.long, device=device) + 1
+        self.dynamic_index = torch.as_tensor(storage.dynamic_index, dtype=torch.long, device=device) + 1
+
+    def __len__(self):
+        return len(self.global_features)
+
+    def __getitem__(self, index):
+        import torch
+
+        global_features = self.global_features[index]
+        identity = self.identity_rows[self.identity_index[index]]
+        dynamic = self.dynamic_rows[self.dynamic_index[index]]
+        slots = torch.cat((
+            dynamic[..., :IDENTITY_START], identity, dynamic[..., IDENTITY_START:],
+        ), dim=-1)
+        return torch.cat((global_features, slots.flatten(start_dim=1)), dim=1)
+
+
+class DeviceMasks:
+    """设备上的按位打包 action mask；下标访问时解包为 bool。"""
+
+    def __init__(self, storage, device):
+        import torch
+
+        self.action_size = storage.action_size
+        self.bits = torch.as_tensor(storage.bits, dtype=torch.uint8, device=device)
+        self.shifts = torch.arange(7, -1, -1, dtype=torch.uint8, device=device)
+
+    def __len__(self):
+        return len(self.bits)
+
+    def __getitem__(self, index):
+        bits = self.bits[index]
+        unpacked = (bits.unsqueeze(-1) >> self.shifts) & 1
+        return unpacked.flatten(start_dim=1)[:, :self.action_size].bool()
+
+
+def concatenate(values):
+    """拼接 fragment 中的稠密数组或压缩存储。"""
+    first = values[0]
+    if isinstance(first, (CompressedObservations, PackedMasks)):
+        return type(first).concatenate(values)
+    return np.concatenate(values)
+
+
+def take(value, index):
+    """按下标选取 batch 字段，压缩存储保持压缩形式。"""
+    if isinstance(value, (CompressedObservations, PackedMasks)):
+        return value.take(index)
+    return np.asarray(value)[index]
+
+
+def to_device(value, device, dtype):
+    """把 batch 字段搬到 learner 设备；压缩存储返回可按下标还原的视图。"""
+    if isinstance(value, (CompressedObservations, PackedMasks)):
+        return value.to(device)
+    import torch
+    return torch.as_tensor(value, dtype=dtype, device=device)
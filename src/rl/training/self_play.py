@@ -1,15 +1,25 @@
-"""带评分元数据的冻结历史策略池。"""
+"""带评分元数据的冻结历史策略池。
+
+快照文件仍是唯一持久来源；内存里另有按策略 ID 的有界 LRU 缓存（CPU state
+dict），后台线程预取可被采样的 top-k 快照，因此对手采样通常只是一次字典查找。
+``add`` 淘汰快照文件时同步移出缓存；每次 ``add`` 还会推进该 ID 的代数，读盘前
+记下的代数与当前不一致时（读的是被覆盖前的旧文件），结果不会写入缓存。
+"""
 from __future__ import annotations
 
+from collections import OrderedDict
 import json
 import math
 import os
 from pathlib import Path
+import threading
+
+from src.rl.training.checkpoint import cpu_snapshot
 
 
 class HistoricalPolicyPool:
     def __init__(self, directory="artifacts/rl/self_play", *, max_size=24,
-                 top_k=8, temperature=0.25):
+                 top_k=8, temperature=0.25, cache_size=None, prefetch=True):
         self.directory = Path(directory)
         self.directory.mkdir(parents=True, exist_ok=True)
         self.metadata_path = self.directory / "pool.json"
@@ -17,6 +27,15 @@ class HistoricalPolicyPool:
         self.top_k = max(1, int(top_k))
         self.temperature = max(1e-6, float(temperature))
         self.entries = self._load_metadata()
+        # 默认缓存恰好覆盖采样候选；0 表示每次都从磁盘读取。
+        self.cache_size = self.top_k if cache_size is None else max(0, int(cache_size))
+        self._cache = OrderedDict()
+        self._generations = {}
+        self._lock = threading.Lock()
+        self._prefetch_thread = None
+        self.cache_hits = self.cache_misses = 0
+        self.prefetch_enabled = bool(prefetch)
+        self.prefetch()
 
     def _load_metadata(self):
         if not self.metadata_path.exists():
@@ -31,10 +50,6 @@ class HistoricalPolicyPool:
         )
         os.replace(temporary, self.metadata_path)
 
-    @staticmethod
-    def _cpu_state_dict(model_state):
-        return {key: value.detach().cpu() for key, value in model_state.items()}
-
     def add(self, model_state, *, update, score, observation_schema,
             observation_size, action_size, model_schema):
         import torch
@@ -42,15 +57,17 @@ class HistoricalPolicyPool:
         filename = f"{policy_id}.pt"
         path = self.directory / filename
         temporary = path.with_suffix(".tmp")
-        torch.save({
-            "model": self._cpu_state_dict(model_state),
+        payload = {
+            # 必须复制：CPU 训练时 .cpu() 不拷贝，缓存会随后续 optimizer.step() 一起变化。
+            "model": cpu_snapshot(dict(model_state)),
             "update": int(update),
             "score": float(score),
             "observation_schema": observation_schema,
             "observation_size": int(observation_size),
             "action_size": int(action_size),
             "model_schema": model_schema,
-        }, temporary)
+        }
+        torch.save(payload, temporary)
         os.replace(temporary, path)
         self.entries = [item for item in self.entries if item["id"] != policy_id]
         self.entries.append({
@@ -60,10 +77,19 @@ class HistoricalPolicyPool:
         self.entries.sort(key=lambda item: (item["score"], item["update"]), reverse=True)
         removed = self.entries[self.max_size:]
         self.entries = self.entries[:self.max_size]
+        with self._lock:
+            # 同 ID 覆盖写入时旧缓存已过期，进行中的旧读取也随代数推进而作废；
+            # 被淘汰的快照文件即将删除。
+            generation = self._generations[policy_id] = self._generations.get(policy_id, 0) + 1
+            self._cache.pop(policy_id, None)
+            for item in removed:
+                self._cache.pop(item["id"], None)
         for item in removed:
             old_path = self.directory / item["file"]
             if old_path.exists():
                 old_path.unlink()
+        if any(item["id"] == policy_id for item in self.entries[:self.top_k]):
+            self._remember(policy_id, payload, generation)
         self._save_metadata()
         return policy_id
 
@@ -81,8 +107,73 @@ class HistoricalPolicyPool:
         return dict(item)
 
     def load(self, entry, device="cpu"):
+        """返回快照内容；缓存命中时不读盘，返回的 state dict 不应被原地修改。"""
+        policy_id = entry["id"]
+        with self._lock:
+            payload = self._cache.get(policy_id)
+            generation = self._generations.get(policy_id, 0)
+            if payload is not None:
+                self._cache.move_to_end(policy_id)
+                self.cache_hits += 1
+            else:
+                self.cache_misses += 1
+        if payload is None:
+            payload = self._read(entry)
+            self._remember(policy_id, payload, generation)
+        payload = dict(payload)
+        if str(device) != "cpu":
+            payload["model"] = {key: value.to(device) for key, value in payload["model"].items()}
+        return payload
+
+    def _read(self, entry):
         import torch
-        return torch.load(self.directory / entry["file"], map_location=device)
+        return torch.load(self.directory / entry["file"], map_location="cpu")
+
+    def _is_current(self, policy_id):
+        return any(item["id"] == policy_id for item in self.entries)
+
+    def _remember(self, policy_id, payload, generation):
+        if not self.cache_size:
+            return
+        with self._lock:
+            # 与 add 的淘汰和覆盖在同一把锁下判断：已移出池的快照、以及读盘期间
+            # 被同 ID 新快照覆盖的旧内容，都不会被放回缓存。
+            if not self._is_current(policy_id) or self._generations.get(policy_id, 0) != generation:
+                return
+            self._cache[policy_id] = payload
+            self._cache.move_to_end(policy_id)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def prefetch(self, wait=False):
+        """在后台线程把尚未缓存的 top-k 快照读入内存；已有预取在跑时不重复启动。"""
+        if not self.prefetch_enabled or not self.cache_size:
+            return None
+        if self._prefetch_thread is None or not self._prefetch_thread.is_alive():
+            with self._lock:
+                pending = [
+                    (dict(item), self._generations.get(item["id"], 0))
+                    for item in self.entries[:min(self.top_k, self.cache_size)]
+                    if item["id"] not in self._cache
+                ]
+            if pending:
+                self._prefetch_thread = threading.Thread(
+                    target=self._prefetch, args=(pending,), name="policy-pool-prefetch", daemon=True,
+                )
+                self._prefetch_thread.start()
+        if wait and self._prefetch_thread is not None:
+            self._prefetch_thread.join()
+        return self._prefetch_thread
+
+    def _prefetch(self, entries):
+        for entry, generation in entries:
+            if entry["id"] in self._cache or not self._is_current(entry["id"]):
+                continue
+            try:
+                payload = self._read(entry)
+            except (OSError, RuntimeError, EOFError):
+                continue  # 文件刚被 add 淘汰；真正采样时再按需读取
+            self._remember(entry["id"], payload, generation)
 
     def metrics(self):
         if not self.entries:
@@ -91,4 +182,6 @@ class HistoricalPolicyPool:
             "pool_size": len(self.entries),
             "best_score": max(item["score"] for item in self.entries),
             "mean_score": sum(item["score"] for item in self.entries) / len(self.entries),
+            "cache_size": len(self._cache),
+            "cache_hit_rate": self.cache_hits / max(1, self.cache_hits + self.cache_misses),
         }
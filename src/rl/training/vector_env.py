@@ -3,9 +3,15 @@ from __future__ import annotations
 
 from dataclasses import dataclass, field
 import multiprocessing as mp
+from time import perf_counter
 
 import numpy as np
 
+from src.rl.symmetry import roster_is_column_symmetric
+from src.rl.training.rollout_storage import (
+    CompressedObservations, ObservationBuilder, PackedMasks,
+)
+
 
 @dataclass
 class GeneralRecord:
@@ -40,12 +46,15 @@ class EpisodeSummary:
     formation_enemy: list = field(default_factory=list)
     skill_usage_by_general_id: dict = field(default_factory=dict)
     synergy_events: list = field(default_factory=list)
+    replay: bytes = b""  # src.rl.replay 编码的整局动作记录
 
 
 @dataclass
 class RolloutFragment:
-    observations: np.ndarray
-    masks: np.ndarray
+    """一个 worker 的截断轨迹。observation/mask 以压缩形式跨进程传输，
+    单元测试和单进程路径也可以直接放稠密数组。"""
+    observations: CompressedObservations | np.ndarray
+    masks: PackedMasks | np.ndarray
     actions: np.ndarray
     log_probs: np.ndarray
     rewards: np.ndarray
@@ -54,6 +63,9 @@ class RolloutFragment:
     bootstrap_value: float
     episode_summaries: list
     no_progresses: np.ndarray | None = None
+    column_symmetric: np.ndarray | None = None
+    # 启用分阶段计时时为 ``{阶段: (秒, 次数)}``，见 ``src.rl.phase_timer``。
+    phase_timings: dict | None = None
 
 
 def _snapshot_team(team):
@@ -77,12 +89,10 @@ def _snapshot_formation(team):
 
 
 def _drain_combat_events(env):
-    events = []
-    for side, team in (("self", env.learning_team), ("enemy", env.enemy_team)):
-        for general in team.generals:
-            for event in general.drain_combat_events():
-                events.append({"side": side, **event})
-    return events
+    return [
+        {"side": "self" if team is env.learning_team else "enemy", **event}
+        for team, event in env.drain_combat_events()
+    ]
 
 
 def _classify_outcome(battle_system, learning_team):
@@ -109,6 +119,7 @@ def _worker_main(command_queue, result_queue, worker_id, stage, env_config):
     from src.rl.observation import OBSERVATION_SIZE
 
     env = SanguoEnv(_make_opponent(stage), **env_config)
+    timer = env.phase_timer
     model = ActorCritic(OBSERVATION_SIZE, env.action_size).cpu()
     opponent_model = ActorCritic(OBSERVATION_SIZE, env.action_size).cpu()
     while True:
@@ -135,7 +146,8 @@ def _worker_main(command_queue, result_queue, worker_id, stage, env_config):
         roster_enemy = [general.general_id for general in env.enemy_team.generals]
         formation_self = _snapshot_formation(env.learning_team)
         formation_enemy = _snapshot_formation(env.enemy_team)
-        data = {key: [] for key in ("observations", "masks", "actions", "log_probs", "rewards", "values", "dones", "no_progresses")}
+        observations = ObservationBuilder()
+        data = {key: [] for key in ("masks", "actions", "log_probs", "rewards", "values", "dones", "no_progresses", "column_symmetric")}
         summaries = []
         episode_reward = 0.0
         episode_steps = 0
@@ -145,6 +157,8 @@ def _worker_main(command_queue, result_queue, worker_id, stage, env_config):
         skill_usage = {}
         synergy_events = []
         for _ in range(steps):
+            if timer is not None:
+                started = perf_counter()
             obs = torch.as_tensor(observation, dtype=torch.float32).unsqueeze(0)
             mask = torch.as_tensor(info["action_mask"], dtype=torch.bool).unsqueeze(0)
             with torch.no_grad():
@@ -152,6 +166,8 @@ def _worker_main(command_queue, result_queue, worker_id, stage, env_config):
                 dist = torch.distributions.Categorical(logits=logits)
                 action = int(dist.sample().item())
                 log_prob = float(dist.log_prob(torch.tensor(action)).item())
+            if timer is not None:
+                timer.add("forward", perf_counter() - started)
             decoded = env.decode_action(action)
             if decoded.kind.startswith("skill"):
                 action_counts["skill"] += 1
@@ -160,7 +176,9 @@ def _worker_main(command_queue, result_queue, worker_id, stage, env_config):
             else:
                 action_counts["end"] += 1
             next_observation, reward, done, next_info = env.step(action)
-            for key, value_item in (("observations", observation), ("masks", info["action_mask"]), ("actions", action), ("log_probs", log_prob), ("rewards", reward), ("values", float(value.item())), ("dones", done)):
+            observations.append(observation)
+            data["column_symmetric"].append(roster_is_column_symmetric(env.learning_team, env.enemy_team))
+            for key, value_item in (("masks", info["action_mask"]), ("actions", action), ("log_probs", log_prob), ("rewards", reward), ("values", float(value.item())), ("dones", done)):
                 data[key].append(value_item)
             episode_reward += reward
             episode_steps += 1
@@ -201,6 +219,7 @@ def _worker_main(command_queue, result_queue, worker_id, stage, env_config):
                     formation_enemy=formation_enemy,
                     skill_usage_by_general_id=dict(skill_usage),
                     synergy_events=list(synergy_events),
+                    replay=env.replay.to_bytes(),
                 ))
                 episode_reward = 0.0
                 episode_steps = 0
@@ -219,9 +238,11 @@ def _worker_main(command_queue, result_queue, worker_id, stage, env_config):
             obs = torch.as_tensor(observation, dtype=torch.float32).unsqueeze(0)
             mask = torch.as_tensor(info["action_mask"], dtype=torch.bool).unsqueeze(0)
             _, bootstrap = model(obs, mask)
-        result_queue.put(RolloutFragment(
-            observations=np.asarray(data["observations"], dtype=np.float32),
-            masks=np.asarray(data["masks"], dtype=np.bool_),
+        if timer is not None:
+            started = perf_counter()
+        fragment = RolloutFragment(
+            observations=observations.build(),
+            masks=PackedMasks.from_dense(data["masks"], env.action_size),
             actions=np.asarray(data["actions"], dtype=np.int64),
             log_probs=np.asarray(data["log_probs"], dtype=np.float32),
             rewards=np.asarray(data["rewards"], dtype=np.float32),
@@ -230,7 +251,16 @@ def _worker_main(command_queue, result_queue, worker_id, stage, env_config):
             bootstrap_value=float(bootstrap.item()),
             episode_summaries=summaries,
             no_progresses=np.asarray(data["no_progresses"], dtype=np.bool_),
-        ))
+            column_symmetric=np.asarray(data["column_symmetric"], dtype=np.bool_),
+        )
+        if timer is not None:
+            # 本片段的 put 耗时只能在下一片段中回报。
+            timer.add("pack", perf_counter() - started)
+            fragment.phase_timings = timer.drain()
+            started = perf_counter()
+        result_queue.put(fragment)
+        if timer is not None:
+            timer.add("queue", perf_counter() - started)
 
 
 class SyncRolloutCoordinator:
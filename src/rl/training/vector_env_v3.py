@@ -3,9 +3,12 @@ from __future__ import annotations
 
 import multiprocessing as mp
 import random
+from time import perf_counter
 
 import numpy as np
 
+from src.rl.symmetry import roster_is_column_symmetric
+from src.rl.training.rollout_storage import ObservationBuilder, PackedMasks
 from src.rl.training.vector_env import (
     EpisodeSummary, RolloutFragment, _classify_outcome, _drain_combat_events,
     _snapshot_formation, _snapshot_team,
@@ -46,6 +49,7 @@ def _worker_main(command_queue, result_queue, worker_id, stage, env_config,
     from src.rl.observation import OBSERVATION_SIZE
 
     env = SanguoEnv(**env_config)
+    timer = env.phase_timer
     model = ActorCritic(OBSERVATION_SIZE, env.action_size).cpu()
     opponent_model = ActorCritic(OBSERVATION_SIZE, env.action_size).cpu()
     while True:
@@ -70,9 +74,10 @@ def _worker_main(command_queue, result_queue, worker_id, stage, env_config,
         roster_enemy = [general.general_id for general in env.enemy_team.generals]
         formation_self = _snapshot_formation(env.learning_team)
         formation_enemy = _snapshot_formation(env.enemy_team)
+        observations = ObservationBuilder()
         data = {key: [] for key in (
-            "observations", "masks", "actions", "log_probs", "rewards",
-            "values", "dones", "no_progresses",
+            "masks", "actions", "log_probs", "rewards",
+            "values", "dones", "no_progresses", "column_symmetric",
         )}
         summaries = []
         episode_reward = 0.0
@@ -84,6 +89,8 @@ def _worker_main(command_queue, result_queue, worker_id, stage, env_config,
         synergy_events = []
 
         for _ in range(steps):
+            if timer is not None:
+                started = perf_counter()
             obs = torch.as_tensor(observation, dtype=torch.float32).unsqueeze(0)
             mask = torch.as_tensor(info["action_mask"], dtype=torch.bool).unsqueeze(0)
             with torch.no_grad():
@@ -91,6 +98,8 @@ def _worker_main(command_queue, result_queue, worker_id, stage, env_config,
                 dist = torch.distributions.Categorical(logits=logits)
                 action = int(dist.sample().item())
                 log_prob = float(dist.log_prob(torch.tensor(action)).item())
+            if timer is not None:
+                timer.add("forward", perf_counter() - started)
             decoded = env.decode_action(action)
             if decoded.kind.startswith("skill"):
                 action_counts["skill"] += 1
@@ -99,8 +108,12 @@ def _worker_main(command_queue, result_queue, worker_id, stage, env_config,
             else:
                 action_counts["end"] += 1
             next_observation, reward, done, next_info = env.step(action)
+            observations.append(observation)
+            data["column_symmetric"].append(
+                roster_is_column_symmetric(env.learning_team, env.enemy_team),
+            )
             for key, value_item in (
-                ("observations", observation), ("masks", info["action_mask"]),
+                ("masks", info["action_mask"]),
                 ("actions", action), ("log_probs", log_prob), ("rewards", reward),
                 ("values", float(value.item())), ("dones", done),
             ):
@@ -137,6 +150,7 @@ def _worker_main(command_queue, result_queue, worker_id, stage, env_config,
                     formation_self=formation_self, formation_enemy=formation_enemy,
                     skill_usage_by_general_id=dict(skill_usage),
                     synergy_events=list(synergy_events),
+                    replay=env.replay.to_bytes(),
                 ))
                 episode_reward = 0.0
                 episode_steps = 0
@@ -160,9 +174,11 @@ def _worker_main(command_queue, result_queue, worker_id, stage, env_config,
             obs = torch.as_tensor(observation, dtype=torch.float32).unsqueeze(0)
             mask = torch.as_tensor(info["action_mask"], dtype=torch.bool).unsqueeze(0)
             _, bootstrap = model(obs, mask)
-        result_queue.put(RolloutFragment(
-            observations=np.asarray(data["observations"], dtype=np.float32),
-            masks=np.asarray(data["masks"], dtype=np.bool_),
+        if timer is not None:
+            started = perf_counter()
+        fragment = RolloutFragment(
+            observations=observations.build(),
+            masks=PackedMasks.from_dense(data["masks"], env.action_size),
             actions=np.asarray(data["actions"], dtype=np.int64),
             log_probs=np.asarray(data["log_probs"], dtype=np.float32),
             rewards=np.asarray(data["rewards"], dtype=np.float32),
@@ -170,7 +186,16 @@ def _worker_main(command_queue, result_queue, worker_id, stage, env_config,
             dones=np.asarray(data["dones"], dtype=np.bool_),
             bootstrap_value=float(bootstrap.item()), episode_summaries=summaries,
             no_progresses=np.asarray(data["no_progresses"], dtype=np.bool_),
-        ))
+            column_symmetric=np.asarray(data["column_symmetric"], dtype=np.bool_),
+        )
+        if timer is not None:
+            # 本片段的 put 耗时只能在下一片段中回报。
+            timer.add("pack", perf_counter() - started)
+            fragment.phase_timings = timer.drain()
+            started = perf_counter()
+        result_queue.put(fragment)
+        if timer is not None:
+            timer.add("queue", perf_counter() - started)
 
 
 class SyncRolloutCoordinator:
@@ -33,7 +33,13 @@ class TargetType(Enum):
 
 class Skill(ABC):
     """技能基类"""
-    
+
+    # 主动技能子类未声明 __slots__，仍可自由添加配置字段。
+    __slots__ = (
+        "skill_id", "name", "description", "skill_type", "target_type",
+        "cooldown", "morale_cost",
+    )
+
     def __init__(self,
                  skill_id: str,
                  name: str,
@@ -286,13 +292,18 @@ class TeamEffectSkill(Skill):
 
 class PassiveSkill(Skill):
     """被动技能（基于武将属性）"""
-    
+
+    __slots__ = ("attribute_type",)
+
     def __init__(self, skill_id: str, name: str, description: str, 
                  attribute_type: str):
         # 被动技能不需要目标类型、冷却和士气消耗
         super().__init__(skill_id, name, description, SkillType.PASSIVE, 
                         TargetType.SELF, 0, 0)
         self.attribute_type = attribute_type  # 对应武将的某个attribute
+
+    def reset_battle_state(self) -> None:
+        """恢复局内状态；没有局内状态的被动技能无需覆盖。"""
     
     def execute(self, caster, targets: List, battle_context) -> Dict[str, Any]:
         """被动技能的执行（通常在特定时机触发）"""
@@ -0,0 +1,240 @@
+"""
+三国武将卡牌游戏 — asyncio 服务模式
+与 ``GameServer`` 共用 ``handle_api`` 与静态文件规则，只替换连接处理：
+单线程事件循环管理所有 keep-alive 连接，静态文件读取与 API 结算交给有界线程池，
+电脑行动（PvE 推理、自动选将/布阵）使用独立的线程池，慢 AI 不会占满普通请求的
+工作线程。以 ``SANGUO_WEB_SERVER=asyncio`` 或 ``python -m src.web.server --server asyncio``
+启用；桌面版仍使用 ``ThreadingHTTPServer``。
+"""
+
+import asyncio
+import io
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from http.client import parse_headers
+from urllib.parse import urlparse
+
+from src.web import server as web
+
+# 普通 API 与静态文件读取的工作线程数，以及电脑行动专用线程数。
+API_WORKERS = int(os.environ.get("SANGUO_WEB_WORKERS", "8"))
+AI_WORKERS = int(os.environ.get("SANGUO_WEB_AI_WORKERS", "2"))
+KEEP_ALIVE_TIMEOUT = 15.0
+MAX_HEADER_BYTES = 64 * 1024
+MAX_BODY_BYTES = 1024 * 1024
+
+
+class _Request:
+    """供 ``handle_api``/``state_for`` 读取请求头的最小请求对象。"""
+
+    __slots__ = ("method", "path", "headers")
+
+    def __init__(self, method, path, headers):
+        self.method = method
+        self.path = path
+        self.headers = headers
+
+
+class _BadRequest(Exception):
+    def __init__(self, status):
+        super().__init__(status.phrase)
+        self.status = status
+
+
+class AsyncGameServer:
+    """基于 ``asyncio.start_server`` 的 HTTP/1.1 服务。"""
+
+    def __init__(self, host="0.0.0.0", port=8090, *, api_workers=API_WORKERS, ai_workers=AI_WORKERS, app=None):
+        # ``python -m src.web.server`` 时服务模块是 ``__main__``，由调用方传入以共用同一份会话状态。
+        self.app = app or web
+        self.host = host
+        self.port = port
+        self.api_pool = ThreadPoolExecutor(max(1, api_workers), thread_name_prefix="web-api")
+        self.ai_pool = ThreadPoolExecutor(max(1, ai_workers), thread_name_prefix="web-ai")
+        self.server = None
+        self.connections = set()
+
+    async def start(self):
+        self.server = await asyncio.start_server(
+            self._serve_connection, self.host, self.port, limit=MAX_HEADER_BYTES,
+        )
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self.server
+
+    async def serve_forever(self):
+        if self.server is None:
+            await self.start()
+        async with self.server:
+            await self.server.serve_forever()
+
+    async def shutdown(self):
+        """停止监听并结束所有空闲连接，然后释放线程池。"""
+        if self.server is not None:
+            self.server.close()
+        for task in list(self.connections):
+            task.cancel()
+        await asyncio.gather(*self.connections, return_exceptions=True)
+        self.close()
+
+    def close(self):
+        if self.server is not None:
+            self.server.close()
+        self.api_pool.shutdown(wait=False, cancel_futures=True)
+        self.ai_pool.shutdown(wait=False, cancel_futures=True)
+
+    def _pool_for(self, path, request):
+        """电脑行动走 AI 线程池：PvE 单步，以及 PvE 下会触发电脑选将/布阵的提交。"""
+        if path == "/api/pve/step":
+            return self.ai_pool
+        if path in ("/api/select", "/api/place") and self.app.state_for(request).mode == "pve":
+            return self.ai_pool
+        return self.api_pool
+
+    async def _serve_connection(self, reader, writer):
+        task = asyncio.current_task()
+        self.connections.add(task)
+        try:
+            while True:
+                try:
+                    request, body, keep_alive = await asyncio.wait_for(
+                        self._read_request(reader), KEEP_ALIVE_TIMEOUT,
+                    )
+                except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+                    break
+                except _BadRequest as error:
+                    await self._send(writer, error.status, [("Content-Length", "0")], b"", False)
+                    break
+                if request is None:
+                    break
+                if request.method == "POST" and urlparse(request.path).path in self.app.STREAM_APIS:
+                    await self._stream(writer, request, body, keep_alive)
+                else:
+                    status, headers, payload = await self._dispatch(request, body)
+                    await self._send(writer, status, headers, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            self.connections.discard(task)
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except (ConnectionError, asyncio.CancelledError):
+                pass
+
+    async def _read_request(self, reader):
+        try:
+            head = await reader.readuntil(b"\r\n\r\n")
+        except asyncio.LimitOverrunError:
+            raise _BadRequest(HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE)
+        except asyncio.IncompleteReadError as error:
+            if not error.partial:
+                return None, b"", False
+            raise
+        request_line, _, raw_headers = head.partition(b"\r\n")
+        try:
+            method, target, version = request_line.decode("latin-1").split()
+        except ValueError:
+            raise _BadRequest(HTTPStatus.BAD_REQUEST)
+        headers = parse_headers(io.BytesIO(raw_headers))
+        connection = (headers.get("Connection") or "").lower()
+        if version == "HTTP/1.1":
+            keep_alive = connection != "close"
+        else:
+            keep_alive = connection == "keep-alive"
+        try:
+            length = int(headers.get("Content-Length", 0))
+        except ValueError:
+            raise _BadRequest(HTTPStatus.BAD_REQUEST)
+        if length > MAX_BODY_BYTES:
+            raise _BadRequest(HTTPStatus.REQUEST_ENTITY_TOO_LARGE)
+        body = await reader.readexactly(length) if length > 0 else b""
+        return _Request(method.upper(), target, headers), body, keep_alive
+
+    async def _dispatch(self, request, body):
+        loop = asyncio.get_running_loop()
+        p = urlparse(request.path).path
+        if request.method == "OPTIONS":
+            return HTTPStatus.OK, [
+                ("Access-Control-Allow-Origin", "*"),
+                ("Access-Control-Allow-Methods", "GET,POST,OPTIONS"),
+                ("Access-Control-Allow-Headers", "Content-Type"),
+                ("Content-Length", "0"),
+            ], b""
+        if request.method not in ("GET", "POST"):
+            return HTTPStatus.METHOD_NOT_ALLOWED, [("Content-Length", "0")], b""
+        if p == "/" or p == "":
+            p = "/index.html"
+        if request.method == "POST" or p.startswith("/api/"):
+            try:
+                data = json.loads(body.decode()) if request.method == "POST" and body else {}
+            except ValueError:
+                return HTTPStatus.BAD_REQUEST, [("Content-Length", "0")], b""
+            pool = self._pool_for(p, request)
+            encoded = await loop.run_in_executor(pool, self._api, p, data, request)
+            return HTTPStatus.OK, [
+                ("Content-Type", "application/json; charset=utf-8"),
+                ("Access-Control-Allow-Origin", "*"),
+                ("Content-Length", str(len(encoded))),
+            ], encoded
+        content = await loop.run_in_executor(self.api_pool, self._read_static, p)
+        if content is None:
+            return HTTPStatus.NOT_FOUND, [("Content-Length", "0")], b""
+        fp, data = content
+        return HTTPStatus.OK, self.app.static_headers(fp, len(data)), data
+
+    async def _stream(self, writer, request, body, keep_alive):
+        """SSE 推送电脑回合：每个子动作单独占用一次 AI 线程池，结算完立即写出。"""
+        loop = asyncio.get_running_loop()
+        try:
+            data = json.loads(body.decode()) if body else {}
+        except ValueError:
+            await self._send(writer, HTTPStatus.BAD_REQUEST, [("Content-Length", "0")], b"", keep_alive)
+            return
+        path = urlparse(request.path).path
+        events = await loop.run_in_executor(self.ai_pool, self.app.stream_api, path, data, request)
+        await self._send(writer, HTTPStatus.OK, self.app.STREAM_HEADERS, b"", keep_alive)
+        while True:
+            event = await loop.run_in_executor(self.ai_pool, next, events, None)
+            if event is None:
+                break
+            writer.write(self.app.sse_event(event))
+            await writer.drain()
+        writer.write(self.app.STREAM_DONE)
+        await writer.drain()
+
+    def _api(self, path, body, request):
+        return self.app.encode_json(self.app.handle_api(path, body, request))
+
+    def _read_static(self, p):
+        fp = self.app.resolve_static_path(p)
+        if fp is None:
+            return None
+        with open(fp, "rb") as f:
+            return fp, f.read()
+
+    @staticmethod
+    async def _send(writer, status, headers, payload, keep_alive):
+        lines = [f"HTTP/1.1 {status.value} {status.phrase}"]
+        lines.extend(f"{name}: {value}" for name, value in headers)
+        if not keep_alive:
+            lines.append("Connection: close")
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + payload)
+        await writer.drain()
+
+
+def serve(port, app=None):
+    """阻塞运行 asyncio 服务，Ctrl+C 退出。"""
+    game_server = AsyncGameServer(port=port, app=app)
+    print("=== 三国武将卡牌游戏 Web 版（asyncio）===")
+    print(f"   打开浏览器访问: http://localhost:{port}")
+    print(f"   按 Ctrl+C 停止服务器")
+    try:
+        asyncio.run(game_server.serve_forever())
+    except KeyboardInterrupt:
+        print("\n👋 服务器已停止")
+    finally:
+        game_server.close()
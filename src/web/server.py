@@ -7,7 +7,10 @@
 import json
 import os
 import random
+import sys
 import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from copy import deepcopy
 from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
 from urllib.parse import urlparse, parse_qs
@@ -61,14 +64,27 @@ CACHE_MAX_AGE = {
     ".html": 0,       # 不缓存 HTML
 }
 
+# 电脑回合内，每个子动作结算后立即在后台预先计算下一个决策（按状态版本缓存），
+# 前端播放动画期间服务端不再空闲。设 SANGUO_PVE_SPECULATE=0 关闭。
+SPECULATE_AI = os.environ.get("SANGUO_PVE_SPECULATE", "1") != "0"
+_SPECULATION_POOL = ThreadPoolExecutor(
+    max_workers=int(os.environ.get("SANGUO_PVE_SPECULATE_WORKERS", "2")),
+    thread_name_prefix="pve-speculate",
+)
+
 
 class GameState:
-    """全局游戏状态——单例（简单实现，不涉及并发安全）"""
+    """一局游戏的状态（每个会话一份）。
+
+    电脑回合的预计算任务会在后台线程中读取实时战斗对象；任何结算开始前都要先经
+    ``_take_speculation`` 取消或等待该任务。
+    """
     def __init__(self):
         self.controller: GameFlowController = None
         self.phase = "menu"
         self.battle_system: BattleSystem = None
         self.rules = None
+        self._event_cursor = None
         self.battle_callbacks = None
         self.last_event = ""
         self.turn_count = 0
@@ -86,6 +102,11 @@ class GameState:
         self.ai_subphase = "skill"
         self.ai_action_count = 0
         self.ai_step_lock = threading.Lock()
+        # 状态版本号：每次改动状态的请求与每个电脑子动作加一，跨新局单调递增，
+        # 前端据此丢弃过期的推送。
+        self.version = 0
+        # (版本号, Future)：后台预先计算的电脑下一个子动作。
+        self._speculation = None
         # 仅供 Web 展示阵亡卡；不会写回权威阵型或参与目标判定。
         self.display_positions = {}
 
@@ -123,6 +144,7 @@ class GameState:
         self.last_ai_actions = []
         self.ai_subphase = "skill"
         self.ai_action_count = 0
+        self._speculation = None
         self.last_event = "人机对战已初始化" if self.mode == "pve" else "双人对战已初始化"
         self.turn_count = 0
         self.winner = ""
@@ -180,6 +202,39 @@ class GameState:
             self.ai_subphase = "skill"
             self.ai_action_count = 0
             self.last_ai_actions = []
+            self._speculate_ai_action()
+
+    def _speculate_ai_action(self):
+        """在后台为当前状态版本预先计算电脑的下一个子动作。"""
+        self._speculation = None
+        if not SPECULATE_AI or not self.is_ai_turn() or self.ai_action_count >= 64:
+            return
+        decide = getattr(self.ensure_pve_controller(), "decide_battle_action", None)
+        if decide is None:
+            return
+        future = _SPECULATION_POOL.submit(
+            decide, self.battle_system, self.controller.player2.team,
+            self.controller.player1.team, self.ai_subphase,
+        )
+        self._speculation = (self.version, future)
+
+    def _take_speculation(self):
+        """取出预计算结果；版本已变化、计算失败或尚未开始时返回 None，由调用方重新决策。
+
+        预计算线程池由所有会话共用：任务仍在排队时直接取消并当场决策，不排在其他
+        会话的预计算之后；已经开始的任务读取的是实时战斗对象，必须等它结束才能结算。
+        """
+        speculation, self._speculation = self._speculation, None
+        if speculation is None:
+            return None
+        version, future = speculation
+        if future.cancel():
+            return None
+        try:
+            action_id = future.result()
+        except Exception:
+            return None
+        return action_id if version == self.version else None
 
     def step_ai_action(self):
         with self.ai_step_lock:
@@ -187,16 +242,42 @@ class GameState:
                 return {"kind": "idle", "success": False, "done": self.phase == "over"}
             if self.ai_action_count >= 64:
                 raise RuntimeError("电脑单回合动作超过安全上限")
+            action_id = self._take_speculation()
             trace = self.ensure_pve_controller().step_battle_turn(
                 self, self.controller.player2.team, self.controller.player1.team,
-                self.ai_subphase,
+                self.ai_subphase, **({"action_id": action_id} if action_id is not None else {}),
             )
             trace = self._conceal_hidden_ai_actor(trace)
+            trace["precomputed"] = action_id is not None
+            self.version += 1
             self.ai_action_count += 1
             self.ai_subphase = trace.get("next_subphase", self.ai_subphase)
             self.last_ai_actions.append(trace)
+            self._speculate_ai_action()
             return trace
 
+    def ai_step_response(self):
+        """执行一个电脑子动作，返回附带动作轨迹（或失败原因）的状态。"""
+        try:
+            trace = self.step_ai_action()
+        except Exception as exc:
+            self.last_event = f"电脑行动失败：{exc}"
+            response = self.to_json()
+            response["ai_error"] = str(exc)
+            return response
+        response = self.to_json()
+        response["ai_action"] = trace
+        return response
+
+    def stream_ai_turn(self):
+        """连续结算电脑本回合剩余的子动作，每完成一步立即产出一份状态。"""
+        while self.is_ai_turn() and self.ai_action_count < 64:
+            response = self.ai_step_response()
+            yield response
+            action = response.get("ai_action") or {}
+            if response.get("ai_error") or action.get("kind") in (None, "idle", "finished"):
+                return
+
     def _conceal_hidden_ai_actor(self, trace):
         """Do not leak an unrevealed PvE ambush through the action trace."""
         actor_id = trace.get("actor_id")
@@ -255,25 +336,36 @@ class GameState:
             self.rules = BattleRulesService(self.battle_system)
         return self.rules
 
+    def _combat_event_cursor(self):
+        """当前战斗事件总线上的游标；战斗对象被替换后从新总线开头读起。"""
+        if self.battle_system is None:
+            return None
+        bus = self.battle_system.event_bus
+        if self._event_cursor is None or self._event_cursor.bus is not bus:
+            self._event_cursor = bus.subscribe(0)
+        return self._event_cursor
+
     def clear_combat_events(self):
-        """清空双方武将的表现事件，确保一次接口只返回本次结算。"""
-        if not self.controller:
-            return
-        for player in (self.controller.player1, self.controller.player2):
-            for general in player.selected_generals:
-                general.drain_combat_events()
+        """跳过尚未读取的表现事件，确保一次接口只返回本次结算。"""
+        cursor = self._combat_event_cursor()
+        if cursor is not None:
+            cursor.skip()
 
     def drain_combat_events(self):
-        """按队伍及阵位顺序收集本次结算产生的表现事件。"""
-        if not self.controller:
+        """按发生顺序读取本次结算产生的表现事件，并标注所属玩家。"""
+        cursor = self._combat_event_cursor()
+        if cursor is None or not self.controller:
             return []
+        sides = {
+            id(self.controller.player1.team): "p1",
+            id(self.controller.player2.team): "p2",
+        }
         events = []
-        for player_key, player in (("p1", self.controller.player1),
-                                   ("p2", self.controller.player2)):
-            for general in player.selected_generals:
-                for event in general.drain_combat_events():
-                    event.setdefault("team", player_key)
-                    events.append(event)
+        for team, event in cursor.read():
+            side = sides.get(id(team))
+            if side is not None:
+                event.setdefault("team", side)
+            events.append(event)
         return events
 
     @staticmethod
@@ -300,7 +392,7 @@ class GameState:
         result = {"phase": self.phase, "event": self.last_event,
                   "turn": self.turn_count, "winner": self.winner,
                   "cost_limit": self.cost_limit, "mode": self.mode,
-                  "human_team": "p1", "ai_team": "p2" if self.mode == "pve" else None}
+                  "version": self.version, "human_team": "p1", "ai_team": "p2" if self.mode == "pve" else None}
         if self.mode == "pve":
             ai = self.ensure_pve_controller()
             result["ai_difficulty"] = self.ai_difficulty
@@ -427,11 +519,38 @@ class GameState:
 
 STATE = GameState()
 
+# 请求头带 X-Game-Session 时使用该会话独立的 GameState，供压测工具模拟多名玩家；
+# 浏览器不发送该头，仍然共用 STATE。会话数有上限，最久未访问的先淘汰。
+SESSION_HEADER = "X-Game-Session"
+MAX_SESSIONS = 256
+_SESSIONS = OrderedDict()
+_SESSIONS_LOCK = threading.Lock()
+
+
+# 只读或自行按子动作计数版本的接口，其余接口每次调用使状态版本加一。
+_UNVERSIONED_APIS = ("/api/state", "/api/generals", "/api/pve/step")
+
+
+def state_for(handler):
+    """返回本次请求对应的游戏状态。"""
+    headers = getattr(handler, "headers", None)
+    session = headers.get(SESSION_HEADER) if headers is not None else None
+    if not session:
+        return STATE
+    with _SESSIONS_LOCK:
+        state = _SESSIONS.pop(session, None) or GameState()
+        _SESSIONS[session] = state
+        while len(_SESSIONS) > MAX_SESSIONS:
+            _SESSIONS.popitem(last=False)
+    return state
+
 
 # ---- API Handler ----
 def handle_api(path, body, handler):
-    global STATE
+    STATE = state_for(handler)
     c = STATE.controller
+    if path not in _UNVERSIONED_APIS:
+        STATE.version += 1
 
     # POST /api/new → 开始新游戏
     if path == "/api/new":
@@ -579,16 +698,7 @@ def handle_api(path, body, handler):
         if not STATE.is_ai_turn():
             STATE.last_event = "当前轮到玩家行动"
             return STATE.to_json()
-        try:
-            trace = STATE.step_ai_action()
-        except Exception as exc:
-            STATE.last_event = f"电脑行动失败：{exc}"
-            response = STATE.to_json()
-            response["ai_error"] = str(exc)
-            return response
-        response = STATE.to_json()
-        response["ai_action"] = trace
-        return response
+        return STATE.ai_step_response()
 
     # POST /api/battle/next or /api/battle/skip -> end current player's turn
     if path in ("/api/battle/next", "/api/battle/skip") and STATE.battle_system and STATE.phase == "battle":
@@ -901,6 +1011,75 @@ def handle_api(path, body, handler):
 
 
 # ---- HTTP Server ----
+def resolve_static_path(p):
+    """把请求路径映射到静态文件；图片依次尝试各资源目录并优先 WebP，找不到返回 None。"""
+    fp = os.path.join(WEB_DIR, p.lstrip("/"))
+    # Try WebP versions first for images (smaller)
+    img_dirs = [GENERALS_WEBP_DIR, GENERALS_FULL_DIR, GENERALS_IMG_DIR, BG_WEBP_DIR, BG_DIR]
+    for d in img_dirs:
+        if os.path.exists(fp) and os.path.isfile(fp):
+            break
+        if p.endswith((".png", ".jpg", ".webp")):
+            alt = os.path.join(d, os.path.basename(p).replace(".png", ".webp").replace(".jpg", ".webp"))
+            if os.path.exists(alt) and os.path.isfile(alt):
+                fp = alt; break
+            alt2 = os.path.join(d, os.path.basename(p))
+            if os.path.exists(alt2) and os.path.isfile(alt2):
+                fp = alt2; break
+    return fp if os.path.exists(fp) and os.path.isfile(fp) else None
+
+
+def static_headers(fp, length):
+    """静态文件响应头：类型、长度与缓存策略。"""
+    ext = os.path.splitext(fp)[1]
+    cache_age = CACHE_MAX_AGE.get(ext, 0)
+    return [
+        ("Content-Type", MIME.get(ext, "application/octet-stream")),
+        ("Content-Length", str(length)),
+        ("Cache-Control", f"public, max-age={cache_age}" if cache_age > 0 else "no-cache"),
+    ]
+
+
+def encode_json(data):
+    """``handle_api`` 的返回值可能已是 JSON 文本，统一编码为 UTF-8 字节。"""
+    text = data if isinstance(data, str) else json.dumps(data, ensure_ascii=False)
+    return text.encode("utf-8")
+
+
+# 流式接口：一次请求内结算电脑整个回合，每个子动作一结算完就以 SSE 推送，
+# 前端从自己的队列里依次播放，不再每步往返一次 /api/pve/step。
+STREAM_APIS = ("/api/pve/stream",)
+STREAM_HEADERS = [
+    ("Content-Type", "text/event-stream; charset=utf-8"),
+    ("Cache-Control", "no-cache"),
+    ("Access-Control-Allow-Origin", "*"),
+    ("Transfer-Encoding", "chunked"),
+]
+
+
+def stream_api(path, body, handler):
+    """返回逐条推送的状态；每条与一次 ``/api/pve/step`` 的响应相同。"""
+    STATE = state_for(handler)
+    if STATE.controller is None or STATE.mode != "pve" or STATE.phase != "battle":
+        STATE.last_event = "当前没有可执行的电脑回合"
+        return iter([STATE.to_json()])
+    if not STATE.is_ai_turn():
+        STATE.last_event = "当前轮到玩家行动"
+        return iter([STATE.to_json()])
+    return STATE.stream_ai_turn()
+
+
+def sse_event(data, event="action"):
+    """编码一条 SSE 消息（已按 chunked 分块）；``id`` 为状态版本号。"""
+    version = data.get("version", "") if isinstance(data, dict) else ""
+    text = encode_json(data).decode("utf-8")
+    message = f"id: {version}\nevent: {event}\ndata: {text}\n\n".encode("utf-8")
+    return f"{len(message):X}\r\n".encode("ascii") + message + b"\r\n"
+
+
+STREAM_DONE = sse_event({}, "done") + b"0\r\n\r\n"
+
+
 class GameServer(BaseHTTPRequestHandler):
     protocol_version = "HTTP/1.1"
 
@@ -911,33 +1090,13 @@ class GameServer(BaseHTTPRequestHandler):
         if p.startswith("/api/"):
             self._json(handle_api(p, {}, self))
             return
-        # Static files — check multiple directories
-        fp = os.path.join(WEB_DIR, p.lstrip("/"))
-        # Try WebP versions first for images (smaller)
-        img_dirs = [GENERALS_WEBP_DIR, GENERALS_FULL_DIR, GENERALS_IMG_DIR, BG_WEBP_DIR, BG_DIR]
-        for d in img_dirs:
-            if os.path.exists(fp) and os.path.isfile(fp):
-                break
-            if p.endswith((".png", ".jpg", ".webp")):
-                alt = os.path.join(d, os.path.basename(p).replace(".png", ".webp").replace(".jpg", ".webp"))
-                if os.path.exists(alt) and os.path.isfile(alt):
-                    fp = alt; break
-                alt2 = os.path.join(d, os.path.basename(p))
-                if os.path.exists(alt2) and os.path.isfile(alt2):
-                    fp = alt2; break
-        if os.path.exists(fp) and os.path.isfile(fp):
-            ext = os.path.splitext(fp)[1]
+        fp = resolve_static_path(p)
+        if fp is not None:
             with open(fp, "rb") as f:
                 content = f.read()
             self.send_response(200)
-            self.send_header("Content-Type", MIME.get(ext, "application/octet-stream"))
-            self.send_header("Content-Length", str(len(content)))
-            # Cache headers
-            cache_age = CACHE_MAX_AGE.get(ext, 0)
-            if cache_age > 0:
-                self.send_header("Cache-Control", f"public, max-age={cache_age}")
-            else:
-                self.send_header("Cache-Control", "no-cache")
+            for name, value in static_headers(fp, len(content)):
+                self.send_header(name, value)
             self.end_headers()
             self.wfile.write(content)
         else:
@@ -949,14 +1108,23 @@ class GameServer(BaseHTTPRequestHandler):
         p = urlparse(self.path).path
         cl = int(self.headers.get("Content-Length", 0))
         body = json.loads(self.rfile.read(cl).decode()) if cl > 0 else {}
+        if p in STREAM_APIS:
+            self._stream(stream_api(p, body, self))
+            return
         self._json(handle_api(p, body, self))
 
+    def _stream(self, events):
+        self.send_response(200)
+        for name, value in STREAM_HEADERS:
+            self.send_header(name, value)
+        self.end_headers()
+        for data in events:
+            self.wfile.write(sse_event(data))
+            self.wfile.flush()
+        self.wfile.write(STREAM_DONE)
+
     def _json(self, data):
-        if isinstance(data, str):
-            text = data
-        else:
-            text = json.dumps(data, ensure_ascii=False)
-        encoded = text.encode("utf-8")
+        encoded = encode_json(data)
         self.send_response(200)
         self.send_header("Content-Type", "application/json; charset=utf-8")
         self.send_header("Access-Control-Allow-Origin", "*")
@@ -976,9 +1144,17 @@ class GameServer(BaseHTTPRequestHandler):
         pass  # quiet
 
 
-def start():
+def start(mode=None):
+    """启动 Web 服务；``mode`` 为 ``threading``（默认）或 ``asyncio``，未指定时读 ``SANGUO_WEB_SERVER``。"""
     os.makedirs(WEB_DIR, exist_ok=True)
     port = int(os.environ.get("PORT", "8090"))
+    mode = mode or os.environ.get("SANGUO_WEB_SERVER", "threading")
+    if mode == "asyncio":
+        from src.web.async_server import serve
+        serve(port, app=sys.modules[__name__])
+        return
+    if mode != "threading":
+        raise ValueError(f"未知的服务模式: {mode}")
     server = ThreadingHTTPServer(("0.0.0.0", port), GameServer)
     print("=== 三国武将卡牌游戏 Web 版 ===")
     print(f"   打开浏览器访问: http://localhost:{port}")
@@ -991,4 +1167,7 @@ def start():
 
 
 if __name__ == "__main__":
-    start()
+    import argparse
+    parser = argparse.ArgumentParser(description="三国武将卡牌游戏 Web 服务")
+    parser.add_argument("--server", choices=("threading", "asyncio"), help="服务模式（默认读 SANGUO_WEB_SERVER）")
+    start(parser.parse_args().server)
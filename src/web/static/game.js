@@ -941,19 +941,102 @@ function scheduleComputerTurn() {
   setTimeout(function() { runComputerTurn(generation); }, window.__stressMode ? 0 : 750);
 }
 
+/**
+ * 电脑回合的状态来源：优先 POST /api/pve/stream，服务端一次算完整个回合并逐个子动作
+ * 推送；动画从本地队列依次播放。浏览器不支持流式读取或请求失败时退回逐步 /api/pve/step。
+ */
+function openComputerTurnSource() {
+  var queue = [];
+  var lastVersion = -1;
+  var finished = false;
+  var streamed = false;
+  var wake = null;
+  var controller = window.AbortController ? new AbortController() : null;
+
+  function notify() {
+    if (wake) { var resume = wake; wake = null; resume(); }
+  }
+  function push(state) {
+    // 版本号单调递增；重复或过期的推送直接丢弃。
+    if (typeof state.version === "number" && state.version <= lastVersion) return;
+    lastVersion = typeof state.version === "number" ? state.version : lastVersion;
+    streamed = true;
+    queue.push(state);
+    notify();
+  }
+
+  if (window.ReadableStream && window.TextDecoder) {
+    fetch("/api/pve/stream", {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: "{}",
+      signal: controller ? controller.signal : undefined
+    }).then(function(r) {
+      if (!r.ok || !r.body) throw new Error("HTTP " + r.status);
+      var reader = r.body.getReader();
+      var decoder = new TextDecoder();
+      var buffer = "";
+      function pump() {
+        return reader.read().then(function(chunk) {
+          if (chunk.done) return;
+          buffer += decoder.decode(chunk.value, { stream: true });
+          var boundary;
+          while ((boundary = buffer.indexOf("\n\n")) >= 0) {
+            var block = buffer.slice(0, boundary);
+            buffer = buffer.slice(boundary + 2);
+            var name = "message", data = "";
+            block.split("\n").forEach(function(line) {
+              if (line.indexOf("event: ") === 0) name = line.slice(7);
+              else if (line.indexOf("data: ") === 0) data += line.slice(6);
+            });
+            if (name === "action" && data) push(JSON.parse(data));
+          }
+          return pump();
+        });
+      }
+      return pump();
+    }).catch(function(error) {
+      if (!controller || !controller.signal.aborted) console.warn("AI stream unavailable:", error);
+    }).then(function() {
+      finished = true;
+      notify();
+    });
+  } else {
+    finished = true;
+  }
+
+  return {
+    next: async function() {
+      while (!queue.length && !finished) {
+        await new Promise(function(resolve) { wake = resolve; });
+      }
+      if (queue.length) {
+        G = queue.shift();
+        return G;
+      }
+      // 流未产出任何状态时逐步请求；已推送过的回合由服务端判定是否还轮到电脑。
+      return streamed ? null : call("/pve/step");
+    },
+    close: function() {
+      if (controller) controller.abort();
+    }
+  };
+}
+
 async function runComputerTurn(generation) {
   if (_aiTurnRunning || !isComputerTurn() || generation !== _aiTurnGeneration) return;
   _aiTurnRunning = true;
   clearBattleSelection();
   setStatus("电脑正在观察战场……");
+  var source = openComputerTurnSource();
   try {
     await sleep(650);
     for (var step = 0; step < 64 && isComputerTurn(); step++) {
       if (generation !== _aiTurnGeneration) return;
       var beforeState = G;
-      var response = await call("/pve/step");
+      var response = await source.next();
       if (!response) {
-        setStatus("电脑行动请求失败，请检查服务器连接");
+        if (isComputerTurn()) setStatus("电脑行动请求失败，请检查服务器连接");
         break;
       }
       if (response.ai_error) {
@@ -974,6 +1057,7 @@ async function runComputerTurn(generation) {
     console.error("computer turn error:", error);
     setStatus("电脑行动播放失败：" + error.message);
   } finally {
+    source.close();
     _aiTurnRunning = false;
   }
 }
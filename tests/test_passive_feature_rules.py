@@ -175,4 +175,76 @@ def test_ambush_active_skill_records_reveal_event():
     assert ambush.get_passive_skill("伏兵").is_hidden is False
     reveal = next(event for event in ambush.drain_combat_events() if event["type"] == "ambush_reveal")
     assert reveal["reason"] == "skill"
-    assert reveal["skill"] == ambush.active_skill.name
\ No newline at end of file
+    assert reveal["skill"] == ambush.active_skill.name
+
+
+def test_slotted_models_keep_dict_style_effect_access():
+    general = make_general("连计", 5, 5, [Attribute.CHAIN, Attribute.AMBUSH])
+    team = Team("队伍")
+    team.add_general(general)
+    general.add_buff("force_boost", 2, 2)
+    general.add_pending_debuff("force_reduction", 1, 1, 2)
+
+    buff, pending = general.buffs[0], general.pending_debuffs[0]
+    assert (buff["type"], buff.get("value"), buff["duration"]) == ("force_boost", 2, 2)
+    assert "delay_turns" not in buff and buff.get("delay_turns", 0) == 0
+    assert pending["delay_turns"] == 2
+    buff["duration"] -= 1
+    assert buff.copy() == buff and buff.copy() is not buff
+    for value in (general, team, buff, *general.passive_skills):
+        assert not hasattr(value, "__dict__"), type(value).__name__
+
+
+def test_chain_group_shares_one_effect_list_and_expires_once_per_turn():
+    first = make_general("连计1", 5, 8, [Attribute.CHAIN])
+    second = make_general("连计2", 5, 8, [Attribute.CHAIN])
+    third = make_general("连计3", 5, 8, [Attribute.CHAIN])
+    team = Team("连计队")
+    for general in (first, second, third):
+        team.add_general(general)
+
+    first.add_buff("force_boost", 2, 2)
+    second.add_buff("debuff_immunity", 0, 1)
+    assert first.buffs is second.buffs is third.buffs
+    third.add_debuff("force_reduction", 1, 3)
+    assert first.debuffs == []
+
+    team.update_effects()
+    assert [(buff["type"], buff["duration"]) for buff in third.buffs] == [("force_boost", 1)]
+    team.update_effects()
+    assert first.buffs == second.buffs == third.buffs == []
+
+    second.add_buff("damage_shield", 3, 2)
+    first.take_damage(2, damage_source="skill")
+    assert not third.has_buff_type("damage_shield")
+
+    third.is_alive = False
+    team.sync_chain_group()
+    first.add_buff("force_boost", 1, 2)
+    assert third.buffs == [] and len(second.buffs) == 1
+    third.is_alive = True
+    third.sync_chain_effects()
+    assert third.buffs is first.buffs
+
+    second.add_buff("troop_boost", 2, 3)
+    first.take_damage(100, damage_source="skill")
+    assert not first.is_alive
+    team.update_effects()
+    assert [buff["duration"] for buff in second.buffs if buff["type"] == "troop_boost"] == [2]
+    assert first.buffs is not second.buffs
+
+
+def test_cleansing_one_chain_member_cleanses_the_whole_chain():
+    caster = make_general("连计1", 5, 8, [Attribute.CHAIN], get_skill_by_id("steadfast"))
+    ally = make_general("连计2", 5, 8, [Attribute.CHAIN])
+    outsider = make_general("普通", 5, 8)
+    team = Team("连计队")
+    for general in (caster, ally, outsider):
+        team.add_general(general)
+    ally.add_debuff("force_reduction", 1, 3)
+    outsider.add_debuff("force_reduction", 1, 3)
+
+    caster.active_skill.execute(caster, [caster], BattleContext(team, Team("敌方")))
+    assert ally.debuffs == [] and ally.has_buff_type("debuff_immunity")
+    ally.add_debuff("force_reduction", 1, 3)
+    assert caster.debuffs == [] and len(outsider.debuffs) == 1
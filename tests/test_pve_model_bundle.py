@@ -43,6 +43,24 @@ def test_tracked_pve_bundle_is_complete_and_matches_manifest():
         }
 
 
+def test_tracked_quantized_variants_passed_their_precision_gate():
+    manifest = json.loads((PVE_MODELS_DIR / "manifest.json").read_text(encoding="utf-8"))
+    for difficulty in PVE_DIFFICULTIES:
+        quantized = manifest["difficulties"][difficulty].get("quantized")
+        if not quantized:
+            continue
+        gate = quantized["gate"]
+        assert gate["passed"]
+        assert gate["action_agreement"] >= gate["thresholds"]["min_action_agreement"]
+        assert (
+            gate["fp32_win_rate"] - gate["win_rate"]
+            <= gate["thresholds"]["max_win_rate_drop"]
+        )
+        for part in ("battle", "prebattle"):
+            path = PVE_MODELS_DIR / quantized[part]["file"]
+            assert file_sha256(path) == quantized[part]["sha256"]
+
+
 def test_tracked_pve_bundle_loads_with_current_code_schema():
     for difficulty in PVE_DIFFICULTIES:
         controller = PVEController(difficulty=difficulty, device="cpu").load()
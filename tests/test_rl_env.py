@@ -1,9 +1,12 @@
 """离线强化学习环境的基本契约测试。"""
+from collections import Counter
+from itertools import combinations
 import random
 
 import numpy as np
 
 from src.rl.env import SanguoEnv
+from src.rl.roster_sampler import RosterSampler
 from src.game_data.generals_data import GENERALS_DATA
 from src.rl.observation import (
     ATTRIBUTES,
@@ -16,16 +19,16 @@ from src.rl.observation import (
 )
 
 
-def _trajectory(seed, action_seed):
-    env = SanguoEnv()
-    observation, _ = env.reset(seed)
+def _trajectory(seed, action_seed, env=None, **reset_kwargs):
+    env = env or SanguoEnv()
+    observation, _ = env.reset(seed, **reset_kwargs)
     rng = random.Random(action_seed)
     result = []
     done = False
     while not done and len(result) < 500:
         action = rng.choice(env.legal_actions())
         observation, reward, done, info = env.step(action)
-        result.append((action, round(reward, 6), env.battle_system.turn_count, tuple(observation[:5])))
+        result.append((action, round(reward, 6), env.battle_system.turn_count, observation.tobytes()))
     return result, done
 
 
@@ -60,6 +63,31 @@ def test_rl_environment_is_reproducible_for_seed_and_actions():
     assert first == second
 
 
+def test_pooled_reset_replays_episodes_identically_to_fresh_generals():
+    env = SanguoEnv(team_size=0, max_team_size=6)
+    for seed in range(6):
+        _trajectory(seed, seed, env, mirror=seed % 2 == 0)
+    pooled_generals = {id(general) for general in env.general_pool.generals[0].values()}
+    for seed, kwargs in ((41, {}), (42, {"mirror": True}), (43, {"rosters": ([1004, 1004], [4004])})):
+        fresh, _ = _trajectory(seed, 7, SanguoEnv(team_size=0, max_team_size=6), **kwargs)
+        assert _trajectory(seed, 7, env, **kwargs)[0] == fresh
+    assert {id(general) for general in env.controller.player1.team.generals} & pooled_generals
+    assert len(set(map(id, env.controller.player1.team.generals))) == 2
+
+
+def test_phase_timing_is_exclusive_and_keeps_trajectories_identical():
+    plain, _ = _trajectory(31, 99)
+    env = SanguoEnv(phase_timing=True)
+    timed, _ = _trajectory(31, 99, env)
+    assert timed == plain
+    timings = env.phase_timer.drain()
+    assert {"env_step", "env_reset", "rules", "action_mask", "observation", "opponent_turn"} <= set(timings)
+    assert timings["env_step"][1] == len(timed) and timings["env_reset"][1] == 1
+    assert all(seconds >= 0 for seconds, _ in timings.values())
+    assert env.phase_timer.drain() == {}
+    assert SanguoEnv().phase_timer is None
+
+
 def test_observation_v2_registry_covers_game_content():
     assert set(CAMPS) == {"魏", "蜀", "吴", "凉", "袁", "他"}
     assert "fence_rebuild" in SKILL_IDS
@@ -81,15 +109,14 @@ def test_observation_changes_for_fence_and_buff_runtime_state():
     if fenced is not None:
         fence = fenced.get_passive_skill("防栅")
         with_fence = env.observation()
-        fence.is_active = False
+        fence.is_active = not fence.is_active
         assert not np.array_equal(with_fence, env.observation())
 
 
 def test_variable_roster_sampling_covers_multiple_legal_team_sizes():
     env = SanguoEnv(
         team_size=0, min_team_size=1, max_team_size=8,
-        team_size_power=1.0, roster_candidate_samples=128,
-        roster_cost_bias=0.8, cost_limit=8.0,
+        team_size_power=1.0, roster_cost_bias=0.8, cost_limit=8.0,
     )
     sizes = set()
     for seed in range(80):
@@ -108,4 +135,29 @@ def test_fixed_team_size_sampling_remains_backward_compatible():
     env.rng = random.Random(7)
     selection = env._choose_selection(GENERALS_DATA)
     assert len(selection) == 3
-    assert sum(float(item["cost"]) for item in selection) <= 8.0
\ No newline at end of file
+    assert sum(float(item["cost"]) for item in selection) <= 8.0
+
+
+def test_roster_sampler_counts_and_draws_uniformly_within_cost_rank():
+    costs = [1.0, 1.5, 2.0, 2.5, 3.0, 1.0]
+    sampler = RosterSampler(costs, cost_limit=5.0, max_size=3)
+    legal = {
+        size: [combo for combo in combinations(range(len(costs)), size)
+               if sum(costs[index] for index in combo) <= 5.0]
+        for size in range(4)
+    }
+    assert [sampler.count(size) for size in range(4)] == [len(legal[size]) for size in range(4)]
+    assert sampler.count(4) == 0
+    assert RosterSampler(costs[::-1], cost_limit=5.0, max_size=3).counts is sampler.counts
+
+    rng = random.Random(3)
+    uniform = Counter(tuple(sampler.sample(rng, 2)) for _ in range(6000))
+    assert set(uniform) == set(legal[2])
+    expected = 6000 / len(legal[2])
+    assert all(abs(count - expected) < 0.25 * expected for count in uniform.values())
+
+    ranked = sorted(legal[2], key=lambda combo: sum(costs[index] for index in combo), reverse=True)
+    elite_cost = sum(costs[index] for index in ranked[round(len(ranked) * 0.25) - 1])
+    for _ in range(200):
+        chosen = sampler.sample(rng, 2, elite_fraction=0.25)
+        assert sum(costs[index] for index in chosen) >= elite_cost
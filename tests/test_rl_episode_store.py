@@ -0,0 +1,107 @@
+"""列式 episode telemetry store 与 JSONL 转换测试。"""
+from dataclasses import asdict
+import json
+from types import SimpleNamespace
+
+import numpy as np
+
+from src.rl.training.episode_store import EpisodeStore, EpisodeTable, convert_jsonl
+from src.rl.training.logging import TrainLogger
+from src.rl.training.vector_env import EpisodeSummary, GeneralRecord
+from tools.rl.train_prebattle import load_records
+
+
+def _summary(index):
+    roster_self, roster_enemy = [1001, 2003 + index % 3], [4004]
+    return EpisodeSummary(
+        outcome=("win", "loss", "draw")[index % 3], winner_name="玩家1", timeout=index % 3 == 2,
+        turns=10 + index, steps=20 + index, episode_reward=0.25 * index, no_progress_count=index % 2,
+        action_counts={"skill": 1, "attack": index, "end": 2},
+        damage_by_general_id={1001: 3.5},
+        learning_team_name="玩家1", enemy_team_name="玩家2",
+        learning_generals=[GeneralRecord(1001, "甲", 0.5, True), GeneralRecord(roster_self[1], "乙", 0.0, False)],
+        enemy_generals=[GeneralRecord(4004, "丙", 1.0, True)],
+        opponent_id="snapshot-7", seed=900 + index,
+        roster_self=roster_self, roster_enemy=roster_enemy,
+        formation_self=[{"general_id": 1001, "row": 0, "col": 1},
+                        {"general_id": roster_self[1], "row": 2, "col": 3}],
+        formation_enemy=[] if index == 4 else [{"general_id": 4004, "row": 1, "col": 0}],
+        skill_usage_by_general_id={1001: 2},
+        synergy_events=[{"side": "self", "type": "fence_block", "seq": index}] if index % 2 else [],
+    )
+
+
+def test_logger_store_round_trips_episode_summaries_and_slices_by_update(tmp_path):
+    logger = TrainLogger(root=tmp_path, run_name="run")
+    summaries = [_summary(index) for index in range(6)]
+    for update in range(3):
+        logger.log_episodes(update, summaries[update * 2:update * 2 + 2])
+    logger.close()
+
+    table = EpisodeTable(tmp_path / "run" / "episodes")
+    assert len(table) == 6 and isinstance(table["roster_self"], np.memmap)
+    assert list(table.update_rows(1, 2)) == [2, 3]
+    restored = table.records()
+    expected = [{**asdict(summary), "update": index // 2} for index, summary in enumerate(summaries)]
+    for record, original in zip(restored, expected):
+        original.pop("replay")
+        original = json.loads(json.dumps(original))
+        for key in ("learning_generals", "enemy_generals"):
+            for general in original[key]:
+                general.pop("name")
+        record = json.loads(json.dumps(record))
+        assert record == original
+
+
+def test_logger_writer_thread_keeps_metric_rows_in_order(tmp_path):
+    logger = TrainLogger(root=tmp_path, run_name="run", flush_interval=60.0)
+    logger.log(1, {"loss": 0.5, "note": "skip", "count": 3}, "train")
+    logger.log(2, {"win_rate": 1}, "eval")
+    logger.flush()
+    lines = (tmp_path / "run" / "metrics.csv").read_text(encoding="utf-8").splitlines()
+    assert lines == ["step,tag,value", "1,train/loss,0.5", "1,train/count,3.0", "2,eval/win_rate,1.0"]
+    logger.log(3, {"loss": 0.25}, "train")
+    logger.close()
+    logger.close()
+    assert (tmp_path / "run" / "metrics.csv").read_text(encoding="utf-8").splitlines()[-1] == "3,train/loss,0.25"
+
+
+def test_store_drops_uncommitted_tail_and_matches_jsonl_prebattle_records(tmp_path):
+    source = tmp_path / "episodes.jsonl"
+    with source.open("w", encoding="utf-8") as stream:
+        for index in range(9):
+            payload = {**asdict(_summary(index)), "update": index}
+            payload.pop("replay")
+            stream.write(json.dumps(payload, ensure_ascii=False) + "\n")
+        stream.write("{broken\n")
+    store_path = tmp_path / "episodes"
+    assert convert_jsonl(source, store_path, batch_size=4) == (9, 1)
+
+    with (store_path / "turns.bin").open("ab") as handle:
+        handle.write(b"\0" * 12)  # 模拟写列后、提交 meta 前中断
+    store = EpisodeStore(store_path)
+    assert (store_path / "turns.bin").stat().st_size == 9 * 4
+    store.append([{**asdict(_summary(0)), "update": 3}])
+    table = EpisodeTable(store_path)
+    assert not table.meta["sorted"]
+    assert list(table.update_rows(3, 4)) == [3, 9]
+
+    args = SimpleNamespace(seed=1, min_update=2, validation_update=6, max_train=100, max_validation=100)
+    from_jsonl = load_records(source, args)
+    EpisodeTable(store_path)  # 只读打开不会改动
+    store_only = tmp_path / "only"
+    convert_jsonl(source, store_only)
+    from_store = load_records(store_only, args)
+    for store_samples, jsonl_samples in zip(from_store[:2], from_jsonl[:2]):
+        assert store_samples.keys() == jsonl_samples.keys()
+        for key in store_samples:
+            assert np.array_equal(store_samples[key], jsonl_samples[key]), key
+    assert from_store[2] == from_jsonl[2] == 1
+
+    # 默认路径指向 run 下的 episodes/；旧 run 只有 episodes.jsonl 时自动回退。
+    legacy_run = tmp_path / "legacy"
+    legacy_run.mkdir()
+    (legacy_run / "episodes.jsonl").write_text(source.read_text(encoding="utf-8"), encoding="utf-8")
+    from_legacy = load_records(legacy_run / "episodes", args)
+    assert from_legacy[2] == 1
+    assert np.array_equal(from_legacy[0]["target"], from_jsonl[0]["target"])
@@ -0,0 +1,226 @@
+import json
+from types import SimpleNamespace
+
+import numpy as np
+import torch
+
+from src.rl import actions
+from src.rl.env import SanguoEnv
+from src.rl.models.actor_critic_v3 import ActorCritic, MODEL_SCHEMA
+from src.rl.models.numpy_runtime import (
+    BATTLE_MODEL_SCHEMA,
+    NumpyActorCritic,
+    export_battle_checkpoint,
+    export_prebattle_checkpoint,
+    load_prebattle_models,
+    load_weights,
+    save_quantized,
+    weights_path,
+)
+from src.rl.observation import OBSERVATION_SCHEMA, OBSERVATION_SIZE
+from src.rl.opponents import RandomOpponent
+from src.rl.prebattle import (
+    GENERAL_IDS,
+    PREBATTLE_SCHEMA,
+    build_models,
+    encode_draft,
+    encode_formation,
+)
+from src.rl import pve
+from src.rl.pve import PVEController, deployed_quantization, deployed_student
+from tools.rl.distill_pve_students import DEFAULT_STUDENT_CONFIG, distill
+
+
+def fixed_observations(count=6):
+    env = SanguoEnv(RandomOpponent())
+    observations, masks = [], []
+    rng = np.random.default_rng(11)
+    observation, info = env.reset(2026072500)
+    while len(observations) < count:
+        observations.append(observation)
+        masks.append(info["action_mask"])
+        legal = np.flatnonzero(info["action_mask"] == 0)
+        observation, _, done, info = env.step(int(rng.choice(legal)))
+        if done:
+            observation, info = env.reset(2026072500 + len(observations))
+    return np.stack(observations), np.stack(masks)
+
+
+def battle_state(model):
+    return {
+        "model": model.state_dict(), "update": 7,
+        "observation_schema": OBSERVATION_SCHEMA, "observation_size": OBSERVATION_SIZE,
+        "action_size": actions.ACTION_SIZE, "model_schema": MODEL_SCHEMA,
+    }
+
+
+def test_numpy_actor_critic_matches_torch_on_fixed_observations(tmp_path):
+    torch.manual_seed(3)
+    model = ActorCritic(OBSERVATION_SIZE, actions.ACTION_SIZE).eval()
+    observations, masks = fixed_observations()
+    path = export_battle_checkpoint(battle_state(model), tmp_path / "battle.npz")
+    runtime = NumpyActorCritic.from_file(path)
+
+    with torch.no_grad():
+        expected_logits, expected_values = model(
+            torch.as_tensor(observations), torch.as_tensor(masks, dtype=torch.bool),
+        )
+    logits, values = runtime(observations, masks)
+
+    assert BATTLE_MODEL_SCHEMA == MODEL_SCHEMA
+    assert runtime.header["update"] == 7
+    np.testing.assert_allclose(logits, expected_logits.numpy(), rtol=1e-4, atol=1e-4)
+    np.testing.assert_allclose(values, expected_values.numpy(), rtol=1e-4, atol=1e-5)
+    assert np.array_equal(logits.argmax(axis=-1), expected_logits.argmax(dim=-1).numpy())
+
+
+def test_numpy_prebattle_value_nets_match_torch(tmp_path):
+    torch.manual_seed(5)
+    draft_model, formation_model = build_models()
+    state = {
+        "schema": PREBATTLE_SCHEMA, "general_ids": GENERAL_IDS,
+        "draft_model": draft_model.state_dict(),
+        "formation_model": formation_model.state_dict(),
+        "metadata": {"seed": 5},
+    }
+    path = export_prebattle_checkpoint(state, tmp_path / "prebattle.npz")
+    numpy_draft, numpy_formation, header = load_prebattle_models(path)
+    first, second, third, fourth = GENERAL_IDS[:4]
+    drafts = [encode_draft([first, second], [third]), encode_draft([fourth], [first, third])]
+    formations = [
+        encode_formation(
+            [first, second], [third],
+            [{"general_id": first, "row": 0, "col": 1}, {"general_id": second, "row": 2, "col": 3}],
+            [{"general_id": third, "row": 1, "col": 2}],
+        ),
+    ]
+
+    with torch.no_grad():
+        expected_draft = draft_model(torch.tensor(drafts)).numpy()
+        expected_formation = formation_model(torch.tensor(formations)).numpy()
+    assert header["metadata"] == {"seed": 5}
+    np.testing.assert_allclose(numpy_draft(np.asarray(drafts)), expected_draft, atol=1e-5)
+    np.testing.assert_allclose(
+        numpy_formation(np.asarray(formations)), expected_formation, atol=1e-5,
+    )
+
+
+def test_pve_controller_numpy_runtime_selects_same_actions_as_torch(tmp_path):
+    torch.manual_seed(9)
+    model = ActorCritic(OBSERVATION_SIZE, actions.ACTION_SIZE)
+    torch.save(battle_state(model), tmp_path / "battle_policy_hard.pt")
+    export_battle_checkpoint(battle_state(model), tmp_path / "battle_policy_hard.npz")
+    draft_model, formation_model = build_models()
+    prebattle = {
+        "schema": PREBATTLE_SCHEMA, "general_ids": GENERAL_IDS,
+        "draft_model": draft_model.state_dict(),
+        "formation_model": formation_model.state_dict(),
+    }
+    export_prebattle_checkpoint(prebattle, tmp_path / "prebattle_value_hard.npz")
+
+    torch_controller = PVEController(
+        tmp_path / "battle_policy_hard.pt", tmp_path / "prebattle_value_hard.pt",
+        difficulty="hard", runtime="torch",
+    ).load()
+    numpy_controller = PVEController(
+        tmp_path / "battle_policy_hard.pt", tmp_path / "prebattle_value_hard.pt",
+        difficulty="hard", runtime="numpy",
+    ).load()
+
+    assert numpy_controller.active_runtime == "numpy"
+    assert numpy_controller.load_errors == []
+    assert numpy_controller.prebattle.available
+    for observation, mask in zip(*fixed_observations()):
+        action = numpy_controller.choose_battle_action(observation, mask)
+        assert mask[action] == 0
+        assert action == torch_controller.choose_battle_action(observation, mask)
+
+
+def test_quantized_weights_stay_close_to_fp32_and_record_precision(tmp_path):
+    torch.manual_seed(13)
+    model = ActorCritic(OBSERVATION_SIZE, actions.ACTION_SIZE).eval()
+    source = export_battle_checkpoint(battle_state(model), tmp_path / "battle_policy_hard.npz")
+    observations, masks = fixed_observations()
+    reference, _ = NumpyActorCritic.from_file(source)(observations, masks)
+    legal = masks == 0
+    for quantization, tolerance in (("fp16", 1e-2), ("int8", 5e-2)):
+        path = save_quantized(source, weights_path(source, quantization), quantization)
+        assert path.name == f"battle_policy_hard.{quantization}.npz"
+        assert path.stat().st_size < source.stat().st_size
+        runtime = NumpyActorCritic.from_file(path)
+        logits, _ = runtime(observations, masks)
+        assert runtime.header["quantization"] == quantization
+        assert np.max(np.abs(logits[legal] - reference[legal])) < tolerance
+    header, _ = load_weights(source)
+    assert header["quantization"] == "fp32"
+
+
+def test_deployed_quantization_requires_manifest_entry_and_files(tmp_path):
+    manifest = tmp_path / "manifest.json"
+    quantized = {
+        "mode": "int8",
+        "battle": {"file": "battle_policy_hard.int8.npz"},
+        "prebattle": {"file": "prebattle_value_hard.int8.npz"},
+    }
+    manifest.write_text(json.dumps({"difficulties": {"hard": {"quantized": quantized}}}))
+    assert deployed_quantization("hard", manifest) == "fp32"
+    for part in ("battle", "prebattle"):
+        (tmp_path / quantized[part]["file"]).write_bytes(b"")
+    assert deployed_quantization("hard", manifest) == "int8"
+    assert deployed_quantization("easy", manifest) == "fp32"
+    assert deployed_quantization("hard", tmp_path / "missing.json") == "fp32"
+
+
+def test_pve_controller_loads_quantized_weights_only_on_request(monkeypatch):
+    monkeypatch.delenv("SANGUO_PVE_QUANTIZATION", raising=False)
+    monkeypatch.setattr(pve, "deployed_student", lambda difficulty: None)
+    monkeypatch.setattr(pve, "deployed_quantization", lambda difficulty: "int8")
+    for requested, expected in ((None, "fp32"), ("deployed", "int8"), ("fp16", "fp16")):
+        assert PVEController(difficulty="hard", quantization=requested).quantization == expected
+    monkeypatch.setenv("SANGUO_PVE_QUANTIZATION", "deployed")
+    assert PVEController(difficulty="hard").quantization == "int8"
+    assert PVEController("custom.pt", difficulty="hard").quantization == "fp32"
+
+
+def test_distilled_student_is_registered_and_loaded_by_both_runtimes(tmp_path):
+    torch.manual_seed(17)
+    teacher = ActorCritic(OBSERVATION_SIZE, actions.ACTION_SIZE).eval()
+    observations, masks = fixed_observations(48)
+    args = SimpleNamespace(
+        seed_base=5, holdout=0.25, lr=3e-3, epochs=3, batch_size=16,
+        distill_temperature=1.0, value_coef=0.5,
+    )
+    student, report = distill(teacher, observations, masks, DEFAULT_STUDENT_CONFIG, args)
+    assert report["samples"] == 48 and 0.0 <= report["holdout_agreement"] <= 1.0
+    assert sum(p.numel() for p in student.parameters()) * 4 < sum(p.numel() for p in teacher.parameters())
+
+    state = {**battle_state(student), "model_config": DEFAULT_STUDENT_CONFIG}
+    torch.save(state, tmp_path / "battle_student_easy.pt")
+    export_battle_checkpoint(state, tmp_path / "battle_student_easy.npz")
+    manifest = tmp_path / "manifest.json"
+    entry = {
+        "battle": {"file": "battle_student_easy.pt"},
+        "runtime_policy": {"temperature": 2.0, "legal_exploration_rate": 0.0},
+        "gate": {"passed": False},
+    }
+    manifest.write_text(json.dumps({"difficulties": {"easy": {"student": entry}}}))
+    assert deployed_student("easy", manifest) is None
+    entry["gate"]["passed"] = True
+    manifest.write_text(json.dumps({"difficulties": {"easy": {"student": entry}}}))
+    checkpoint, policy = deployed_student("easy", manifest)
+    assert checkpoint == tmp_path / "battle_student_easy.pt"
+    assert policy["temperature"] == 2.0
+    assert deployed_student("normal", manifest) is None
+
+    controllers = [
+        PVEController(checkpoint, tmp_path / "prebattle.pt", difficulty="easy",
+                      runtime=runtime, battle_temperature=None, mistake_rate=0.0).load()
+        for runtime in ("torch", "numpy")
+    ]
+    for controller in controllers:
+        assert controller.battle_model is not None, controller.load_errors
+    for observation, mask in zip(observations[:6], masks[:6]):
+        np.testing.assert_allclose(
+            controllers[0].battle_logits(observation, mask)[mask == 0],
+            controllers[1].battle_logits(observation, mask)[mask == 0], atol=1e-4,
+        )
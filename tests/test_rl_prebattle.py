@@ -1,14 +1,22 @@
 from itertools import combinations
 from types import SimpleNamespace
 
+import numpy as np
+import torch
+
 from src.rl.prebattle import (
     DRAFT_FEATURES,
     GENERAL_IDS,
     FORMATION_FEATURES,
     PrebattlePolicy,
+    build_models,
+    draft_index_matrix,
     encode_draft,
     encode_formation,
+    formation_index_matrix,
+    formation_indices,
 )
+from src.rl.training.episode_store import pad_formation, pad_ids
 from src.game_data.generals_config import create_general_from_data
 from src.game_data.generals_data import GENERALS_DATA
 
@@ -64,4 +72,43 @@ def test_prebattle_draft_has_no_artificial_general_count_limit():
 
     positions = PrebattlePolicy().choose_formation(selected, [], [])
     assert len(positions) == 8
-    assert len({(item["row"], item["col"]) for item in positions}) == 8
\ No newline at end of file
+    assert len({(item["row"], item["col"]) for item in positions}) == 8
+
+
+def test_sparse_index_inputs_match_dense_linear_and_legacy_checkpoints():
+    first, second, third = GENERAL_IDS[:3]
+    rosters = [([first, second], [third]), ([third, third], [first, 9999])]
+    formations = [
+        ([{"general_id": first, "row": 0, "col": 0}, {"general_id": second, "row": 2, "col": 3}],
+         [{"general_id": third, "row": 1, "col": 2}]),
+        ([{"general_id": third, "row": 1, "col": 1}], []),
+    ]
+    padded = [
+        np.stack([pad_ids(rosters[index][side]) for index in range(2)]) for side in range(2)
+    ]
+    for side in range(2):
+        pairs = [pad_formation(formations[index][side]) for index in range(2)]
+        padded.extend((np.stack([ids for ids, _ in pairs]), np.stack([cells for _, cells in pairs])))
+    indices = formation_index_matrix(*padded)
+    for row, ((roster_self, roster_enemy), (form_self, form_enemy)) in zip(indices, zip(rosters, formations)):
+        expected = formation_indices(roster_self, roster_enemy, form_self, form_enemy)
+        assert sorted(int(value) for value in row if value >= 0) == expected
+    dense_formation = torch.tensor([
+        encode_formation(*roster, *formation) for roster, formation in zip(rosters, formations)
+    ])
+    dense_draft = torch.tensor([encode_draft(*roster) for roster in rosters])
+
+    torch.manual_seed(5)
+    draft_model, formation_model = build_models()
+    legacy = torch.nn.Sequential(
+        torch.nn.Linear(FORMATION_FEATURES, 256), torch.nn.ReLU(),
+        torch.nn.Linear(256, 64), torch.nn.ReLU(), torch.nn.Linear(64, 1),
+    )
+    formation_model.network.load_state_dict(legacy.state_dict())
+    with torch.no_grad():
+        torch.testing.assert_close(
+            formation_model(torch.from_numpy(indices)), legacy(dense_formation).squeeze(-1),
+        )
+        torch.testing.assert_close(
+            draft_model(torch.from_numpy(draft_index_matrix(*padded[:2]))), draft_model(dense_draft),
+        )
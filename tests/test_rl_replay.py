@@ -0,0 +1,51 @@
+"""二进制战斗回放编码与确定性重演测试。"""
+import random
+
+import numpy as np
+import pytest
+
+from src.rl.env import SanguoEnv
+from src.rl.opponents import HeuristicOpponent
+from src.rl.replay import BattleReplay, append_replays, read_replays, resimulate, trajectory
+
+
+def play(seed, env=None):
+    env = env or SanguoEnv(HeuristicOpponent(), team_size=0, max_team_size=6)
+    rng = random.Random(seed)
+    observation, info = env.reset(seed)
+    observations, done = [observation], False
+    while not done:
+        observation, _, done, info = env.step(rng.choice(env.legal_actions()))
+        observations.append(observation)
+    return env, observations
+
+
+def test_replay_round_trips_and_resimulates_every_observation():
+    env, observations = play(2026081900)
+    data = env.replay.to_bytes()
+    replay = BattleReplay.from_bytes(data)
+
+    assert replay == env.replay
+    assert len(data) < 24 + 3 * 12 + 2 * len(replay.actions) + 1
+    assert replay.winner_side is not None or replay.timeout
+    steps = trajectory(replay)
+    assert len(steps["actions"]) == len(observations) - 1
+    assert np.array_equal(steps["observations"], np.asarray(observations[:-1], dtype=np.float32))
+    assert steps["dones"][-1] and not steps["dones"][:-1].any()
+
+
+def test_replay_file_keeps_episode_order_and_rejects_divergent_records(tmp_path):
+    env = SanguoEnv(HeuristicOpponent())
+    recorded = [play(seed, env)[0].replay.to_bytes() for seed in (11, 12)]
+    path = tmp_path / "replays.bin"
+    assert append_replays(path, [recorded[0], b""]) == 2
+    append_replays(path, [BattleReplay.from_bytes(recorded[1])])
+
+    first, missing, second = read_replays(path)
+    assert missing is None
+    assert [first.seed, second.seed] == [11, 12]
+    assert sum(1 for _ in resimulate(second)) == len(second.side_actions(second.learning_side))
+
+    second.turns += 1
+    with pytest.raises(ValueError):
+        trajectory(second)
@@ -0,0 +1,99 @@
+"""压缩 rollout 存储的无损还原、体积与 PPO 等价性测试。"""
+import numpy as np
+import torch
+
+from src.rl import actions
+from src.rl.env import SanguoEnv
+from src.rl.models.actor_critic_v3 import ActorCritic
+from src.rl.observation import OBSERVATION_SIZE
+from src.rl.opponents import RandomOpponent
+from src.rl.training.ppo_v3 import ppo_update
+from src.rl.training.rollout_storage import (
+    CompressedObservations, ObservationBuilder, PackedMasks,
+)
+from src.rl.training.vector_env import RolloutFragment
+from tools.rl.train_ppo import batch_from_fragments
+
+
+def random_rollout(steps, seed):
+    env = SanguoEnv(RandomOpponent(), team_size=0, max_team_size=6)
+    rng = np.random.default_rng(seed)
+    observations, masks, dones = [], [], []
+    observation, info = env.reset(seed)
+    for _ in range(steps):
+        observations.append(observation)
+        masks.append(info["action_mask"])
+        legal = np.flatnonzero(info["action_mask"] == 0)
+        observation, _, done, info = env.step(int(rng.choice(legal)))
+        dones.append(done)
+        if done:
+            observation, info = env.reset(seed + len(observations))
+    return np.stack(observations), np.stack(masks).astype(np.bool_), np.asarray(dones)
+
+
+def fragment(observations, masks, dones, *, compressed):
+    steps = len(observations)
+    rng = np.random.default_rng(steps)
+    return RolloutFragment(
+        observations=CompressedObservations.from_dense(observations) if compressed else observations,
+        masks=PackedMasks.from_dense(masks) if compressed else masks,
+        actions=np.asarray([np.flatnonzero(~mask)[0] for mask in masks], dtype=np.int64),
+        log_probs=np.full(steps, -2.0, dtype=np.float32),
+        rewards=rng.normal(size=steps).astype(np.float32),
+        values=rng.normal(size=steps).astype(np.float32),
+        dones=dones,
+        bootstrap_value=0.0,
+        episode_summaries=[],
+    )
+
+
+def test_compressed_observations_round_trip_losslessly():
+    observations, masks, _ = random_rollout(120, 2026080100)
+    builder = ObservationBuilder()
+    for observation in observations:
+        builder.append(observation)
+    storage = builder.build()
+    packed = PackedMasks.from_dense(masks)
+
+    assert len(storage) == len(packed) == 120
+    assert np.array_equal(storage.dense(), observations)
+    assert np.array_equal(packed.dense(), masks)
+    selected = np.asarray([5, 0, 119, 64])
+    assert np.array_equal(storage.dense(selected), observations[selected])
+    assert np.array_equal(storage.occupancy, observations[:, 21::218][:, :24] > 0)
+
+    device_observations = storage.to("cpu")
+    device_masks = packed.to("cpu")
+    index = torch.as_tensor(selected)
+    assert torch.equal(device_observations[index], torch.as_tensor(observations[selected]))
+    assert torch.equal(device_masks[index], torch.as_tensor(masks[selected]))
+    assert torch.equal(device_observations[10:20], torch.as_tensor(observations[10:20]))
+
+
+def test_compressed_rollout_is_an_order_of_magnitude_smaller():
+    observations, masks, _ = random_rollout(400, 2026080200)
+    storage = CompressedObservations.from_dense(observations)
+    packed = PackedMasks.from_dense(masks)
+
+    dense_bytes = observations.nbytes + masks.nbytes
+    assert (storage.nbytes + packed.nbytes) * 10 < dense_bytes
+
+
+def test_ppo_update_matches_between_dense_and_compressed_batches():
+    first = random_rollout(40, 2026080300)
+    second = random_rollout(24, 2026080400)
+    metrics = {}
+    for compressed in (False, True):
+        batch = batch_from_fragments([
+            fragment(*first, compressed=compressed), fragment(*second, compressed=compressed),
+        ])
+        torch.manual_seed(17)
+        model = ActorCritic(OBSERVATION_SIZE, actions.ACTION_SIZE)
+        optimizer = torch.optim.Adam(model.parameters(), lr=1e-3)
+        metrics[compressed] = ppo_update(
+            model, optimizer, batch, epochs=2, minibatch_size=16, target_kl=0.0,
+        )
+    assert isinstance(batch["observations"], CompressedObservations)
+    assert len(batch["observations"]) == 64
+    for key, value in metrics[False].items():
+        assert np.isclose(metrics[True][key], value, rtol=1e-5, atol=1e-6), key
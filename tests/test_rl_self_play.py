@@ -32,7 +32,100 @@ def test_checkpoint_schema_rejects_legacy_state():
         )
 
 
+def test_checkpoint_writer_snapshots_once_and_links_aliases(tmp_path):
+    manager = CheckpointManager(tmp_path, keep_last=1)
+    weight = torch.zeros(3)
+    manager.save({"model": {"weight": weight}}, 1, is_best=True)
+    weight.add_(1.0)  # 训练线程继续原地更新，不能影响已提交的快照
+    manager.save({"model": {"weight": weight}}, 2)
+    manager.close()
+    assert [path.name for path in tmp_path.glob("ppo_step_*.pt")] == ["ppo_step_000002.pt"]
+    best = torch.load(tmp_path / "ppo_best.pt")
+    latest = torch.load(tmp_path / "ppo_latest.pt")
+    assert torch.equal(best["model"]["weight"], torch.zeros(3))
+    assert torch.equal(latest["model"]["weight"], torch.ones(3))
+    assert not list(tmp_path.glob("*.tmp"))
+
+
 def test_yaml_loader_normalizes_cli_style_keys(tmp_path):
     path = tmp_path / "train.yaml"
     path.write_text("max-updates: 3\nstage: selfplay\n", encoding="utf-8")
     assert load_yaml_defaults(path) == {"max_updates": 3, "stage": "selfplay"}
+
+
+def test_history_pool_serves_cached_snapshots_and_drops_evicted_ones(tmp_path, monkeypatch):
+    def add(pool, update, score):
+        return pool.add(
+            {"weight": torch.tensor([float(update)])},
+            update=update, score=score,
+            observation_schema="test-v2", observation_size=12, action_size=7,
+            model_schema="test-model-v2",
+        )
+
+    writer = HistoricalPolicyPool(tmp_path, max_size=3, top_k=2, prefetch=False)
+    for update, score in ((1, 0.2), (2, 0.6), (3, 0.4)):
+        add(writer, update, score)
+
+    pool = HistoricalPolicyPool(tmp_path, max_size=3, top_k=2, temperature=0.1)
+    pool.prefetch(wait=True)
+    assert set(pool._cache) == {"history-000002", "history-000003"}
+    reads = []
+    monkeypatch.setattr(pool, "_read", lambda entry: reads.append(entry["id"]) or torch.load(
+        tmp_path / entry["file"], map_location="cpu",
+    ))
+    for seed in range(10):
+        state = pool.load(pool.sample(random.Random(seed)))
+        assert state["model"]["weight"].item() in (2.0, 3.0)
+    assert reads == [] and pool.metrics()["cache_hit_rate"] == 1.0
+
+    add(pool, 4, 0.9)  # 新快照直接进缓存，最低分的 history-000001 被淘汰
+    assert "history-000004" in pool._cache
+    assert pool.load({"id": "history-000004", "file": "history-000004.pt"})["update"] == 4
+    add(pool, 5, 0.8)
+    assert "history-000001" not in pool._cache and "history-000003" not in pool._cache
+    assert not (tmp_path / "history-000003.pt").exists()
+    assert len(pool._cache) <= pool.cache_size and reads == []
+
+
+def test_history_pool_drops_prefetch_of_snapshot_overwritten_mid_read(tmp_path, monkeypatch):
+    def add(pool, weight):
+        return pool.add(
+            {"weight": torch.tensor([weight])},
+            update=7, score=0.5,
+            observation_schema="test-v2", observation_size=12, action_size=7,
+            model_schema="test-model-v2",
+        )
+
+    add(HistoricalPolicyPool(tmp_path, prefetch=False), 1.0)
+    pool = HistoricalPolicyPool(tmp_path, prefetch=False)
+    pool.prefetch_enabled = True
+    original_read = pool._read
+
+    def racing_read(entry):
+        payload = original_read(entry)  # 读到旧文件后，训练线程覆盖写入同一 ID
+        add(pool, 2.0)
+        return payload
+
+    monkeypatch.setattr(pool, "_read", racing_read)
+    pool.prefetch(wait=True)
+    monkeypatch.setattr(pool, "_read", original_read)
+    entry = {"id": "history-000007", "file": "history-000007.pt"}
+    assert pool._cache["history-000007"]["model"]["weight"].item() == 2.0
+    assert pool.load(entry)["model"]["weight"].item() == 2.0
+
+
+def test_history_pool_cache_does_not_alias_live_cpu_weights(tmp_path):
+    model = torch.nn.Linear(3, 2)
+    saved = model.weight.detach().clone()
+    pool = HistoricalPolicyPool(tmp_path, prefetch=False)
+    policy_id = pool.add(
+        model.state_dict(), update=1, score=0.5,
+        observation_schema="test-v2", observation_size=3, action_size=2,
+        model_schema="test-model-v2",
+    )
+    assert policy_id in pool._cache
+    with torch.no_grad():
+        model.weight.add_(1.0)  # 模拟之后的 optimizer.step() 原地更新参数
+    entry = {"id": policy_id, "file": f"{policy_id}.pt"}
+    assert torch.equal(pool.load(entry)["model"]["weight"], saved)
+    assert torch.equal(torch.load(tmp_path / entry["file"])["model"]["weight"], saved)
@@ -0,0 +1,70 @@
+import json
+import textwrap
+
+from tools.rl import sweep_ppo
+
+
+FAKE_TRAINER = textwrap.dedent("""
+    import argparse, csv, json, sys
+    from pathlib import Path
+    import yaml
+
+    parser = argparse.ArgumentParser()
+    for name in ("--config", "--artifact-root", "--run-name", "--device",
+                 "--num-workers", "--max-updates", "--eval-every", "--resume"):
+        parser.add_argument(name)
+    args = parser.parse_args()
+    config = yaml.safe_load(Path(args.config).read_text(encoding="utf-8"))
+    if config.get("fail"):
+        sys.exit(3)
+    root = Path(args.artifact_root)
+    with (root / "calls.jsonl").open("a", encoding="utf-8") as handle:
+        handle.write(json.dumps(vars(args)) + "\\n")
+    run = root / "runs" / args.run_name
+    run.mkdir(parents=True)
+    with (run / "metrics.csv").open("w", newline="", encoding="utf-8") as handle:
+        writer = csv.DictWriter(handle, fieldnames=("step", "tag", "value"))
+        writer.writeheader()
+        score = config["entropy_coef"] * int(args.max_updates)
+        writer.writerow({"step": args.max_updates, "tag": "eval/heuristic/quality_score", "value": score})
+    (root / "checkpoints").mkdir(exist_ok=True)
+    (root / "checkpoints" / "ppo_latest.pt").write_bytes(b"")
+""")
+
+
+def test_sweep_prunes_with_successive_halving_and_resumes_survivors(tmp_path):
+    trainer = tmp_path / "fake_trainer.py"
+    trainer.write_text(FAKE_TRAINER, encoding="utf-8")
+    base = tmp_path / "base.yaml"
+    base.write_text("stage: selfplay\nentropy_coef: 0.01\n", encoding="utf-8")
+    broken = tmp_path / "broken.yaml"
+    broken.write_text("entropy_coef: 0.5\nfail: true\n", encoding="utf-8")
+    runs = sweep_ppo.expand_runs(
+        [base, broken], fixed=[("target_kl", "0.02")],
+        grid=[("entropy_coef", "0.01,0.03,0.02,0.04")],
+    )
+    assert len(runs) == 8
+    scheduler = sweep_ppo.SweepScheduler(
+        runs, tmp_path / "sweep", trainer=trainer, cpu_budget=8, max_concurrent=4,
+        rung_updates=2, max_updates=8, eta=2, poll_seconds=0.01,
+    )
+    table = scheduler.run()
+
+    by_name = {run["name"]: run for run in runs}
+    assert by_name["base-entropy_coef=0.04"]["status"] == "finished"
+    assert by_name["base-entropy_coef=0.04"]["updates"] == 8
+    assert by_name["base-entropy_coef=0.03"]["status"] == "pruned (rung 1)"
+    assert by_name["base-entropy_coef=0.01"]["status"] == "pruned (rung 0)"
+    assert by_name["broken-entropy_coef=0.04"]["status"].startswith("failed (rung 0")
+    calls = [
+        json.loads(line) for line in
+        (scheduler.root / "base-entropy_coef=0.04" / "calls.jsonl").read_text().splitlines()
+    ]
+    assert [call["max_updates"] for call in calls] == ["2", "4", "8"]
+    assert calls[0]["resume"] is None and calls[-1]["resume"].endswith("ppo_latest.pt")
+    # 8 个 run 共享 8 核：首档 4 个并发各 2 核，决赛只剩 1 个 run 时独占预算。
+    assert [call["num_workers"] for call in calls] == ["2", "4", "8"]
+    written = (scheduler.root / "base-entropy_coef=0.04" / "config.yaml").read_text()
+    assert "target_kl: 0.02" in written and "entropy_coef: 0.04" in written
+    assert table.splitlines()[2].startswith("| base-entropy_coef=0.04 | finished | 8 | 0.3200")
+    assert (scheduler.root / "summary.md").read_text().strip() == table
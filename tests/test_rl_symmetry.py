@@ -0,0 +1,94 @@
+"""列镜像对称置换与 PPO 镜像增广测试。"""
+import numpy as np
+import torch
+
+from src.rl import actions, symmetry
+from src.rl.env import SanguoEnv
+from src.rl.models.actor_critic_v3 import ActorCritic
+from src.rl.observation import OBSERVATION_SIZE
+from src.rl.opponents import RandomOpponent
+from src.rl.training.augmentation import augment_column_mirror, mirror_compressed
+from src.rl.training.rollout_storage import CompressedObservations, PackedMasks
+
+SYMMETRIC_ROSTERS = ([3001, 5002, 1005], [4007, 1008, 3003])
+MAZE_ROSTERS = ([2005, 3002, 1010], [4005, 6003, 3009])
+
+
+def rollout(rosters, steps=48, seed=2026080700):
+    env = SanguoEnv(RandomOpponent())
+    rng = np.random.default_rng(seed)
+    observations, masks, chosen, symmetric = [], [], [], []
+    observation, info = env.reset(seed, rosters=rosters)
+    while len(observations) < steps:
+        action = int(rng.choice(np.flatnonzero(info["action_mask"] == 0)))
+        observations.append(observation)
+        masks.append(info["action_mask"])
+        chosen.append(action)
+        symmetric.append(symmetry.roster_is_column_symmetric(env.learning_team, env.enemy_team))
+        observation, _, done, info = env.step(action)
+        if done:
+            observation, info = env.reset(seed + len(observations), rosters=rosters)
+    return {
+        "observations": np.stack(observations), "masks": np.stack(masks).astype(np.bool_),
+        "actions": np.asarray(chosen, dtype=np.int64),
+        "log_probs": np.zeros(steps, dtype=np.float32),
+        "advantages": np.linspace(-1.0, 1.0, steps, dtype=np.float32),
+        "returns": np.linspace(0.0, 1.0, steps, dtype=np.float32),
+        "column_symmetric": np.asarray(symmetric),
+    }
+
+
+def test_column_mirror_is_an_involution_on_actions_and_observations():
+    assert np.array_equal(symmetry.ACTION_MIRROR[symmetry.ACTION_MIRROR], np.arange(actions.ACTION_SIZE))
+    assert symmetry.ACTION_MIRROR[actions.encode(actions.Action("attack", 0, 7, guess="奇"))] == (
+        actions.encode(actions.Action("attack", 3, 4, guess="奇"))
+    )
+    batch = rollout(SYMMETRIC_ROSTERS, steps=12)
+    observations = batch["observations"]
+    twice = symmetry.mirror_observations(symmetry.mirror_observations(observations))
+    np.testing.assert_allclose(twice, observations, atol=1e-6)
+    masks = symmetry.mirror_masks(batch["masks"], observations)
+    mirrored_actions = symmetry.mirror_actions(batch["actions"], observations)
+    assert not masks[np.arange(12), mirrored_actions].any()
+    compressed = CompressedObservations.from_dense(observations)
+    np.testing.assert_allclose(
+        mirror_compressed(compressed).dense(),
+        symmetry.mirror_observations(observations), atol=1e-6,
+    )
+
+
+def test_replay_check_accepts_symmetric_rules_and_rejects_stone_sentinel_maze():
+    for seed in range(3):
+        assert symmetry.check_column_symmetry(
+            SYMMETRIC_ROSTERS, 2026080500 + seed, opponent_seed=seed,
+        ) is None
+    assert symmetry.check_column_symmetry(MAZE_ROSTERS, 2026080601, opponent_seed=1)
+    assert "stone_sentinel_maze" in symmetry.COLUMN_ASYMMETRIC_SKILLS
+
+
+def test_augmentation_mirrors_only_symmetric_episodes_for_dense_and_compressed_batches():
+    torch.manual_seed(23)
+    model = ActorCritic(OBSERVATION_SIZE, actions.ACTION_SIZE)
+    symmetric = rollout(SYMMETRIC_ROSTERS, steps=24)
+    asymmetric = rollout(MAZE_ROSTERS, steps=16)
+    dense = {key: np.concatenate([symmetric[key], asymmetric[key]]) for key in symmetric}
+    assert dense["column_symmetric"].sum() == 24
+
+    augmented, mirrored = augment_column_mirror(dense, model, device="cpu", chunk_size=10)
+    compressed = dict(dense)
+    compressed["observations"] = CompressedObservations.from_dense(dense["observations"])
+    compressed["masks"] = PackedMasks.from_dense(dense["masks"])
+    augmented_compressed, mirrored_compressed = augment_column_mirror(
+        compressed, model, device="cpu", chunk_size=10,
+    )
+
+    assert mirrored == mirrored_compressed == 24
+    assert len(augmented["actions"]) == len(augmented_compressed["observations"]) == 64
+    np.testing.assert_allclose(
+        augmented_compressed["observations"].dense(), augmented["observations"], atol=1e-6,
+    )
+    assert np.array_equal(augmented_compressed["masks"].dense(), augmented["masks"])
+    np.testing.assert_allclose(augmented_compressed["log_probs"], augmented["log_probs"], atol=1e-5)
+    assert np.array_equal(augmented["advantages"][40:], dense["advantages"][:24])
+    assert np.all(np.isfinite(augmented["log_probs"][40:]))
+    assert not augmented["column_symmetric"][40:].any()
@@ -10,6 +10,7 @@ from src.rl.models.actor_critic_v3 import ActorCritic, MODEL_SCHEMA
 from src.rl.observation import OBSERVATION_SIZE
 from src.rl.reward_v3 import RewardHandler
 from src.rl.training.ppo_v3 import ppo_update
+from src.rl.training.ppo_v3_distributed import DataParallelLearner
 from src.rl.training.self_play import HistoricalPolicyPool
 from tools.rl import train_ppo_v3
 
@@ -149,6 +150,53 @@ def test_ppo_v3_chunks_explained_variance_forward_pass():
     assert max(model.batch_sizes) <= 4
 
 
+def test_data_parallel_learner_matches_single_process_update_and_early_stop():
+    torch.manual_seed(5)
+    observations = torch.randn(12, 3)
+    masks = torch.zeros((12, 2), dtype=torch.bool)
+    reference = TinyActorCritic()
+    with torch.no_grad():
+        logits, _ = reference(observations, masks)
+        distribution = torch.distributions.Categorical(logits=logits)
+        actions_taken = distribution.sample()
+        old_log_probs = distribution.log_prob(actions_taken)
+    batch = {
+        "observations": observations.numpy(), "masks": masks.numpy(),
+        "actions": actions_taken.numpy(), "log_probs": old_log_probs.numpy(),
+        "returns": np.linspace(-1, 1, 12, dtype=np.float32),
+        "advantages": np.linspace(-1, 1, 12, dtype=np.float32),
+    }
+    options = {"epochs": 4, "minibatch_size": 5, "target_kl": 1e-4}
+
+    def fresh():
+        model = TinyActorCritic()
+        model.load_state_dict(reference.state_dict())
+        return model, torch.optim.Adam(model.parameters(), lr=0.5)
+
+    # learner 从全局 RNG 取排列种子；单进程基准用同一种子的 generator。
+    torch.manual_seed(13)
+    seed = int(torch.randint(2 ** 62, ()).item())
+    single, optimizer = fresh()
+    single_metrics = ppo_update(
+        single, optimizer, batch, generator=torch.Generator().manual_seed(seed), **options,
+    )
+    parallel, optimizer = fresh()
+    learner = DataParallelLearner(2)
+    try:
+        torch.manual_seed(13)
+        parallel_metrics = learner(parallel, optimizer, batch, **options)
+    finally:
+        learner.close()
+
+    assert single_metrics["early_stop_kl"] == parallel_metrics["early_stop_kl"] == 1.0
+    assert single_metrics["epochs_completed"] == parallel_metrics["epochs_completed"] == 1.0
+    assert parallel_metrics["learner_processes"] == 2.0
+    for key in ("policy_loss", "value_loss", "approx_kl", "grad_norm", "explained_variance"):
+        assert parallel_metrics[key] == pytest.approx(single_metrics[key], rel=1e-4, abs=1e-6)
+    for left, right in zip(single.parameters(), parallel.parameters()):
+        assert torch.allclose(left, right, atol=1e-5)
+
+
 def test_v3_selfplay_uses_stratified_anchor_payloads(tmp_path):
     train_ppo_v3.settings.update(train_ppo_v3.V3_DEFAULTS)
     pool = HistoricalPolicyPool(tmp_path)
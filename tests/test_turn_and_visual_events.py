@@ -5,6 +5,7 @@ import json
 import main_web
 from src.game_data.generals_config import get_general_by_name
 from src.battle.battle_system import BattleSystem
+from src.battle.event_bus import CombatEventBus
 from src.models.team import Team
 
 
@@ -66,6 +67,46 @@ def test_damage_records_fence_and_shield_events():
     assert shield_events[0]["absorbed"] == 3
 
 
+def test_battle_event_bus_sequences_events_and_cursors_read_only_new_ones():
+    team1, team2 = Team("蜀军"), Team("魏军")
+    defender = get_general_by_name("诸葛亮")
+    attacker = get_general_by_name("张飞")
+    team1.add_general(defender)
+    team2.add_general(attacker)
+    battle = BattleSystem(team1, team2, callbacks=None,
+                          first_player_team_name=team1.team_name)
+    cursor = battle.event_bus.subscribe()
+
+    defender.take_damage(5, attacker, "basic_attack")
+    defender.add_buff("damage_shield", 3, 1)
+    defender.take_damage(5, attacker, "skill")
+
+    entries = cursor.read()
+    assert [event["type"] for _, event in entries] == ["fence_block", "shield_absorb"]
+    assert [event["seq"] for _, event in entries] == [0, 1]
+    assert all(source is team1 for source, _ in entries)
+    assert defender.drain_combat_events() == []
+    assert cursor.read() == []
+
+    battle.event_bus.enabled = False
+    defender.take_damage(5, attacker, "basic_attack")
+    assert cursor.read() == [] and battle.event_bus.next_seq == 2
+
+
+def test_event_bus_ring_overwrites_oldest_and_counts_dropped_events():
+    bus = CombatEventBus(capacity=3)
+    early = bus.subscribe(0)
+    for index in range(5):
+        bus.publish({"type": "tick", "index": index})
+    late = bus.subscribe()
+    bus.publish({"type": "tick", "index": 5})
+
+    assert [event["index"] for _, event in early.read()] == [3, 4, 5]
+    assert early.dropped == 3
+    assert [event["index"] for _, event in late.read()] == [5]
+    assert late.dropped == 0
+
+
 def test_web_skip_returns_morale_and_recruit_events():
     main_web.STATE.reset()
     controller = main_web.STATE.controller
@@ -1,10 +1,16 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import http.client
 import json
 import os
 from itertools import combinations
+import threading
+from types import SimpleNamespace
 from unittest.mock import patch
 
 import main_web
 from src.game_data.generals_config import get_general_by_name
+from src.web.async_server import AsyncGameServer
 
 
 def post(path, body=None):
@@ -24,6 +30,50 @@ def test_web_draft_pools_are_distinct_sixteen_each():
     assert p1_ids.isdisjoint(p2_ids)
 
 
+def test_web_session_header_isolates_game_state():
+    def session(name):
+        return SimpleNamespace(headers={main_web.SESSION_HEADER: name})
+
+    shared = post("/api/new")
+    first = main_web.handle_api("/api/new", {"mode": "pve"}, session("a"))
+    pick = [main_web.state_for(session("a")).pool_p1[0].general_id]
+    selected = main_web.handle_api("/api/select", {"general_ids": pick}, session("a"))
+
+    assert first["mode"] == "pve" and selected["phase"] == "formation_p1"
+    assert main_web.STATE.phase == shared["phase"] == "select_p1"
+    assert main_web.handle_api("/api/new", {}, session("b"))["phase"] == "select_p1"
+    assert main_web.state_for(session("a")).phase == "formation_p1"
+
+
+def test_web_asyncio_server_keeps_connection_alive_across_requests():
+    loop = asyncio.new_event_loop()
+    server = AsyncGameServer("127.0.0.1", 0, api_workers=2, ai_workers=1)
+    loop.run_until_complete(server.start())
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    try:
+        connection = http.client.HTTPConnection("127.0.0.1", server.port, timeout=10)
+        headers = {"Content-Type": "application/json", main_web.SESSION_HEADER: "async-test"}
+        connection.request("POST", "/api/new", json.dumps({"mode": "pvp"}), headers)
+        created = json.loads(connection.getresponse().read())
+        connection.request("POST", "/api/state", "{}", headers)
+        response = connection.getresponse()
+        current = json.loads(response.read())
+        connection.request("GET", "/no-such-file.txt")
+        missing = connection.getresponse()
+        missing.read()
+        connection.close()
+    finally:
+        asyncio.run_coroutine_threadsafe(server.shutdown(), loop).result(timeout=5)
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(timeout=5)
+        loop.close()
+
+    assert created["phase"] == current["phase"] == "select_p1"
+    assert response.getheader("Connection") is None
+    assert missing.status == 404
+
+
 def test_web_frontend_submits_complete_formation_and_advances():
     post("/api/new")
     p1_pick = [main_web.STATE.pool_p1[0].general_id]
@@ -598,6 +648,109 @@ def test_web_pve_exposes_computer_turn_one_action_at_a_time():
     assert attack_phase["ai_thinking"] is False
 
 
+class SpeculatingPVEController(FakePVEController):
+    def __init__(self):
+        self.decided = []
+        self.received = []
+
+    def decide_battle_action(self, battle, ai_team, enemy_team, subphase="skill"):
+        self.decided.append(subphase)
+        return subphase
+
+    def step_battle_turn(self, state, ai_team, enemy_team, subphase="skill", action_id=None):
+        self.received.append(action_id)
+        return super().step_battle_turn(state, ai_team, enemy_team, subphase)
+
+
+def test_web_pve_step_uses_precomputed_decision_only_for_same_version():
+    state = post("/api/new", {"mode": "pve"})
+    ai = main_web.STATE.pve_controller = SpeculatingPVEController()
+    legal_pick = next(g for g in main_web.STATE.pool_p1 if g.cost <= state["cost_limit"])
+    post("/api/select", {"general_ids": [legal_pick.general_id]})
+    post("/api/place", {
+        "positions": [{"general_id": legal_pick.general_id, "row": 0, "col": 0}],
+    })
+    with patch("main_web.random.randint", side_effect=[1, 6]):
+        post("/api/dice")
+    main_web.STATE._speculation[1].result(timeout=5)
+
+    skill_phase = post("/api/pve/step")
+    assert skill_phase["ai_action"]["precomputed"] is True
+    assert ai.received == ["skill"]
+    main_web.STATE._speculation[1].result(timeout=5)
+
+    # 电脑回合中被拒绝的玩家请求同样推进版本号，预计算结果随之作废。
+    post("/api/battle/skip")
+    attack_phase = post("/api/pve/step")
+    assert attack_phase["ai_action"]["precomputed"] is False
+    assert ai.received == ["skill", None]
+    assert ai.decided == ["skill", "attack"]
+    assert attack_phase["current_team"] == "p1"
+
+
+def test_web_pve_step_cancels_speculation_still_queued_behind_other_sessions():
+    busy = threading.Event()
+    pool = ThreadPoolExecutor(max_workers=1)
+    pool.submit(busy.wait, 10)
+    try:
+        with patch("src.web.server._SPECULATION_POOL", pool):
+            state = post("/api/new", {"mode": "pve"})
+            ai = main_web.STATE.pve_controller = SpeculatingPVEController()
+            legal_pick = next(g for g in main_web.STATE.pool_p1 if g.cost <= state["cost_limit"])
+            post("/api/select", {"general_ids": [legal_pick.general_id]})
+            post("/api/place", {
+                "positions": [{"general_id": legal_pick.general_id, "row": 0, "col": 0}],
+            })
+            with patch("main_web.random.randint", side_effect=[1, 6]):
+                post("/api/dice")
+            skill_phase = post("/api/pve/step")
+    finally:
+        busy.set()
+        pool.shutdown(wait=True)
+
+    assert skill_phase["ai_action"]["precomputed"] is False
+    assert ai.received == [None]
+    # 被取消的 skill 预计算从未执行；只有步进后重新排队的 attack 预计算在池空闲后运行。
+    assert ai.decided == ["attack"]
+
+
+def test_web_pve_stream_pushes_whole_computer_turn_with_versions():
+    state = post("/api/new", {"mode": "pve"})
+    main_web.STATE.pve_controller = FakePVEController()
+    legal_pick = next(g for g in main_web.STATE.pool_p1 if g.cost <= state["cost_limit"])
+    post("/api/select", {"general_ids": [legal_pick.general_id]})
+    post("/api/place", {
+        "positions": [{"general_id": legal_pick.general_id, "row": 0, "col": 0}],
+    })
+    with patch("main_web.random.randint", side_effect=[1, 6]):
+        battle = post("/api/dice")
+
+    server = main_web.ThreadingHTTPServer(("127.0.0.1", 0), main_web.GameServer)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        connection = http.client.HTTPConnection("127.0.0.1", server.server_address[1], timeout=10)
+        connection.request("POST", "/api/pve/stream", "{}", {"Content-Type": "application/json"})
+        response = connection.getresponse()
+        stream = response.read().decode("utf-8")
+        connection.request("POST", "/api/state", "{}")
+        after = json.loads(connection.getresponse().read())
+        connection.close()
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    blocks = [block for block in stream.split("\n\n") if block]
+    events = [dict(line.split(": ", 1) for line in block.split("\n")) for block in blocks]
+    actions = [json.loads(event["data"]) for event in events if event["event"] == "action"]
+    assert response.getheader("Content-Type").startswith("text/event-stream")
+    assert [action["ai_action"]["kind"] for action in actions] == ["end_skill", "end_attack"]
+    assert [int(event["id"]) for event in events[:2]] == [action["version"] for action in actions]
+    assert battle["version"] < actions[0]["version"] < actions[1]["version"]
+    assert events[-1]["event"] == "done"
+    assert actions[-1]["current_team"] == after["current_team"] == "p1"
+
+
 def test_web_pve_conceals_enemy_ambush_identity_until_reveal():
     post("/api/new", {"mode": "pve"})
     ambush = get_general_by_name("张任")
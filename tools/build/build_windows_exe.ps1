@@ -1,5 +1,8 @@
 param(
-    [string]$Python = "python"
+    [string]$Python = "python",
+    # Ship NumPy weight files instead of PyTorch; the runtime falls back to
+    # src/rl/models/numpy_runtime.py when torch cannot be imported.
+    [switch]$NumpyRuntime
 )
 
 # Windows PowerShell 5 treats native stderr output as PowerShell errors when
@@ -23,6 +26,14 @@ try {
         throw "PyInstaller is not installed. Run: python -m pip install -r requirements/build.txt"
     }
 
+    if ($NumpyRuntime) {
+        Write-Host "Exporting PvE checkpoints to NumPy weights..." -ForegroundColor Cyan
+        & $Python (Join-Path $root "tools\rl\export_pve_numpy.py") --strict
+        if ($LASTEXITCODE -ne 0) {
+            throw "NumPy weight export failed with exit code $LASTEXITCODE"
+        }
+    }
+
     $pyiArgs = @(
         "--noconfirm",
         "--clean",
@@ -40,6 +51,9 @@ try {
         "--add-data", $modelData,
         $entry
     )
+    if ($NumpyRuntime) {
+        $pyiArgs = @("--exclude-module", "torch") + $pyiArgs
+    }
 
     Write-Host "Building the Windows self-contained folder release..." -ForegroundColor Cyan
     & $Python -m PyInstaller @pyiArgs
@@ -9,8 +9,11 @@ import sys
 ROOT = Path(__file__).resolve().parents[2]
 sys.path.insert(0, str(ROOT))
 
+import numpy as np
 import torch
 
+from src.rl.env_v3 import SanguoEnv
+from src.rl.models.numpy_runtime import QUANTIZATIONS
 from src.rl.opponents import HeuristicOpponent
 from src.rl.pve import PVEController, PVE_DIFFICULTIES
 from src.rl.training.evaluation_v3 import evaluate
@@ -32,6 +35,43 @@ class DeployedPVEPolicy:
         return action
 
 
+def benchmark_controller(controller, *, episodes, seed_base, device="cpu",
+                         max_seconds=1800):
+    """Evaluate one controller against the heuristic opponent on fixed seeds."""
+    return evaluate(
+        controller.load().battle_model,
+        device,
+        HeuristicOpponent(),
+        episodes=episodes,
+        seed_base=seed_base,
+        max_seconds=max_seconds,
+        policy=DeployedPVEPolicy(controller),
+    )
+
+
+def action_agreement(reference, candidate, *, episodes, seed_base,
+                     max_steps_per_episode=4096):
+    """Greedy action agreement on trajectories driven by the reference model.
+
+    Both controllers score the same observations, so the result isolates
+    numeric drift from the tier's temperature or exploration settings.
+    """
+    matches = total = 0
+    for offset in range(episodes):
+        env = SanguoEnv(HeuristicOpponent())
+        observation, info = env.reset(seed_base + offset)
+        done = False
+        steps = 0
+        while not done and steps < max_steps_per_episode:
+            mask = info["action_mask"]
+            expected = int(np.argmax(reference.battle_logits(observation, mask)))
+            matches += int(expected == int(np.argmax(candidate.battle_logits(observation, mask))))
+            total += 1
+            observation, _, done, info = env.step(expected)
+            steps += 1
+    return {"agreement": matches / max(1, total), "decisions": total}
+
+
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("--episodes", type=int, default=500)
@@ -49,6 +89,10 @@ def main():
         "--normal-mistake-rate", type=float,
         help="用于校准普通档；省略时评测正式部署设置",
     )
+    parser.add_argument(
+        "--quantization", choices=QUANTIZATIONS,
+        help="评测指定精度；省略时使用 manifest 中通过门控的部署精度",
+    )
     parser.add_argument(
         "--out", default="artifacts/rl/pve_tiers/benchmark/deployed_tiers.json",
     )
@@ -61,6 +105,8 @@ def main():
         controller = PVEController(
             difficulty=difficulty,
             device=args.device,
+            quantization=args.quantization,
+            seed=args.seed_base + index,
             battle_temperature=(
                 args.normal_temperature
                 if difficulty == "normal" and args.normal_temperature is not None
@@ -72,15 +118,17 @@ def main():
                 else None
             ),
         )
-        report = evaluate(
-            controller.load().battle_model,
-            args.device,
-            HeuristicOpponent(),
+        report = benchmark_controller(
+            controller,
             episodes=args.episodes,
             seed_base=args.seed_base,
+            device=args.device,
             max_seconds=args.max_seconds_per_tier,
-            policy=DeployedPVEPolicy(controller),
         )
+        report["quantization"] = controller.quantization
+        # 发布目录登记了蒸馏学生模型时，默认评测的就是学生模型及其校准设置。
+        report["battle_model"] = controller.battle_checkpoint.name
+        report["student"] = controller.student
         reports[difficulty] = report
         print(
             difficulty,
@@ -0,0 +1,30 @@
+"""把旧 run 的 episodes.jsonl 转换为列式 episode store。
+
+默认输出到同目录的 ``episodes/``；目标已存在时追加，因此不要对同一文件重复转换。
+"""
+from __future__ import annotations
+
+import argparse
+from pathlib import Path
+import sys
+
+ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(ROOT))
+
+from src.rl.training.episode_store import EpisodeTable, convert_jsonl
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("source", type=Path, help="episodes.jsonl 路径")
+    parser.add_argument("--output", type=Path, help="store 目录，默认 <source 所在目录>/episodes")
+    parser.add_argument("--batch-size", type=int, default=4096)
+    args = parser.parse_args()
+    output = args.output or args.source.parent / "episodes"
+    written, skipped = convert_jsonl(args.source, output, batch_size=args.batch_size)
+    table = EpisodeTable(output)
+    print(f"written={written} skipped_lines={skipped} rows={len(table)} output={output}")
+
+
+if __name__ == "__main__":
+    main()
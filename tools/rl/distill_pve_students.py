@@ -0,0 +1,333 @@
+"""Distill compact student battle policies for the lower PvE tiers from the hard model.
+
+The student keeps the ActorCritic v3 structure (so both the torch and NumPy
+runtimes load it unchanged) with a narrower trunk, slot encoder and per-action
+head. Training data are observations from teacher self-play against the
+heuristic opponent, optionally plus recorded ``replays.bin`` battles. The
+student matches the teacher's masked action distribution (KL) and value (MSE).
+
+Each requested tier is then calibrated with ``benchmark_pve_tiers`` on fixed
+seeds. The currently deployed tier model is measured first. Then the student
+is swept over that tier's knob (temperature for easy, legal exploration rate
+for normal), and the setting whose win rate is closest is kept. A tier whose
+full model is not published is referenced by the teacher with that tier's
+deployed sampling settings. A tier whose
+best student stays within ``--max-win-rate-gap`` is registered under
+``difficulties.<tier>.student`` in ``manifest.json`` and served by default.
+Otherwise the student files are removed and the full model stays in use.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(ROOT))
+
+import numpy as np
+import torch
+import torch.nn.functional as F
+
+from src.paths import PVE_MODELS_DIR
+from src.rl import actions
+from src.rl.env_v3 import SanguoEnv
+from src.rl.models.actor_critic_v3 import ActorCritic, MODEL_SCHEMA
+from src.rl.models.numpy_runtime import export_battle_checkpoint
+from src.rl.observation import OBSERVATION_SCHEMA, OBSERVATION_SIZE
+from src.rl.opponents import HeuristicOpponent
+from src.rl.pve import BATTLE_MISTAKE_RATES, BATTLE_TEMPERATURES, PVEController
+from src.rl.replay import read_replays, trajectory
+from tools.rl.benchmark_pve_tiers import benchmark_controller
+from tools.rl.promote_pve_models import numpy_entry, relative_or_absolute, sha256
+
+STUDENT_TIERS = ("easy", "normal")
+DEFAULT_STUDENT_CONFIG = {
+    "hidden_size": 64, "slot_hidden_size": 32,
+    "action_slot_size": 16, "action_hidden_size": 32,
+}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--destination", type=Path, default=PVE_MODELS_DIR)
+    parser.add_argument("--teacher", type=Path, help="默认使用发布目录中的 battle_policy_hard.pt")
+    parser.add_argument("--tiers", nargs="+", choices=STUDENT_TIERS, default=list(STUDENT_TIERS))
+    parser.add_argument("--games", type=int, default=400, help="教师自博弈采样局数")
+    parser.add_argument("--replays", type=Path, nargs="*", default=[], help="额外的 replays.bin")
+    parser.add_argument("--exploration", type=float, default=0.15,
+                        help="自博弈中随机合法动作的比例，扩大状态覆盖")
+    parser.add_argument("--epochs", type=int, default=30)
+    parser.add_argument("--batch-size", type=int, default=512)
+    parser.add_argument("--lr", type=float, default=1e-3)
+    parser.add_argument("--distill-temperature", type=float, default=1.0)
+    parser.add_argument("--value-coef", type=float, default=0.5)
+    parser.add_argument("--holdout", type=float, default=0.1)
+    for name, value in DEFAULT_STUDENT_CONFIG.items():
+        parser.add_argument(f"--{name.replace('_', '-')}", type=int, default=value)
+    parser.add_argument("--easy-temperatures", type=float, nargs="+",
+                        default=[1.0, 1.35, 1.7, 2.2, 3.0])
+    parser.add_argument("--normal-mistake-rates", type=float, nargs="+",
+                        default=[0.1, 0.2, 0.3, 0.4, 0.5])
+    parser.add_argument("--episodes", type=int, default=200)
+    parser.add_argument("--seed-base", type=int, default=2026072500)
+    parser.add_argument("--max-seconds-per-tier", type=int, default=1800)
+    parser.add_argument("--max-win-rate-gap", type=float, default=0.03)
+    parser.add_argument("--timing-samples", type=int, default=512)
+    return parser.parse_args()
+
+
+def load_battle_model(path):
+    state = torch.load(path, map_location="cpu", weights_only=False)
+    PVEController._validate_battle_schema(state)
+    model = ActorCritic(OBSERVATION_SIZE, actions.ACTION_SIZE, **(state.get("model_config") or {}))
+    model.load_state_dict(state["model"])
+    return model.eval(), state
+
+
+def self_play_observations(teacher, *, games, seed_base, exploration):
+    """Teacher-driven battles against the heuristic opponent; returns stacked obs/masks."""
+    rng = np.random.default_rng(seed_base)
+    observations, masks = [], []
+    for offset in range(games):
+        env = SanguoEnv(HeuristicOpponent())
+        observation, info = env.reset(seed_base + offset)
+        done = False
+        while not done:
+            mask = info["action_mask"]
+            observations.append(observation)
+            masks.append(mask)
+            legal = np.flatnonzero(mask == 0)
+            if rng.random() < exploration:
+                action = int(rng.choice(legal))
+            else:
+                with torch.no_grad():
+                    logits, _ = teacher(
+                        torch.as_tensor(observation, dtype=torch.float32).unsqueeze(0),
+                        torch.as_tensor(mask, dtype=torch.bool).unsqueeze(0),
+                    )
+                action = int(logits.argmax(dim=-1).item())
+            observation, _, done, info = env.step(action)
+    return np.asarray(observations, dtype=np.float32), np.asarray(masks, dtype=np.bool_)
+
+
+def replay_observations(paths):
+    observations, masks = [], []
+    for path in paths:
+        for replay in read_replays(path):
+            if replay is None or replay.seed is None:
+                continue
+            steps = trajectory(replay)
+            observations.append(steps["observations"])
+            masks.append(steps["masks"])
+    if not observations:
+        return None
+    return np.concatenate(observations), np.concatenate(masks)
+
+
+def teacher_targets(teacher, observations, masks, batch_size=1024):
+    logits, values = [], []
+    with torch.no_grad():
+        for start in range(0, len(observations), batch_size):
+            batch_logits, batch_values = teacher(
+                torch.as_tensor(observations[start:start + batch_size]),
+                torch.as_tensor(masks[start:start + batch_size]),
+            )
+            logits.append(batch_logits)
+            values.append(batch_values)
+    return torch.cat(logits), torch.cat(values)
+
+
+def distill(teacher, observations, masks, config, args):
+    """Train a student on the teacher's masked distribution; returns (student, report)."""
+    generator = torch.Generator().manual_seed(args.seed_base)
+    torch.manual_seed(args.seed_base)
+    teacher_logits, teacher_values = teacher_targets(teacher, observations, masks)
+    observations = torch.as_tensor(observations)
+    masks = torch.as_tensor(masks)
+    order = torch.randperm(len(observations), generator=generator)
+    holdout = max(1, int(len(order) * args.holdout))
+    validation, training = order[:holdout], order[holdout:]
+    student = ActorCritic(OBSERVATION_SIZE, actions.ACTION_SIZE, **config)
+    optimizer = torch.optim.Adam(student.parameters(), lr=args.lr)
+    temperature = args.distill_temperature
+
+    def loss_on(indices):
+        logits, values = student(observations[indices], masks[indices])
+        target = F.softmax(teacher_logits[indices] / temperature, dim=-1)
+        policy_loss = F.kl_div(
+            F.log_softmax(logits / temperature, dim=-1), target, reduction="batchmean",
+        ) * temperature ** 2
+        value_loss = F.mse_loss(values, teacher_values[indices])
+        return policy_loss, value_loss, logits
+
+    for epoch in range(args.epochs):
+        student.train()
+        shuffled = training[torch.randperm(len(training), generator=generator)]
+        totals = [0.0, 0.0]
+        for start in range(0, len(shuffled), args.batch_size):
+            indices = shuffled[start:start + args.batch_size]
+            policy_loss, value_loss, _ = loss_on(indices)
+            optimizer.zero_grad()
+            (policy_loss + args.value_coef * value_loss).backward()
+            optimizer.step()
+            totals[0] += policy_loss.item() * len(indices)
+            totals[1] += value_loss.item() * len(indices)
+        print(f"epoch {epoch + 1}/{args.epochs} kl={totals[0] / len(training):.4f} "
+              f"value_mse={totals[1] / len(training):.4f}", flush=True)
+
+    student.eval()
+    with torch.no_grad():
+        policy_loss, value_loss, logits = loss_on(validation)
+        agreement = (logits.argmax(dim=-1) == teacher_logits[validation].argmax(dim=-1)).float().mean()
+    return student, {
+        "samples": len(order),
+        "holdout_kl": policy_loss.item(),
+        "holdout_value_mse": value_loss.item(),
+        "holdout_agreement": agreement.item(),
+    }
+
+
+def ms_per_move(controller, observations, masks):
+    controller.load()
+    started = time.perf_counter()
+    for observation, mask in zip(observations, masks):
+        controller.choose_battle_action(observation, mask)
+    return (time.perf_counter() - started) * 1e3 / max(1, len(observations))
+
+
+def calibrate_tier(args, difficulty, student_path, reference_path, sample):
+    """Sweep the tier's runtime knob; return (runtime_policy, gate)."""
+    prebattle = args.destination / f"prebattle_value_{difficulty}.pt"
+    seed = args.seed_base + STUDENT_TIERS.index(difficulty)
+
+    def measure(checkpoint, temperature, mistake_rate):
+        torch.manual_seed(seed)
+        controller = PVEController(
+            checkpoint, prebattle, difficulty=difficulty, seed=seed,
+            battle_temperature=temperature, mistake_rate=mistake_rate,
+        )
+        report = benchmark_controller(
+            controller, episodes=args.episodes, seed_base=args.seed_base,
+            max_seconds=args.max_seconds_per_tier,
+        )
+        return report["win_rate"], controller
+
+    if not reference_path.is_file():
+        # 该档完整模型未发布时，以教师模型加该档的部署采样设置作为强度参照。
+        reference_path = args.teacher_path
+    reference_rate, reference = measure(
+        reference_path, BATTLE_TEMPERATURES[difficulty], BATTLE_MISTAKE_RATES[difficulty],
+    )
+    if difficulty == "easy":
+        candidates = [{"temperature": value, "legal_exploration_rate": 0.0} for value in args.easy_temperatures]
+    else:
+        candidates = [{"temperature": None, "legal_exploration_rate": value} for value in args.normal_mistake_rates]
+    sweep = []
+    best = None
+    for policy in candidates:
+        rate, controller = measure(student_path, policy["temperature"], policy["legal_exploration_rate"])
+        sweep.append({**policy, "win_rate": rate})
+        print(difficulty, "student", policy, f"win_rate={rate:.3f} reference={reference_rate:.3f}", flush=True)
+        if best is None or abs(rate - reference_rate) < abs(best[1] - reference_rate):
+            best = (policy, rate, controller)
+    policy, rate, controller = best
+    observations, masks = sample
+    gate = {
+        "reference_model": reference_path.name,
+        "reference_win_rate": reference_rate,
+        "win_rate": rate,
+        "sweep": sweep,
+        "episodes": args.episodes,
+        "seed_base": args.seed_base,
+        "reference_ms_per_move": ms_per_move(reference, observations, masks),
+        "ms_per_move": ms_per_move(controller, observations, masks),
+        "thresholds": {"max_win_rate_gap": args.max_win_rate_gap},
+    }
+    gate["passed"] = abs(rate - reference_rate) <= args.max_win_rate_gap
+    return policy, gate
+
+
+def main():
+    args = parse_args()
+    args.destination = args.destination.resolve()
+    teacher_path = args.teacher_path = (args.teacher or args.destination / "battle_policy_hard.pt").resolve()
+    teacher, teacher_state = load_battle_model(teacher_path)
+    config = {name: getattr(args, name) for name in DEFAULT_STUDENT_CONFIG}
+
+    observations, masks = self_play_observations(
+        teacher, games=args.games, seed_base=args.seed_base + 100000, exploration=args.exploration,
+    )
+    recorded = replay_observations(args.replays)
+    if recorded is not None:
+        observations = np.concatenate((observations, recorded[0]))
+        masks = np.concatenate((masks, recorded[1]))
+    print(f"distillation samples={len(observations)} (recorded={0 if recorded is None else len(recorded[0])})")
+    student, report = distill(teacher, observations, masks, config, args)
+    print("student", json.dumps(report), flush=True)
+    state = {
+        "model": student.state_dict(),
+        "model_config": config,
+        "update": teacher_state.get("update"),
+        "observation_schema": OBSERVATION_SCHEMA,
+        "observation_size": OBSERVATION_SIZE,
+        "action_size": actions.ACTION_SIZE,
+        "model_schema": MODEL_SCHEMA,
+        "distillation": {
+            "teacher": relative_or_absolute(teacher_path),
+            "teacher_sha256": sha256(teacher_path),
+            "parameters": sum(parameter.numel() for parameter in student.parameters()),
+            "teacher_parameters": sum(parameter.numel() for parameter in teacher.parameters()),
+            **report,
+        },
+    }
+
+    sample_rng = np.random.default_rng(args.seed_base)
+    picked = sample_rng.choice(len(observations), min(args.timing_samples, len(observations)), replace=False)
+    sample = (observations[picked], masks[picked])
+    manifest_path = args.destination / "manifest.json"
+    manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+    rejected = []
+    for difficulty in args.tiers:
+        student_path = args.destination / f"battle_student_{difficulty}.pt"
+        temporary = student_path.with_suffix(".pt.tmp")
+        torch.save(state, temporary)
+        os.replace(temporary, student_path)
+        student_numpy = export_battle_checkpoint(state, student_path.with_suffix(".npz"))
+        policy, gate = calibrate_tier(
+            args, difficulty, student_path, args.destination / f"battle_policy_{difficulty}.pt", sample,
+        )
+        entry = manifest["difficulties"][difficulty]
+        if gate["passed"]:
+            entry["student"] = {
+                "battle": {
+                    "file": student_path.name,
+                    "sha256": sha256(student_path),
+                    "bytes": student_path.stat().st_size,
+                    "model_config": config,
+                    "distillation": state["distillation"],
+                    "numpy": numpy_entry(student_numpy),
+                },
+                "runtime_policy": policy,
+                "gate": gate,
+            }
+        else:
+            # 未通过校准的学生模型不留在发布目录，该档继续使用完整模型。
+            student_path.unlink()
+            student_numpy.unlink()
+            entry.pop("student", None)
+            rejected.append(difficulty)
+        print(difficulty, json.dumps({"runtime_policy": policy, **gate}, ensure_ascii=False), flush=True)
+    temporary = manifest_path.with_suffix(".json.tmp")
+    temporary.write_text(json.dumps(manifest, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+    os.replace(temporary, manifest_path)
+    if rejected:
+        print(f"学生模型未通过强度校准: {', '.join(rejected)}")
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""Export tracked PvE checkpoints to flat NumPy weight files for torch-free inference."""
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(ROOT))
+
+from src.paths import PVE_MODELS_DIR
+from src.rl.models.numpy_runtime import (
+    export_battle_checkpoint,
+    export_prebattle_checkpoint,
+    weights_path,
+)
+from src.rl.pve import PVE_DIFFICULTIES
+
+
+def export_checkpoint(source, destination=None):
+    """Convert one battle or prebattle `.pt` checkpoint and return the written path."""
+    import torch
+
+    source = Path(source)
+    destination = Path(destination) if destination else weights_path(source)
+    state = torch.load(source, map_location="cpu", weights_only=False)
+    if "model" in state:
+        return export_battle_checkpoint(state, destination)
+    if "draft_model" in state and "formation_model" in state:
+        return export_prebattle_checkpoint(state, destination)
+    raise ValueError(f"{source} 既不是战斗模型也不是预战模型 checkpoint")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--source", type=Path, default=PVE_MODELS_DIR)
+    parser.add_argument(
+        "--tiers", nargs="+", choices=PVE_DIFFICULTIES, default=list(PVE_DIFFICULTIES),
+    )
+    parser.add_argument(
+        "--strict", action="store_true", help="任一档模型缺失时失败，而不是跳过",
+    )
+    args = parser.parse_args()
+
+    exported, missing = [], []
+    for difficulty in args.tiers:
+        for name in (f"battle_policy_{difficulty}.pt", f"prebattle_value_{difficulty}.pt"):
+            source = args.source / name
+            if not source.is_file():
+                missing.append(str(source))
+                continue
+            output = export_checkpoint(source)
+            exported.append({
+                "source": name, "file": output.name, "bytes": output.stat().st_size,
+            })
+    print(json.dumps({"exported": exported, "missing": missing}, ensure_ascii=False, indent=2))
+    if missing and args.strict:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
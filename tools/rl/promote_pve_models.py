@@ -16,6 +16,10 @@ sys.path.insert(0, str(ROOT))
 from src.paths import PVE_MODELS_DIR
 from src.rl import actions
 from src.rl.models.actor_critic_v3 import MODEL_SCHEMA
+from src.rl.models.numpy_runtime import (
+    export_battle_checkpoint,
+    export_prebattle_checkpoint,
+)
 from src.rl.observation import OBSERVATION_SCHEMA, OBSERVATION_SIZE
 from src.rl.prebattle import GENERAL_IDS, PREBATTLE_SCHEMA
 from src.rl.pve import BATTLE_MISTAKE_RATES, BATTLE_TEMPERATURES
@@ -80,6 +84,10 @@ def promote(source, destination):
     os.replace(temporary, destination)
 
 
+def numpy_entry(path):
+    return {"file": path.name, "sha256": sha256(path), "bytes": path.stat().st_size}
+
+
 def relative_or_absolute(path):
     try:
         return str(path.resolve().relative_to(ROOT))
@@ -107,6 +115,11 @@ def main():
         prebattle_output = destination / f"prebattle_value_{difficulty}.pt"
         promote(battle_path, battle_output)
         promote(prebattle_path, prebattle_output)
+        # 同时发布 NumPy 权重，无 torch 的 Web 构建直接加载 .npz。
+        battle_numpy = export_battle_checkpoint(battle, battle_output.with_suffix(".npz"))
+        prebattle_numpy = export_prebattle_checkpoint(
+            prebattle, prebattle_output.with_suffix(".npz"),
+        )
         manifest["difficulties"][difficulty] = {
             "runtime_policy": {
                 "temperature": BATTLE_TEMPERATURES[difficulty],
@@ -120,6 +133,7 @@ def main():
                 "update": battle.get("update"),
                 "observation_schema": battle.get("observation_schema"),
                 "model_schema": battle.get("model_schema"),
+                "numpy": numpy_entry(battle_numpy),
             },
             "prebattle": {
                 "file": prebattle_output.name,
@@ -128,6 +142,7 @@ def main():
                 "bytes": prebattle_output.stat().st_size,
                 "schema": prebattle.get("schema"),
                 "metadata": prebattle.get("metadata", {}),
+                "numpy": numpy_entry(prebattle_numpy),
             },
         }
     (destination / "manifest.json").write_text(
@@ -0,0 +1,168 @@
+"""Build gated fp16/int8 variants of the tracked PvE models and record them in the manifest."""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(ROOT))
+
+from src.game_data.generals_config import create_general_from_data
+from src.game_data.generals_data import GENERALS_DATA
+from src.paths import PVE_MODELS_DIR
+from src.rl.models.numpy_runtime import save_quantized, weights_path
+from src.rl.pve import PVEController, PVE_DIFFICULTIES
+from tools.rl.benchmark_pve_tiers import action_agreement, benchmark_controller
+from tools.rl.promote_pve_models import numpy_entry
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--mode", choices=("fp16", "int8"), default="int8")
+    parser.add_argument("--destination", type=Path, default=PVE_MODELS_DIR)
+    parser.add_argument(
+        "--tiers", nargs="+", choices=PVE_DIFFICULTIES, default=list(PVE_DIFFICULTIES),
+    )
+    parser.add_argument("--episodes", type=int, default=200)
+    parser.add_argument("--agreement-episodes", type=int, default=50)
+    parser.add_argument("--seed-base", type=int, default=2026072500)
+    parser.add_argument("--max-seconds-per-tier", type=int, default=1800)
+    parser.add_argument("--prebattle-pools", type=int, default=32)
+    parser.add_argument("--min-action-agreement", type=float, default=0.98)
+    parser.add_argument("--min-prebattle-agreement", type=float, default=0.95)
+    parser.add_argument("--max-win-rate-drop", type=float, default=0.02)
+    return parser.parse_args()
+
+
+def ensure_fp32_weights(checkpoint):
+    """Use an existing fp32 `.npz` export, or create it from the `.pt` checkpoint."""
+    path = weights_path(checkpoint)
+    if not path.is_file():
+        from tools.rl.export_pve_numpy import export_checkpoint
+        export_checkpoint(checkpoint, path)
+    return path
+
+
+def prebattle_agreement(reference, candidate, *, pools, seed):
+    """Share of fixed draft pools where both models pick the same roster and formation."""
+    rng = random.Random(seed)
+    matches = 0
+    for _ in range(pools):
+        sample = rng.sample(GENERALS_DATA, 16)
+        pool = [create_general_from_data(data) for data in sample[:8]]
+        enemy = [create_general_from_data(data) for data in sample[8:11]]
+        expected = reference.prebattle.choose_draft(pool, enemy, 8.0)
+        chosen = candidate.prebattle.choose_draft(pool, enemy, 8.0)
+        if [g.general_id for g in expected] != [g.general_id for g in chosen]:
+            continue
+        enemy_formation = [
+            {"general_id": general.general_id, "row": 0, "col": col}
+            for col, general in enumerate(enemy)
+        ]
+        matches += int(
+            reference.prebattle.choose_formation(expected, enemy, enemy_formation)
+            == candidate.prebattle.choose_formation(chosen, enemy, enemy_formation)
+        )
+    return matches / max(1, pools)
+
+
+def gate_tier(args, difficulty):
+    battle = args.destination / f"battle_policy_{difficulty}.pt"
+    prebattle = args.destination / f"prebattle_value_{difficulty}.pt"
+    outputs = {
+        "battle": save_quantized(
+            ensure_fp32_weights(battle), weights_path(battle, args.mode), args.mode,
+        ),
+        "prebattle": save_quantized(
+            ensure_fp32_weights(prebattle), weights_path(prebattle, args.mode), args.mode,
+        ),
+    }
+    seed = args.seed_base + PVE_DIFFICULTIES.index(difficulty)
+    # 两个精度都走 NumPy 运行时：温度采样和失误共用同一个带种子的 RNG，
+    # 胜率差只来自精度本身，且 fp32 基准可复现。
+    controllers = {
+        quantization: PVEController(
+            battle, prebattle, difficulty=difficulty, runtime="numpy",
+            quantization=quantization, seed=seed,
+        ).load()
+        for quantization in ("fp32", args.mode)
+    }
+    for controller in controllers.values():
+        if controller.load_errors:
+            raise RuntimeError("; ".join(controller.load_errors))
+    reference, candidate = controllers["fp32"], controllers[args.mode]
+    agreement = action_agreement(
+        reference, candidate,
+        episodes=args.agreement_episodes, seed_base=args.seed_base,
+    )
+    win_rates = {
+        quantization: benchmark_controller(
+            controller, episodes=args.episodes, seed_base=args.seed_base,
+            max_seconds=args.max_seconds_per_tier,
+        )["win_rate"]
+        for quantization, controller in controllers.items()
+    }
+    prebattle_match = prebattle_agreement(
+        reference, candidate, pools=args.prebattle_pools, seed=seed,
+    )
+    gate = {
+        "action_agreement": agreement["agreement"],
+        "decisions": agreement["decisions"],
+        "prebattle_agreement": prebattle_match,
+        "fp32_win_rate": win_rates["fp32"],
+        "win_rate": win_rates[args.mode],
+        "episodes": args.episodes,
+        "seed_base": args.seed_base,
+        "thresholds": {
+            "min_action_agreement": args.min_action_agreement,
+            "min_prebattle_agreement": args.min_prebattle_agreement,
+            "max_win_rate_drop": args.max_win_rate_drop,
+        },
+    }
+    gate["passed"] = (
+        gate["action_agreement"] >= args.min_action_agreement
+        and gate["prebattle_agreement"] >= args.min_prebattle_agreement
+        and gate["fp32_win_rate"] - gate["win_rate"] <= args.max_win_rate_drop
+    )
+    return outputs, gate
+
+
+def main():
+    args = parse_args()
+    args.destination = args.destination.resolve()
+    manifest_path = args.destination / "manifest.json"
+    manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+    rejected = []
+    for difficulty in args.tiers:
+        outputs, gate = gate_tier(args, difficulty)
+        entry = manifest["difficulties"][difficulty]
+        if gate["passed"]:
+            entry["quantized"] = {
+                "mode": args.mode,
+                "battle": numpy_entry(outputs["battle"]),
+                "prebattle": numpy_entry(outputs["prebattle"]),
+                "gate": gate,
+            }
+        else:
+            # 未通过门控的变体不得留在发布目录，运行时继续使用 fp32。
+            for path in outputs.values():
+                path.unlink()
+            entry.pop("quantized", None)
+            rejected.append(difficulty)
+        print(difficulty, args.mode, json.dumps(gate, ensure_ascii=False), flush=True)
+    temporary = manifest_path.with_suffix(".json.tmp")
+    temporary.write_text(
+        json.dumps(manifest, ensure_ascii=False, indent=2) + "\n", encoding="utf-8",
+    )
+    os.replace(temporary, manifest_path)
+    if rejected:
+        print(f"量化模型未通过精度门控: {', '.join(rejected)}")
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
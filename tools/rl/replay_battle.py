@@ -0,0 +1,67 @@
+"""重演训练或评估保存的二进制战斗回放。
+
+默认逐局重演并校验回合数与胜负是否和记录一致；``--index`` 只处理指定局，
+``--dump`` 把所选局学习方视角的 observation/mask/动作/奖励写成 .npz。
+"""
+from __future__ import annotations
+
+import argparse
+from pathlib import Path
+import sys
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(ROOT))
+
+from src.rl.env import SanguoEnv
+from src.rl.replay import read_replays, trajectory
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("replays", type=Path, help="replays.bin 路径")
+    parser.add_argument("--index", type=int, action="append",
+                        help="只重演第 N 局（从 0 计，可重复）")
+    parser.add_argument("--dump", type=Path, help="把所选局的轨迹写入该 .npz（各局按 episode 维拼接）")
+    parser.add_argument("--quiet", action="store_true", help="只输出汇总")
+    args = parser.parse_args()
+
+    wanted = set(args.index) if args.index else None
+    env = SanguoEnv()
+    checked = skipped = failed = 0
+    dumped = {}
+    for index, replay in enumerate(read_replays(args.replays)):
+        if wanted is not None and index not in wanted:
+            continue
+        if replay is None or replay.seed is None:
+            skipped += 1
+            continue
+        try:
+            steps = trajectory(replay, env)
+        except ValueError as error:
+            failed += 1
+            print(f"[{index}] 重演失败: {error}")
+            continue
+        checked += 1
+        if not args.quiet:
+            winner = "draw" if replay.winner_side is None else f"p{replay.winner_side + 1}"
+            print(
+                f"[{index}] seed={replay.seed} p1={[item[0] for item in replay.sides[0]]} "
+                f"p2={[item[0] for item in replay.sides[1]]} actions={len(replay.actions)} "
+                f"learner_steps={len(steps['actions'])} turns={replay.turns} winner={winner} "
+                f"bytes={len(replay.to_bytes())}"
+            )
+        if args.dump:
+            steps["episode"] = np.full(len(steps["actions"]), index, dtype=np.int64)
+            for key, value in steps.items():
+                dumped.setdefault(key, []).append(value)
+    print(f"checked={checked} failed={failed} skipped={skipped}")
+    if args.dump and dumped:
+        np.savez_compressed(args.dump, **{key: np.concatenate(value) for key, value in dumped.items()})
+    if failed:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,291 @@
+"""Run several PPO configs concurrently under one CPU budget with successive halving.
+
+Each run is one base YAML from ``tools/rl/configs`` plus optional overrides
+(``--set``/``--grid``). The sweep trains all runs to the first rung, ranks them by
+the last logged evaluation metric, keeps the top ``1/eta`` and resumes the
+survivors from their latest checkpoint to the next rung, until ``--max-updates``.
+Pruned runs are paused, not deleted: their checkpoints stay resumable. The CPU
+budget is split evenly across the runs that are training at the same time, so
+later rungs with fewer survivors get more rollout workers each.
+
+    python tools/rl/sweep_ppo.py tools/rl/configs/ppo_selfplay_v3.yaml \
+        --grid entropy_coef=0.01,0.02 --grid roster_cost_bias=0.5,0.75 \
+        --cpu-budget 32 --max-concurrent 4 --rung-updates 20 --max-updates 160
+"""
+from __future__ import annotations
+
+import argparse
+import csv
+import itertools
+import json
+import math
+import os
+from pathlib import Path
+import subprocess
+import sys
+import time
+
+ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(ROOT))
+
+import yaml
+
+DEFAULT_TRAINER = ROOT / "tools" / "rl" / "train_ppo_v3.py"
+DEFAULT_METRIC = "eval/heuristic/quality_score"
+REPORT_METRICS = (
+    "eval/heuristic/win_rate",
+    "eval/heuristic/timeout_rate",
+    "eval/heuristic/best_quality_score",
+    "train/fps",
+)
+
+
+def parse_assignment(text):
+    key, separator, value = text.partition("=")
+    if not separator or not key:
+        raise argparse.ArgumentTypeError(f"需要 key=value，实际为 {text!r}")
+    return key.strip().replace("-", "_"), value
+
+
+def expand_runs(configs, fixed=(), grid=()):
+    """把每个基础 YAML 与 ``--grid`` 的笛卡尔积展开成 run 列表。"""
+    fixed_values = {key: yaml.safe_load(value) for key, value in fixed}
+    axes = [(key, [yaml.safe_load(item) for item in values.split(",")]) for key, values in grid]
+    runs = []
+    for config in configs:
+        stem = Path(config).stem
+        for combination in itertools.product(*(values for _, values in axes)):
+            overrides = dict(fixed_values)
+            overrides.update(zip((key for key, _ in axes), combination))
+            suffix = "-".join(f"{key}={value}" for key, value in zip((key for key, _ in axes), combination))
+            runs.append({
+                "name": f"{stem}-{suffix}" if suffix else stem,
+                "config": str(config),
+                "overrides": overrides,
+                "status": "pending",
+                "updates": 0,
+                "score": None,
+                "metrics": {},
+            })
+    names = [run["name"] for run in runs]
+    if len(set(names)) != len(names):
+        raise ValueError("展开后的 run 名称重复；同一个 YAML 只能出现一次")
+    return runs
+
+
+def rung_targets(rung_updates, max_updates, eta):
+    """每一档的累计 update 数：r, r*eta, r*eta^2, ...，最后一档对齐 max_updates。"""
+    targets = []
+    target = rung_updates
+    while target < max_updates:
+        targets.append(target)
+        target *= eta
+    targets.append(max_updates)
+    return targets
+
+
+def survivors_after_rung(runs, eta, mode="max"):
+    """按本档指标保留前 ceil(n/eta) 个；没有指标的 run 排在最后。"""
+    sign = 1.0 if mode == "max" else -1.0
+    ranked = sorted(
+        runs,
+        key=lambda run: (run["score"] is not None, sign * (run["score"] or 0.0)),
+        reverse=True,
+    )
+    keep = max(1, math.ceil(len(ranked) / eta))
+    return ranked[:keep], ranked[keep:]
+
+
+def read_metrics(path):
+    """返回 metrics.csv 中每个 tag 最后一次记录的值。"""
+    latest = {}
+    if not path.exists():
+        return latest
+    with path.open(newline="", encoding="utf-8") as handle:
+        for row in csv.DictReader(handle):
+            step = int(row["step"])
+            if row["tag"] not in latest or step >= latest[row["tag"]][0]:
+                latest[row["tag"]] = (step, float(row["value"]))
+    return {tag: value for tag, (_, value) in latest.items()}
+
+
+class SweepScheduler:
+    """按档推进：每档内同时最多 ``max_concurrent`` 个训练子进程共享 CPU 预算。"""
+
+    def __init__(self, runs, root, *, trainer=DEFAULT_TRAINER, cpu_budget=None,
+                 max_concurrent=4, rung_updates=20, max_updates=160, eta=2,
+                 metric=DEFAULT_METRIC, mode="max", device="cpu", poll_seconds=2.0):
+        if eta < 2:
+            raise ValueError("eta 必须 >= 2")
+        if rung_updates <= 0 or max_updates < rung_updates or max_updates % rung_updates:
+            raise ValueError("需要 0 < rung_updates <= max_updates，且 max_updates 是 rung_updates 的整数倍")
+        self.runs = runs
+        # 训练子进程在仓库根目录运行，路径统一转成绝对路径。
+        self.root = Path(root).resolve()
+        self.trainer = Path(trainer).resolve()
+        self.cpu_budget = max(1, cpu_budget or os.cpu_count() or 1)
+        self.max_concurrent = max(1, max_concurrent)
+        self.rung_updates = rung_updates
+        self.max_updates = max_updates
+        self.eta = eta
+        self.metric = metric
+        self.mode = mode
+        self.device = device
+        self.poll_seconds = poll_seconds
+
+    def run_dir(self, run):
+        return self.root / run["name"]
+
+    def write_config(self, run):
+        """基础 YAML 合并覆盖项后写入 run 目录，所有参数（含 v3 专属键）走同一入口。"""
+        directory = self.run_dir(run)
+        directory.mkdir(parents=True, exist_ok=True)
+        values = yaml.safe_load(Path(run["config"]).read_text(encoding="utf-8")) or {}
+        values.update(run["overrides"])
+        path = directory / "config.yaml"
+        path.write_text(yaml.safe_dump(values, allow_unicode=True, sort_keys=False), encoding="utf-8")
+        return path
+
+    def command(self, run, rung, target, workers):
+        directory = self.run_dir(run)
+        command = [
+            sys.executable, str(self.trainer),
+            "--config", str(directory / "config.yaml"),
+            "--artifact-root", str(directory),
+            "--run-name", f"rung{rung}",
+            "--device", self.device,
+            "--num-workers", str(workers),
+            "--max-updates", str(target),
+            # 每档的最后一个 update 恰好评估一次，供排名使用。
+            "--eval-every", str(self.rung_updates),
+        ]
+        latest = directory / "checkpoints" / "ppo_latest.pt"
+        if rung > 0 and latest.exists():
+            command += ["--resume", str(latest)]
+        return command
+
+    def train_rung(self, runs, rung, target):
+        concurrent = min(self.max_concurrent, len(runs))
+        # rollout worker 与 learner 在同步屏障两侧交替运行，各自使用同一份核数。
+        cores = max(1, self.cpu_budget // concurrent)
+        pending = list(runs)
+        active = {}
+        while pending or active:
+            while pending and len(active) < concurrent:
+                run = pending.pop(0)
+                log = (self.run_dir(run) / f"rung{rung}.log").open("w", encoding="utf-8")
+                env = dict(os.environ, OMP_NUM_THREADS=str(cores), MKL_NUM_THREADS=str(cores))
+                process = subprocess.Popen(
+                    self.command(run, rung, target, cores), cwd=ROOT, env=env,
+                    stdout=log, stderr=subprocess.STDOUT,
+                )
+                run["status"] = "running"
+                active[run["name"]] = (run, process, log)
+                print(f"[rung {rung}] 启动 {run['name']}：{cores} 核，训练到 update {target}")
+            for name, (run, process, log) in list(active.items()):
+                if process.poll() is None:
+                    continue
+                log.close()
+                del active[name]
+                self.collect(run, rung, process.returncode, target)
+            if active:
+                time.sleep(self.poll_seconds)
+
+    def collect(self, run, rung, returncode, target):
+        metrics = read_metrics(self.run_dir(run) / "runs" / f"rung{rung}" / "metrics.csv")
+        run["metrics"].update(metrics)
+        run["score"] = metrics.get(self.metric)
+        if returncode != 0:
+            run["status"] = f"failed (rung {rung}, exit {returncode})"
+            run["score"] = None
+            return
+        run["updates"] = target
+        run["status"] = "paused"
+        score = "n/a" if run["score"] is None else f"{run['score']:.4f}"
+        print(f"[rung {rung}] 完成 {run['name']}：{self.metric}={score}")
+
+    def run(self):
+        self.root.mkdir(parents=True, exist_ok=True)
+        for run in self.runs:
+            self.write_config(run)
+        survivors = list(self.runs)
+        targets = rung_targets(self.rung_updates, self.max_updates, self.eta)
+        for rung, target in enumerate(targets):
+            self.train_rung(survivors, rung, target)
+            trained = [run for run in survivors if not run["status"].startswith("failed")]
+            if rung == len(targets) - 1 or not trained:
+                for run in trained:
+                    run["status"] = "finished"
+                break
+            survivors, pruned = survivors_after_rung(trained, self.eta, self.mode)
+            for run in pruned:
+                run["status"] = f"pruned (rung {rung})"
+            self.write_summary()
+        return self.write_summary()
+
+    def ranked(self):
+        sign = 1.0 if self.mode == "max" else -1.0
+        return sorted(
+            self.runs,
+            key=lambda run: (run["updates"], run["score"] is not None, sign * (run["score"] or 0.0)),
+            reverse=True,
+        )
+
+    def write_summary(self):
+        rows = self.ranked()
+        (self.root / "summary.json").write_text(
+            json.dumps({"metric": self.metric, "mode": self.mode, "runs": rows}, ensure_ascii=False, indent=2),
+            encoding="utf-8",
+        )
+        table = format_table(rows, self.metric)
+        (self.root / "summary.md").write_text(table + "\n", encoding="utf-8")
+        return table
+
+
+def format_table(runs, metric):
+    columns = ["run", "status", "updates", metric, *REPORT_METRICS, "overrides"]
+    lines = ["| " + " | ".join(columns) + " |", "|" + "---|" * len(columns)]
+    for run in runs:
+        values = [run["name"], run["status"], str(run["updates"])]
+        for tag in (metric, *REPORT_METRICS):
+            value = run["metrics"].get(tag)
+            values.append("" if value is None else f"{value:.4f}")
+        values.append(", ".join(f"{key}={value}" for key, value in run["overrides"].items()))
+        lines.append("| " + " | ".join(values) + " |")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("configs", nargs="+", type=Path, help="基础训练 YAML，每个至少产生一个 run")
+    parser.add_argument("--set", dest="fixed", action="append", type=parse_assignment, default=[],
+                        help="对所有 run 生效的覆盖项，如 --set target_kl=0.02")
+    parser.add_argument("--grid", action="append", type=parse_assignment, default=[],
+                        help="逗号分隔的取值，与其他 --grid 做笛卡尔积，如 --grid entropy_coef=0.01,0.02")
+    parser.add_argument("--root", type=Path, default=Path("artifacts/rl/sweeps") / time.strftime("sweep-%Y%m%d-%H%M%S"))
+    parser.add_argument("--trainer", type=Path, default=DEFAULT_TRAINER)
+    parser.add_argument("--cpu-budget", type=int, default=os.cpu_count(), help="所有并发 run 共享的 CPU 核数")
+    parser.add_argument("--max-concurrent", type=int, default=4)
+    parser.add_argument("--rung-updates", type=int, default=20, help="第一档的 update 数，同时作为评估间隔")
+    parser.add_argument("--max-updates", type=int, default=160)
+    parser.add_argument("--eta", type=int, default=2, help="每档保留 1/eta 的 run")
+    parser.add_argument("--metric", default=DEFAULT_METRIC)
+    parser.add_argument("--mode", choices=("max", "min"), default="max")
+    parser.add_argument("--device", default="cpu")
+    args = parser.parse_args()
+
+    runs = expand_runs(args.configs, args.fixed, args.grid)
+    scheduler = SweepScheduler(
+        runs, args.root, trainer=args.trainer, cpu_budget=args.cpu_budget,
+        max_concurrent=args.max_concurrent, rung_updates=args.rung_updates,
+        max_updates=args.max_updates, eta=args.eta, metric=args.metric,
+        mode=args.mode, device=args.device,
+    )
+    print(f"{len(runs)} 个 run，档位 {rung_targets(args.rung_updates, args.max_updates, args.eta)}，"
+          f"CPU 预算 {scheduler.cpu_budget} 核")
+    print(scheduler.run())
+    print(f"汇总已写入 {args.root / 'summary.md'}")
+
+
+if __name__ == "__main__":
+    main()
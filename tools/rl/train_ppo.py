@@ -18,12 +18,16 @@ from src.rl.evaluation.strength import GeneralStrengthTracker
 from src.rl.models.actor_critic import ActorCritic, MODEL_SCHEMA
 from src.rl.observation import OBSERVATION_SCHEMA, OBSERVATION_SIZE
 from src.rl.opponents import HeuristicOpponent, RandomOpponent
+from src.rl.phase_timer import merge_timings, timing_metrics
+from src.rl.symmetry import roster_is_column_symmetric
+from src.rl.training.augmentation import augment_column_mirror
 from src.rl.training.checkpoint import CheckpointManager
 from src.rl.training.early_stop import ConvergenceTracker
 from src.rl.training.evaluation import evaluate
 from src.rl.training.gae import compute_gae
 from src.rl.training.logging import TrainLogger
 from src.rl.training.ppo import ppo_update
+from src.rl.training import rollout_storage
 from src.rl.training.runtime import detect_runtime
 from src.rl.training.self_play import HistoricalPolicyPool
 from src.rl.training.vector_env import SyncRolloutCoordinator
@@ -41,7 +45,10 @@ def batch_from_fragments(fragments, gamma=0.99, gae_lambda=0.95):
             merged[key].append(getattr(fragment, key))
         merged["advantages"].append(advantages)
         merged["returns"].append(returns)
-    return {key: np.concatenate(values) for key, values in merged.items()}
+    batch = {key: rollout_storage.concatenate(values) for key, values in merged.items()}
+    if all(fragment.column_symmetric is not None for fragment in fragments):
+        batch["column_symmetric"] = np.concatenate([fragment.column_symmetric for fragment in fragments])
+    return batch
 
 
 def rollout_metrics_from_fragments(fragments, tracker=None):
@@ -153,13 +160,16 @@ def selfplay_payloads(model, pool, worker_count, rng, current_ratio):
 def collect_rollout(env, model, device, rollout_steps, seed_base, tracker,
                     gamma=0.99, gae_lambda=0.95):
     observation, info = env.reset(seed_base)
-    trajectory = {key: [] for key in ("observations", "masks", "actions", "log_probs", "rewards", "values", "dones")}
+    trajectory = {key: [] for key in ("observations", "masks", "actions", "log_probs", "rewards", "values", "dones", "column_symmetric")}
     episode_reward = episode_steps = 0
     episodes = wins = losses = draws = 0
     actions = {"skill": 0, "attack": 0, "end": 0}
     damage = {}
+    timer = env.phase_timer
     for index in range(rollout_steps):
         import torch
+        if timer is not None:
+            started = time.perf_counter()
         obs_tensor = torch.as_tensor(observation, dtype=torch.float32, device=device).unsqueeze(0)
         mask_tensor = torch.as_tensor(info["action_mask"], dtype=torch.bool, device=device).unsqueeze(0)
         with torch.no_grad():
@@ -167,6 +177,8 @@ def collect_rollout(env, model, device, rollout_steps, seed_base, tracker,
             distribution = torch.distributions.Categorical(logits=logits)
             action = int(distribution.sample().item())
             log_prob = float(distribution.log_prob(torch.tensor(action, device=device)).item())
+        if timer is not None:
+            timer.add("forward", time.perf_counter() - started)
         decoded = env.decode_action(action)
         if decoded.kind.startswith("skill"):
             actions["skill"] += 1
@@ -182,6 +194,7 @@ def collect_rollout(env, model, device, rollout_steps, seed_base, tracker,
         trajectory["rewards"].append(reward)
         trajectory["values"].append(float(value.item()))
         trajectory["dones"].append(done)
+        trajectory["column_symmetric"].append(roster_is_column_symmetric(env.learning_team, env.enemy_team))
         episode_reward += reward
         episode_steps += 1
         result = next_info.get("result") or {}
@@ -256,7 +269,8 @@ def main():
     parser.add_argument("--max-team-size", type=int, default=8)
     parser.add_argument("--team-size-power", type=float, default=0.0,
                         help="多阵容采样权重 size**power；正值提高大阵容频率")
-    parser.add_argument("--roster-candidate-samples", type=int, default=256)
+    parser.add_argument("--roster-candidate-samples", type=int, default=None,
+                        help="已废弃且不再生效：阵容由精确计数采样抽取；仅为兼容旧配置保留")
     parser.add_argument("--roster-cost-bias", type=float, default=0.75,
                         help="0=全候选均匀，1=优先接近费用上限")
     parser.add_argument("--cost-limit", type=float, default=8.0)
@@ -276,6 +290,12 @@ def main():
     parser.add_argument("--selfplay-top-k", type=int, default=8)
     parser.add_argument("--selfplay-temperature", type=float, default=0.25)
     parser.add_argument("--selfplay-snapshot-every", type=int, default=20)
+    parser.add_argument("--column-mirror-augmentation", action="store_true",
+                        help="为列对称阵容的样本追加列镜像副本，每个环境步得到两条训练样本")
+    parser.add_argument("--disable-combat-events", action="store_true",
+                        help="rollout 不记录战斗表现事件（协同统计为空），省去事件构造开销")
+    parser.add_argument("--phase-timing", action="store_true",
+                        help="统计 rollout 各阶段（规则、mask、observation、对手回合、前向、队列）耗时并记入 perf/")
     valid_keys = {action.dest for action in parser._actions}
     unknown_keys = sorted(set(yaml_defaults) - valid_keys)
     if unknown_keys:
@@ -290,8 +310,8 @@ def main():
         parser.error("team_size 不能为负数；使用 0 启用多阵容采样")
     if not 1 <= args.min_team_size <= args.max_team_size <= 12:
         parser.error("多阵容人数范围必须满足 1 <= min_team_size <= max_team_size <= 12")
-    if args.roster_candidate_samples <= 0:
-        parser.error("roster_candidate_samples 必须为正整数")
+    if args.roster_candidate_samples is not None:
+        print("roster_candidate_samples 已废弃且不再生效，阵容由精确计数采样抽取")
     if not 0.0 <= args.roster_cost_bias <= 1.0:
         parser.error("roster_cost_bias 必须在 0 到 1 之间")
     import torch
@@ -335,10 +355,11 @@ def main():
         "min_team_size": args.min_team_size,
         "max_team_size": args.max_team_size,
         "team_size_power": args.team_size_power,
-        "roster_candidate_samples": args.roster_candidate_samples,
         "roster_cost_bias": args.roster_cost_bias,
         "cost_limit": args.cost_limit,
         "max_turns": args.max_turns, "reward_config": reward_config,
+        "record_combat_events": not args.disable_combat_events,
+        "phase_timing": args.phase_timing,
     }
     env = SanguoEnv(make_opponent(args.stage), **env_config)
     coordinator = SyncRolloutCoordinator(profile.num_workers, args.stage, env_config) if profile.num_workers > 1 or args.stage == "selfplay" else None
@@ -373,12 +394,19 @@ def main():
                 batch = batch_from_fragments(fragments, args.gamma, args.gae_lambda)
                 summaries = [summary for fragment in fragments for summary in fragment.episode_summaries]
                 rollout = rollout_metrics_from_fragments(fragments, tracker=tracker)
+                timings = merge_timings(fragment.phase_timings for fragment in fragments)
             else:
                 batch, rollout = collect_rollout(
                     env, model, profile.device, profile.rollout_steps,
                     args.seed + update * 100000, tracker,
                     gamma=args.gamma, gae_lambda=args.gae_lambda,
                 )
+                timings = env.phase_timer.drain() if env.phase_timer else {}
+            if args.column_mirror_augmentation:
+                batch, mirrored = augment_column_mirror(
+                    batch, model, device=profile.device, chunk_size=profile.minibatch_size,
+                )
+                rollout["column_mirror_samples"] = mirrored
             elapsed = time.monotonic() - started
             progress = 0.0 if args.schedule_updates <= 0 else min(1.0, update / args.schedule_updates)
             scheduled_lr = linear_schedule(args.learning_rate, final_lr, progress)
@@ -397,6 +425,8 @@ def main():
             metrics.update({"rollout_steps": profile.rollout_steps, "fps": profile.rollout_steps / max(update_elapsed, 1e-6), "wallclock_minutes": elapsed / 60})
             logger.log(update, metrics, "train")
             logger.log(update, rollout, "rollout")
+            if timings:
+                logger.log(update, timing_metrics(timings), "perf")
             logger.log_episodes(update, summaries)
             for name, stat in tracker.snapshot().items():
                 logger.log(update, stat, f"general/{name}")
@@ -468,6 +498,7 @@ def main():
     finally:
         if coordinator:
             coordinator.close()
+        manager.close()
         logger.close()
 
 
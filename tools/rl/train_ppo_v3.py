@@ -1,6 +1,7 @@
 """PPO v3 入口；与仍在运行的 v2 训练进程和 checkpoint 完全隔离。"""
 from __future__ import annotations
 
+import atexit
 from pathlib import Path
 import random
 import sys
@@ -14,6 +15,7 @@ from src.rl.models.actor_critic_v3 import ActorCritic, MODEL_SCHEMA
 from src.rl.observation import OBSERVATION_SCHEMA, OBSERVATION_SIZE
 from src.rl.training.evaluation_v3 import evaluate as evaluate_v3
 from src.rl.training.ppo_v3 import ppo_update
+from src.rl.training.ppo_v3_distributed import DataParallelLearner
 from src.rl.training.vector_env_v3 import SyncRolloutCoordinator as V3Coordinator
 
 
@@ -26,8 +28,12 @@ V3_DEFAULTS = {
     "roster_repeat_episodes": 4,
     "mirror_ratio": 0.15,
     "eval_mirror_episodes": 128,
+    # >1 时 learner 改为本机 gloo 数据并行（仅 CPU），每个进程使用 learner_threads 个线程。
+    "learner_processes": 1,
+    "learner_threads": 1,
 }
 settings = dict(V3_DEFAULTS)
+_learner = None
 _base_yaml_loader = base.load_yaml_defaults
 _base_rollout_metrics = base.rollout_metrics_from_fragments
 
@@ -137,12 +143,23 @@ def evaluate(model, device, opponent, **kwargs):
     return primary
 
 
+def configured_ppo_update(model, optimizer, batch, **kwargs):
+    global _learner
+    processes = int(settings["learner_processes"])
+    if processes <= 1:
+        return ppo_update(model, optimizer, batch, **kwargs)
+    if _learner is None:
+        _learner = DataParallelLearner(processes, threads_per_process=int(settings["learner_threads"]))
+        atexit.register(_learner.close)
+    return _learner(model, optimizer, batch, **kwargs)
+
+
 def main():
     base.ActorCritic = ActorCritic
     base.MODEL_SCHEMA = MODEL_SCHEMA
     base.SanguoEnv = SanguoEnv
     base.SyncRolloutCoordinator = SyncRolloutCoordinator
-    base.ppo_update = ppo_update
+    base.ppo_update = configured_ppo_update
     base.load_yaml_defaults = load_yaml_defaults
     base.selfplay_payloads = selfplay_payloads
     base.rollout_metrics_from_fragments = rollout_metrics_from_fragments
@@ -15,8 +15,17 @@ import numpy as np
 import torch
 
 from src.rl.prebattle import (
-    GENERAL_IDS, PREBATTLE_SCHEMA, build_models, encode_draft, encode_formation,
+    GENERAL_IDS, PREBATTLE_SCHEMA, build_models, draft_index_matrix, formation_index_matrix,
 )
+from src.rl.training.episode_store import (
+    MAX_SLOTS, OUTCOMES, EpisodeTable, pad_formation, pad_ids,
+)
+
+SAMPLE_COLUMNS = {
+    "roster_self": np.int16, "roster_enemy": np.int16,
+    "formation_self_ids": np.int16, "formation_self_cells": np.int8,
+    "formation_enemy_ids": np.int16, "formation_enemy_cells": np.int8,
+}
 
 
 def load_yaml_defaults(path):
@@ -38,7 +47,8 @@ def parse_args():
     known, _ = bootstrap.parse_known_args()
     yaml_defaults = load_yaml_defaults(known.config)
     parser = argparse.ArgumentParser(parents=[bootstrap])
-    parser.add_argument("--episodes", default="artifacts/rl/round_v3/runs/selfplay-v3-round-01/episodes.jsonl")
+    parser.add_argument("--episodes", default="artifacts/rl/round_v3/runs/selfplay-v3-round-01/episodes",
+                        help="列式 episode store 目录；不存在时回退到同一 run 下的旧格式 episodes.jsonl")
     parser.add_argument("--output", default="artifacts/rl/pve/prebattle_value.pt")
     parser.add_argument("--min-update", type=int, default=200)
     parser.add_argument("--validation-update", type=int, default=501)
@@ -81,7 +91,88 @@ def _reservoir_add(items, value, limit, seen, rng):
             items[index] = value
 
 
+OUTCOME_TARGETS = {OUTCOMES.index("win"): 1.0, OUTCOMES.index("loss"): 0.0, OUTCOMES.index("draw"): 0.5}
+
+
+def _complete_formations(table, rows, side):
+    """向量化的 ``_valid_formation``：阵位武将与阵容一致、格子合法且不重复。"""
+    roster = table[f"roster_{side}"][rows]
+    ids = table[f"formation_{side}_ids"][rows]
+    cells = table[f"formation_{side}_cells"][rows].astype(np.int64)
+    present = ids >= 0
+    in_board = ~present | ((cells >= 0) & (cells < 12))
+    occupied = ((cells[..., None] == np.arange(12)) & present[..., None]).sum(axis=1)
+    return (
+        (roster >= 0).any(axis=1)
+        & (np.sort(roster, axis=1) == np.sort(ids, axis=1)).all(axis=1)
+        & in_board.all(axis=1) & (occupied <= 1).all(axis=1)
+    )
+
+
+def _store_samples(table, rows, limit, rng):
+    chunks = [rows[start:start + 65536] for start in range(0, len(rows), 65536)]
+    complete = np.concatenate([np.zeros(0, dtype=np.bool_)] + [
+        _complete_formations(table, chunk, "self") & _complete_formations(table, chunk, "enemy")
+        for chunk in chunks
+    ])
+    skipped = int((~complete).sum())
+    if len(rows) > limit:
+        chosen = np.sort(np.asarray(rng.sample(range(len(rows)), limit), dtype=np.int64))
+        rows, complete = rows[chosen], complete[chosen]
+    samples = {key: np.asarray(table[key][rows]) for key in SAMPLE_COLUMNS}
+    targets = np.asarray([OUTCOME_TARGETS[int(code)] for code in range(len(OUTCOMES))], dtype=np.float32)
+    samples["target"] = targets[table["outcome"][rows]]
+    samples["complete"] = complete
+    return samples, skipped
+
+
+def _records_to_samples(records):
+    """把 JSONL 路径抽到的记录整理成与列式 store 相同的补齐数组。"""
+    columns = {key: [] for key in SAMPLE_COLUMNS}
+    for roster_self, roster_enemy, form_self, form_enemy, _, _ in records:
+        columns["roster_self"].append(pad_ids(roster_self))
+        columns["roster_enemy"].append(pad_ids(roster_enemy))
+        for side, formation in (("self", form_self), ("enemy", form_enemy)):
+            ids, cells = pad_formation(formation)
+            columns[f"formation_{side}_ids"].append(ids)
+            columns[f"formation_{side}_cells"].append(cells)
+    samples = {
+        key: np.asarray(values, dtype=SAMPLE_COLUMNS[key]).reshape(-1, MAX_SLOTS)
+        for key, values in columns.items()
+    }
+    samples["target"] = np.asarray([record[4] for record in records], dtype=np.float32)
+    samples["complete"] = np.asarray([record[5] for record in records], dtype=np.bool_)
+    return samples
+
+
+def load_store_records(path, args):
+    """从列式 store 读取：按 update 切片、按胜负筛选，全程不解析文本。"""
+    rng = random.Random(args.seed)
+    table = EpisodeTable(path)
+    outcome = table["outcome"]
+    train_rows = table.update_rows(args.min_update, args.validation_update)
+    validation_rows = table.update_rows(args.validation_update)
+    train_rows = train_rows[outcome[train_rows] >= 0]
+    validation_rows = validation_rows[outcome[validation_rows] >= 0]
+    print(f"store {len(table)} 行，训练候选 {len(train_rows)}，验证候选 {len(validation_rows)}", flush=True)
+    train, skipped_train = _store_samples(table, train_rows, args.max_train, rng)
+    validation, skipped_validation = _store_samples(table, validation_rows, args.max_validation, rng)
+    return train, validation, skipped_train + skipped_validation
+
+
+def episode_source(path):
+    """store 目录不存在时回退到同一 run 目录下的旧格式 ``episodes.jsonl``。"""
+    path = Path(path)
+    legacy = path.parent / "episodes.jsonl"
+    if not path.exists() and path.name == "episodes" and legacy.is_file():
+        return legacy
+    return path
+
+
 def load_records(path, args):
+    path = episode_source(path)
+    if path.is_dir():
+        return load_store_records(path, args)
     rng = random.Random(args.seed)
     train, validation = [], []
     seen_train = seen_validation = skipped_formation = 0
@@ -112,19 +203,19 @@ def load_records(path, args):
                 _reservoir_add(train, record, args.max_train, seen_train, rng)
             if line_number % 100000 == 0:
                 print(f"读取 {line_number} 行，训练候选 {seen_train}，验证候选 {seen_validation}", flush=True)
-    return train, validation, skipped_formation
+    return _records_to_samples(train), _records_to_samples(validation), skipped_formation
+
 
+def make_arrays(samples, formation=False):
+    """返回 ``(int16 特征下标矩阵, 目标)``；下标行以 -1 补齐，直接喂给价值网络。
 
-def make_arrays(records, formation=False):
-    features, targets = [], []
-    for roster_self, roster_enemy, form_self, form_enemy, target, complete in records:
-        if formation and not complete:
-            continue
-        encoder = encode_formation if formation else encode_draft
-        args = (roster_self, roster_enemy, form_self, form_enemy) if formation else (roster_self, roster_enemy)
-        features.append(encoder(*args))
-        targets.append(target)
-    return np.asarray(features, dtype=np.float32), np.asarray(targets, dtype=np.float32)
+    与稠密 multi-hot 相比每行只保存几十个下标，数据集内存下降两个数量级。
+    """
+    if not formation:
+        return draft_index_matrix(samples["roster_self"], samples["roster_enemy"]), samples["target"]
+    keep = samples["complete"]
+    features = formation_index_matrix(*(samples[key][keep] for key in SAMPLE_COLUMNS))
+    return features, samples["target"][keep]
 
 
 def metrics(logits, targets):
@@ -188,7 +279,7 @@ def main():
     device = "cuda" if args.device == "auto" and torch.cuda.is_available() else args.device
     if device == "auto": device = "cpu"
     train, validation, skipped = load_records(args.episodes, args)
-    if not train or not validation:
+    if not len(train["target"]) or not len(validation["target"]):
         raise RuntimeError("没有足够的训练/验证 episode，请检查 update 切分")
     draft_train_x, draft_train_y = make_arrays(train)
     draft_val_x, draft_val_y = make_arrays(validation)
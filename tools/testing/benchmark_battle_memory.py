@@ -0,0 +1,117 @@
+"""Measure how many bytes one live mid-game battle keeps resident.
+
+Battles are driven to a random mid-game state through ``SanguoEnv`` with
+random legal sub-actions, then the controller, teams, generals and effects are
+kept alive while tracemalloc reports the retained heap. Use ``--output`` to
+save a run and ``--baseline`` to compare a later run against it.
+"""
+
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+import random
+import sys
+import tracemalloc
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(ROOT))
+
+from src.rl.env import SanguoEnv
+from src.rl.general_pool import GeneralPool
+from src.rl.opponents import RandomOpponent
+from src.rl.roster_sampler import counting_table
+
+
+def instance_bytes(value):
+    """Shallow size of one object including its ``__dict__`` when it has one."""
+    size = sys.getsizeof(value)
+    if hasattr(value, "__dict__"):
+        size += sys.getsizeof(vars(value))
+    return size
+
+
+def build_battles(count, steps, seed):
+    env = SanguoEnv(RandomOpponent(), team_size=0, max_team_size=6)
+    # 每局都要保留独立的对象图，因此关闭对象池与控制器复用。
+    env.general_pool = GeneralPool(generals_data=())
+    rng = random.Random(seed)
+    battles = []
+    for index in range(count):
+        env.controller = None
+        env.reset(seed + index)
+        for _ in range(rng.randrange(steps + 1)):
+            _, _, done, _ = env.step(rng.choice(env.legal_actions()))
+            if done:
+                break
+        battles.append((env.controller, env.battle_system))
+    return battles
+
+
+def measure(count, steps, seed):
+    build_battles(2, steps, seed - 2)  # 预热计数表等进程级缓存
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    battles = build_battles(count, steps, seed)
+    counting_table.cache_clear()  # 选将计数表缓存属于进程，不计入单局
+    gc.collect()
+    retained = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+
+    generals = [
+        general for controller, _ in battles
+        for player in (controller.player1, controller.player2)
+        for general in player.team.generals
+    ]
+    effects = [
+        effect for general in generals
+        for effect in (*general.buffs, *general.debuffs, *general.pending_buffs, *general.pending_debuffs)
+    ]
+    passives = [skill for general in generals for skill in general.passive_skills]
+    return {
+        "battles": count,
+        "steps": steps,
+        "seed": seed,
+        "bytes_per_battle": retained / count,
+        "generals_per_battle": len(generals) / count,
+        "effects_per_battle": len(effects) / count,
+        "general_bytes": instance_bytes(generals[0]),
+        "team_bytes": instance_bytes(battles[0][0].player1.team),
+        "passive_bytes": (
+            sum(map(instance_bytes, passives)) / len(passives) if passives else 0.0
+        ),
+        "effect_bytes": (
+            sum(map(instance_bytes, effects)) / len(effects) if effects else 0.0
+        ),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("-n", "--battles", type=int, default=1000)
+    parser.add_argument("--steps", type=int, default=60,
+                        help="each battle advances a random 0..steps learner sub-actions")
+    parser.add_argument("--seed", type=int, default=2026081000)
+    parser.add_argument("--output", type=Path, help="write the result as JSON")
+    parser.add_argument("--baseline", type=Path, help="compare against an earlier --output")
+    args = parser.parse_args()
+
+    result = measure(args.battles, args.steps, args.seed)
+    for key, value in result.items():
+        print(f"{key}={value:.1f}" if isinstance(value, float) else f"{key}={value}")
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+        ratio = result["bytes_per_battle"] / baseline["bytes_per_battle"]
+        print(
+            f"baseline bytes_per_battle={baseline['bytes_per_battle']:.1f} "
+            f"current={result['bytes_per_battle']:.1f} ratio={ratio:.3f}"
+        )
+    if args.output:
+        args.output.write_text(json.dumps(result, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
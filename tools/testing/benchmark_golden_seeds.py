@@ -0,0 +1,194 @@
+"""Replay a fixed corpus of seeded battles to measure engine speed and pin rules.
+
+Every battle is driven through ``SanguoEnv`` (and therefore
+``BattleRulesService``) by a seeded random learner against Random and
+Heuristic opponents over fixed-size, variable-size and mirrored rosters. The
+run reports battles/sec, env steps/sec and the exclusive microseconds spent
+in ``action_mask``, ``build_observation``, rule resolution and the rest of
+``step`` per call, plus a SHA-256 of each battle's action stream and final
+state. Throughput is the best of ``--repeat`` passes after a short warm-up.
+
+``--output`` stores a run as the baseline; ``--baseline`` compares against it
+and exits non-zero if any outcome hash differs or throughput drops by more
+than ``--tolerance``. Hashes are portable; throughput is only comparable on
+the machine that recorded the baseline.
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import random
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(ROOT))
+
+from src.rl.env import SanguoEnv
+from src.rl.opponents import HeuristicOpponent, RandomOpponent
+
+DEFAULT_BASELINE = Path(__file__).with_name("golden_seeds_baseline.json")
+OPPONENTS = {"random": RandomOpponent, "heuristic": HeuristicOpponent}
+# (name, env kwargs, reset kwargs) - the corpus cycles through these per seed.
+ROSTERS = (
+    ("three", {"team_size": 3}, {}),
+    ("variable", {"team_size": 0, "max_team_size": 6}, {}),
+    ("mirror", {"team_size": 0, "max_team_size": 6}, {"mirror": True}),
+)
+# Reported name -> PhaseTimer phase. ``env_step`` excludes the nested phases.
+TIMED_PHASES = (
+    ("action_mask", "action_mask"), ("observation", "observation"),
+    ("rules", "rules"), ("env_step", "env_step"),
+)
+
+
+def corpus(battles, seed):
+    """Deterministic ``(key, opponent, roster, seed)`` entries."""
+    entries = []
+    for index in range(battles):
+        opponent = ("random", "heuristic")[index % 2]
+        roster = ROSTERS[(index // 2) % len(ROSTERS)][0]
+        entries.append((f"{opponent}/{roster}/{seed + index}", opponent, roster, seed + index))
+    return entries
+
+
+def state_digest(env):
+    """Hash the recorded action stream together with the final battle state."""
+    digest = hashlib.sha256(env.replay.to_bytes())
+    for team in (env.controller.player1.team, env.controller.player2.team):
+        digest.update(f"|{team.current_morale}/{team.max_morale}".encode())
+        for general in team.generals:
+            # Fallen generals leave the formation; their position is None.
+            position = team.get_general_position(general)
+            digest.update(
+                f"|{general.general_id}@{position}:{general.current_hp}/{general.max_hp}"
+                f":{int(general.is_alive)}:{len(general.buffs)}:{len(general.debuffs)}".encode()
+            )
+    digest.update(f"|turn={env.battle_system.turn_count}".encode())
+    return digest.hexdigest()
+
+
+def play(env, seed, reset_kwargs):
+    """Play one battle with a seeded random learner; returns learner steps."""
+    rng = random.Random(seed ^ 0x5A5A)
+    env.reset(seed, **reset_kwargs)
+    steps = 0
+    done = False
+    while not done:
+        _, _, done, _ = env.step(rng.choice(env.legal_actions()))
+        steps += 1
+    return steps
+
+
+def run_pass(envs, entries):
+    reset_kwargs = {name: kwargs for name, _, kwargs in ROSTERS}
+    hashes = {}
+    steps = 0
+    for env in envs.values():
+        env.phase_timer.drain()
+    started = time.perf_counter()
+    for key, opponent, roster, battle_seed in entries:
+        env = envs[opponent, roster]
+        steps += play(env, battle_seed, reset_kwargs[roster])
+        hashes[key] = state_digest(env)
+    elapsed = time.perf_counter() - started
+    phases = {}
+    for env in envs.values():
+        for phase, (seconds, count) in env.phase_timer.drain().items():
+            total, calls = phases.get(phase, (0.0, 0))
+            phases[phase] = (total + seconds, calls + count)
+    return elapsed, steps, hashes, phases
+
+
+def run(battles, seed, repeat=3):
+    envs = {
+        (opponent, name): SanguoEnv(factory(), phase_timing=True, **env_kwargs)
+        for opponent, factory in OPPONENTS.items()
+        for name, env_kwargs, _ in ROSTERS
+    }
+    entries = corpus(battles, seed)
+    run_pass(envs, corpus(len(envs), seed - len(envs)))  # warm caches and counting tables
+    best = None
+    for _ in range(max(1, repeat)):
+        current = run_pass(envs, entries)
+        if best is not None and current[2] != best[2]:
+            raise RuntimeError("outcome hashes differ between passes of the same corpus")
+        if best is None or current[0] < best[0]:
+            best = current
+    elapsed, steps, hashes, phases = best
+    corpus_hash = hashlib.sha256("".join(hashes[key] for key in sorted(hashes)).encode()).hexdigest()
+    result = {
+        "battles": battles,
+        "seed": seed,
+        "steps": steps,
+        "seconds": elapsed,
+        "battles_per_sec": battles / elapsed,
+        "steps_per_sec": steps / elapsed,
+        "corpus_hash": corpus_hash,
+    }
+    for name, phase in TIMED_PHASES:
+        seconds, count = phases.get(phase, (0.0, 0))
+        result[f"{name}_us"] = seconds * 1e6 / max(1, count)
+    result["hashes"] = hashes
+    return result
+
+
+def compare(result, baseline, tolerance):
+    """Return human-readable failures; empty when the run matches the baseline."""
+    failures = []
+    if (result["battles"], result["seed"]) != (baseline["battles"], baseline["seed"]):
+        return [
+            f"corpus differs from baseline: battles={result['battles']}/{baseline['battles']} "
+            f"seed={result['seed']}/{baseline['seed']}"
+        ]
+    for key, expected in baseline["hashes"].items():
+        actual = result["hashes"].get(key)
+        if actual != expected:
+            failures.append(f"outcome hash mismatch: {key}")
+    for metric in ("battles_per_sec", "steps_per_sec"):
+        ratio = result[metric] / baseline[metric]
+        if ratio < 1.0 - tolerance:
+            failures.append(
+                f"{metric} regressed: {result[metric]:.1f} vs baseline {baseline[metric]:.1f} "
+                f"(ratio {ratio:.3f}, tolerance {tolerance:.0%})"
+            )
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-n", "--battles", type=int, default=240)
+    parser.add_argument("--seed", type=int, default=2026101900)
+    parser.add_argument("--repeat", type=int, default=3, help="timed passes; the fastest is reported")
+    parser.add_argument("--output", type=Path, help="write this run as a baseline JSON")
+    parser.add_argument("--baseline", type=Path, nargs="?", const=DEFAULT_BASELINE,
+                        help=f"compare against a baseline (default {DEFAULT_BASELINE.name})")
+    parser.add_argument("--tolerance", type=float, default=0.20,
+                        help="allowed fractional throughput drop before failing")
+    parser.add_argument("--hashes-only", action="store_true",
+                        help="only check outcome hashes, e.g. on a different machine")
+    args = parser.parse_args()
+
+    result = run(args.battles, args.seed, args.repeat)
+    for key, value in result.items():
+        if key != "hashes":
+            print(f"{key}={value:.2f}" if isinstance(value, float) else f"{key}={value}")
+    if args.output:
+        args.output.write_text(json.dumps(result, indent=2) + "\n", encoding="utf-8")
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+        failures = compare(result, baseline, float("inf") if args.hashes_only else args.tolerance)
+        for metric in ("battles_per_sec", "steps_per_sec", *(f"{name}_us" for name, _ in TIMED_PHASES)):
+            print(f"baseline {metric}={baseline[metric]:.2f} current={result[metric]:.2f}")
+        for failure in failures:
+            print(f"FAIL {failure}")
+        if failures:
+            raise SystemExit(1)
+        print("baseline check passed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,341 @@
+"""Concurrent simulated players against a locally started Web ``GameServer``.
+
+Each client thread keeps one HTTP/1.1 keep-alive connection and its own
+``X-Game-Session`` so the server gives it an isolated ``GameState``. Clients
+play complete games through the endpoints ``game.js`` uses: PvP games reuse
+the ``self_play_10000`` browser-shaped policy (``/api/new``, ``/api/select``,
+``/api/place``, ``/api/dice``, ``/api/battle/*``); PvE games play the human
+side the same way and drive the computer like ``runComputerTurn``: one
+``/api/pve/stream`` request per computer turn (``--pve-transport stream``,
+the browser default) or ``/api/pve/step`` until the turn ends.
+
+The server runs in a child process (``python -m src.web.server``, threading
+or ``--server-mode asyncio``) unless ``--url`` points at one that is already
+running; its RSS is sampled from
+``/proc`` while the load runs (``--server-pid`` for an external server). The
+report lists p50/p95/p99 latency per endpoint, request and game throughput,
+error rates and the RSS timeline.
+"""
+
+from __future__ import annotations
+
+import argparse
+import http.client
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+from urllib.parse import urlparse
+
+ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(ROOT))
+
+from tools.testing.self_play_10000 import (
+    choose_team, play_one, play_turn, random_formation, validate_state,
+)
+
+SESSION_HEADER = "X-Game-Session"
+
+
+class RequestError(RuntimeError):
+    pass
+
+
+class Client:
+    """One simulated browser: a keep-alive connection plus its own session."""
+
+    def __init__(self, host, port, session, timeout=30.0):
+        self.host, self.port, self.timeout = host, port, timeout
+        self.session = session
+        self.connection = None
+        self.latencies = {}
+        self.errors = {}
+
+    def api(self, path, body=None):
+        payload = json.dumps(body or {}, ensure_ascii=False).encode("utf-8")
+        headers = {"Content-Type": "application/json", SESSION_HEADER: self.session}
+        started = time.perf_counter()
+        try:
+            if self.connection is None:
+                self.connection = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+            self.connection.request("POST", path, payload, headers)
+            response = self.connection.getresponse()
+            data = response.read()
+            if response.status != 200:
+                raise RequestError(f"HTTP {response.status} for {path}")
+            state = json.loads(data)
+        except (OSError, http.client.HTTPException, ValueError, RequestError) as error:
+            self.errors[path] = self.errors.get(path, 0) + 1
+            self.close()
+            raise RequestError(f"{path}: {error!r}") from error
+        self.latencies.setdefault(path, []).append(time.perf_counter() - started)
+        return state
+
+    def stream(self, path, body=None):
+        """POST an SSE endpoint; returns the ``action`` states in order."""
+        payload = json.dumps(body or {}, ensure_ascii=False).encode("utf-8")
+        headers = {"Content-Type": "application/json", SESSION_HEADER: self.session}
+        started = time.perf_counter()
+        try:
+            if self.connection is None:
+                self.connection = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+            self.connection.request("POST", path, payload, headers)
+            response = self.connection.getresponse()
+            data = response.read().decode("utf-8")
+            if response.status != 200:
+                raise RequestError(f"HTTP {response.status} for {path}")
+            states = []
+            for block in data.split("\n\n"):
+                fields = dict(line.split(": ", 1) for line in block.split("\n") if ": " in line)
+                if fields.get("event") == "action":
+                    states.append(json.loads(fields["data"]))
+        except (OSError, http.client.HTTPException, ValueError, RequestError) as error:
+            self.errors[path] = self.errors.get(path, 0) + 1
+            self.close()
+            raise RequestError(f"{path}: {error!r}") from error
+        self.latencies.setdefault(path, []).append(time.perf_counter() - started)
+        return states
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+
+def computer_turn_stream(client, state):
+    states = client.stream("/api/pve/stream")
+    for state in states:
+        if state.get("ai_error"):
+            raise RuntimeError(f"computer action failed: {state['ai_error']}")
+        validate_state(state)
+    versions = [item["version"] for item in states]
+    if versions != sorted(set(versions)):
+        raise RuntimeError(f"stream versions not increasing: {versions}")
+    return client.api("/api/state") if states and states[-1].get("ai_thinking") else (states or [state])[-1]
+
+
+def computer_turn_steps(client, state):
+    for _ in range(64):
+        state = client.api("/api/pve/step")
+        if state.get("ai_error"):
+            raise RuntimeError(f"computer action failed: {state['ai_error']}")
+        validate_state(state)
+        action = state.get("ai_action") or {}
+        if action.get("kind") in (None, "idle", "finished") or not state.get("ai_thinking"):
+            break
+    return state
+
+
+def play_pve(client, game_seed, max_turns, difficulty, transport="stream"):
+    """Human side as in the PvP policy; the computer via the chosen transport."""
+    rng = random.Random(game_seed)
+    api = client.api
+    state = api("/api/new", {"mode": "pve", "difficulty": difficulty})
+    picks = choose_team(state["pool"], rng, cost_limit=state["cost_limit"])
+    state = api("/api/select", {"general_ids": [general["id"] for general in picks]})
+    state = api("/api/place", {"positions": random_formation(state["p1"]["generals"], rng)})
+    state = api("/api/dice")
+    validate_state(state)
+    while state["phase"] == "battle" and state["turn"] <= max_turns:
+        if state.get("ai_thinking"):
+            if transport == "stream":
+                state = computer_turn_stream(client, state)
+            else:
+                state = computer_turn_steps(client, state)
+            if state.get("ai_thinking") and state["phase"] == "battle":
+                raise RuntimeError("computer turn did not finish within 64 sub-actions")
+            continue
+        state, _ = play_turn(state, rng, api, set())
+        if state["phase"] != "battle":
+            break
+        state = api("/api/battle/skip")
+        validate_state(state)
+    return state["phase"] == "over"
+
+
+def run_client(client, games, seed, max_turns, pve_ratio, difficulty, transport, results):
+    rng = random.Random(seed)
+    for number in range(games):
+        game_seed = seed + number
+        mode = "pve" if rng.random() < pve_ratio else "pvp"
+        started = time.perf_counter()
+        try:
+            if mode == "pve":
+                completed = play_pve(client, game_seed, max_turns, difficulty, transport)
+            else:
+                completed = play_one(game_seed, max_turns, api=client.api)["completed"]
+            outcome = "completed" if completed else "stalled"
+        except Exception as error:
+            outcome = "failed"
+            results["failures"].append((client.session, mode, game_seed, repr(error)))
+        with results["lock"]:
+            results["games"].append((mode, outcome, time.perf_counter() - started))
+    client.close()
+
+
+def read_rss_mib(pid):
+    try:
+        with open(f"/proc/{pid}/status", encoding="ascii") as handle:
+            for line in handle:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        return None
+    return None
+
+
+def sample_rss(pid, interval, stop, samples, started):
+    while not stop.wait(interval):
+        rss = read_rss_mib(pid)
+        if rss is not None:
+            samples.append((time.perf_counter() - started, rss))
+
+
+def free_port():
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+
+def start_server(port, extra_env=None, timeout=30.0):
+    env = dict(os.environ, PORT=str(port), **(extra_env or {}))
+    process = subprocess.Popen(
+        [sys.executable, "-m", "src.web.server"], cwd=ROOT, env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"server exited with code {process.returncode}")
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.5).close()
+            return process
+        except OSError:
+            time.sleep(0.1)
+    process.terminate()
+    raise RuntimeError("server did not start listening in time")
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def report(clients, results, elapsed, rss_samples):
+    latencies, errors = {}, {}
+    for client in clients:
+        for path, values in client.latencies.items():
+            latencies.setdefault(path, []).extend(values)
+        for path, count in client.errors.items():
+            errors[path] = errors.get(path, 0) + count
+    requests = sum(len(values) for values in latencies.values())
+    failed_requests = sum(errors.values())
+    print(f"\n{'endpoint':<22}{'count':>8}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for path in sorted(set(latencies) | set(errors)):
+        values = latencies.get(path) or [float("nan")]
+        print(
+            f"{path:<22}{len(latencies.get(path, ())):>8}{errors.get(path, 0):>8}"
+            f"{percentile(values, 0.50) * 1e3:>10.2f}{percentile(values, 0.95) * 1e3:>10.2f}"
+            f"{percentile(values, 0.99) * 1e3:>10.2f}{max(values) * 1e3:>10.2f}"
+        )
+    games = results["games"]
+    print(f"\nrequests={requests} errors={failed_requests} "
+          f"error_rate={failed_requests / max(1, requests + failed_requests):.4f} "
+          f"throughput={requests / elapsed:.1f} req/s elapsed={elapsed:.2f}s")
+    for mode in ("pvp", "pve"):
+        selected = [item for item in games if item[0] == mode]
+        if not selected:
+            continue
+        counts = {outcome: sum(item[1] == outcome for item in selected) for outcome in ("completed", "stalled", "failed")}
+        mean = sum(item[2] for item in selected) / len(selected)
+        print(f"{mode}: games={len(selected)} {' '.join(f'{key}={value}' for key, value in counts.items())} "
+              f"rate={len(selected) / elapsed:.2f} games/s mean_game={mean:.2f}s")
+    if rss_samples:
+        step = max(1, len(rss_samples) // 10)
+        timeline = " ".join(f"{t:.0f}s:{rss:.1f}" for t, rss in rss_samples[::step])
+        print(f"server_rss_mib start={rss_samples[0][1]:.1f} end={rss_samples[-1][1]:.1f} "
+              f"peak={max(rss for _, rss in rss_samples):.1f}")
+        print(f"server_rss_timeline {timeline}")
+    else:
+        print("server_rss_mib n/a")
+    for failure in results["failures"][:10]:
+        print(f"failure session={failure[0]} mode={failure[1]} seed={failure[2]} {failure[3]}")
+    return failed_requests + sum(item[1] != "completed" for item in games)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-c", "--clients", type=int, default=16)
+    parser.add_argument("-g", "--games-per-client", type=int, default=4)
+    parser.add_argument("--pve-ratio", type=float, default=0.5)
+    parser.add_argument("--difficulty", default="normal", choices=("easy", "normal", "hard"))
+    parser.add_argument("--pve-transport", default="stream", choices=("stream", "step"),
+                        help="computer turns via one /api/pve/stream or repeated /api/pve/step")
+    parser.add_argument("--seed", type=int, default=20261019)
+    parser.add_argument("--max-turns", type=int, default=300)
+    parser.add_argument("--server-mode", default="threading", choices=("threading", "asyncio"),
+                        help="serving mode of the locally started server")
+    parser.add_argument("--url", help="target an already running server instead of starting one")
+    parser.add_argument("--server-pid", type=int, help="PID of the --url server for RSS sampling")
+    parser.add_argument("--rss-interval", type=float, default=0.5)
+    args = parser.parse_args()
+
+    process = None
+    if args.url:
+        target = urlparse(args.url)
+        host, port, server_pid = target.hostname, target.port or 80, args.server_pid
+    else:
+        host, port = "127.0.0.1", free_port()
+        process = start_server(port, {"SANGUO_WEB_SERVER": args.server_mode})
+        server_pid = process.pid
+    clients = [Client(host, port, f"load-{index}") for index in range(args.clients)]
+    results = {"games": [], "failures": [], "lock": threading.Lock()}
+    stop = threading.Event()
+    rss_samples = []
+    started = time.perf_counter()
+    sampler = None
+    if server_pid:
+        rss = read_rss_mib(server_pid)
+        if rss is not None:
+            rss_samples.append((0.0, rss))
+        sampler = threading.Thread(
+            target=sample_rss, args=(server_pid, args.rss_interval, stop, rss_samples, started), daemon=True,
+        )
+        sampler.start()
+    threads = [
+        threading.Thread(
+            target=run_client,
+            args=(client, args.games_per_client, args.seed + index * 10007, args.max_turns,
+                  args.pve_ratio, args.difficulty, args.pve_transport, results),
+            name=client.session,
+        )
+        for index, client in enumerate(clients)
+    ]
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        elapsed = time.perf_counter() - started
+        stop.set()
+        if sampler is not None:
+            sampler.join()
+        if server_pid:
+            rss = read_rss_mib(server_pid)
+            if rss is not None:
+                rss_samples.append((elapsed, rss))
+        if process is not None:
+            process.terminate()
+            process.wait(timeout=10)
+    return 1 if report(clients, results, elapsed, rss_samples) else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
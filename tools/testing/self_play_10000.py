@@ -69,6 +69,8 @@ def validate_state(state):
             raise AssertionError(f"invalid morale: {team_key} {team['morale']}/{team['maxMorale']}")
         occupied = set()
         for general in team["generals"]:
+            if general.get("_ambushConcealed"):
+                continue  # PvE hides unrevealed computer ambushers behind a placeholder
             if not 0 <= general["hp"] <= general["maxHp"]:
                 raise AssertionError(f"invalid hp: {general['name']} {general['hp']}/{general['maxHp']}")
             if general["alive"] != (general["hp"] > 0):
@@ -80,7 +82,64 @@ def validate_state(state):
                 occupied.add(cell)
 
 
-def play_one(game_seed, max_turns=300):
+def play_turn(state, rng, api, used_skills):
+    """Play the current side's skills then attacks the way the browser allows.
+
+    Returns the latest state and the number of sub-actions; the caller skips.
+    """
+    actions = 0
+    current_key = state["current_team"]
+    enemy_key = "p2" if current_key == "p1" else "p1"
+
+    # The browser lets each living general use its skill once before Skip.
+    for general in list(state[current_key]["generals"]):
+        current = next((g for g in state[current_key]["generals"] if g["id"] == general["id"]), None)
+        if not current or not current["alive"] or current["_hasUsedSkill"] or current["cooldown"]:
+            continue
+        if not current["skill"] or current["skill"] == "无":
+            continue
+        if state[current_key]["morale"] < current["skill_cost"]:
+            continue
+        payload = {"general_id": current["id"]}
+        if current["_targetType"] == "AREA_ENEMY":
+            payload.update({
+                "area_row": rng.randrange(3),
+                "area_col": rng.randrange(4),
+                "guess": rng.choice(("奇", "偶")),
+            })
+        before_used = current["_hasUsedSkill"]
+        state = api("/api/battle/skill", payload)
+        actions += 1
+        validate_state(state)
+        after = next((g for g in state[current_key]["generals"] if g["id"] == current["id"]), None)
+        if after and not before_used and after["_hasUsedSkill"]:
+            used_skills.add(current["skill"])
+        if state["phase"] != "battle":
+            break
+    if state["phase"] != "battle":
+        return state, actions
+
+    # The frontend can then select every general that has not attacked this turn.
+    for general in list(state[current_key]["generals"]):
+        current = next((g for g in state[current_key]["generals"] if g["id"] == general["id"]), None)
+        if not current or not current["alive"] or current["_hasAttacked"]:
+            continue
+        targets = attackable_front(state[enemy_key]["generals"])
+        if not targets:
+            break
+        target = rng.choice(targets)
+        payload = {"attacker_id": current["id"], "target_id": target["id"]}
+        if current["_hasSpeedJudgment"] or current["_hasSpeedRequired"]:
+            payload["guess"] = rng.choice(("奇", "偶"))
+        state = api("/api/battle/attack", payload)
+        actions += 1
+        validate_state(state)
+        if state["phase"] != "battle":
+            break
+    return state, actions
+
+
+def play_one(game_seed, max_turns=300, api=api):
     rng = random.Random(game_seed)
     random.seed(game_seed)
     selected_names = set()
@@ -100,54 +159,8 @@ def play_one(game_seed, max_turns=300):
 
     actions = 0
     while state["phase"] == "battle" and state["turn"] <= max_turns:
-        current_key = state["current_team"]
-        enemy_key = "p2" if current_key == "p1" else "p1"
-
-        # The browser lets each living general use its skill once before Skip.
-        for general in list(state[current_key]["generals"]):
-            current = next((g for g in state[current_key]["generals"] if g["id"] == general["id"]), None)
-            if not current or not current["alive"] or current["_hasUsedSkill"] or current["cooldown"]:
-                continue
-            if not current["skill"] or current["skill"] == "无":
-                continue
-            if state[current_key]["morale"] < current["skill_cost"]:
-                continue
-            payload = {"general_id": current["id"]}
-            if current["_targetType"] == "AREA_ENEMY":
-                payload.update({
-                    "area_row": rng.randrange(3),
-                    "area_col": rng.randrange(4),
-                    "guess": rng.choice(("奇", "偶")),
-                })
-            before_used = current["_hasUsedSkill"]
-            state = api("/api/battle/skill", payload)
-            actions += 1
-            validate_state(state)
-            after = next((g for g in state[current_key]["generals"] if g["id"] == current["id"]), None)
-            if after and not before_used and after["_hasUsedSkill"]:
-                used_skills.add(current["skill"])
-            if state["phase"] != "battle":
-                break
-        if state["phase"] != "battle":
-            break
-
-        # The frontend can then select every general that has not attacked this turn.
-        for general in list(state[current_key]["generals"]):
-            current = next((g for g in state[current_key]["generals"] if g["id"] == general["id"]), None)
-            if not current or not current["alive"] or current["_hasAttacked"]:
-                continue
-            targets = attackable_front(state[enemy_key]["generals"])
-            if not targets:
-                break
-            target = rng.choice(targets)
-            payload = {"attacker_id": current["id"], "target_id": target["id"]}
-            if current["_hasSpeedJudgment"] or current["_hasSpeedRequired"]:
-                payload["guess"] = rng.choice(("奇", "偶"))
-            state = api("/api/battle/attack", payload)
-            actions += 1
-            validate_state(state)
-            if state["phase"] != "battle":
-                break
+        state, turn_actions = play_turn(state, rng, api, used_skills)
+        actions += turn_actions
         if state["phase"] != "battle":
             break
 
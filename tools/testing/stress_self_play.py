@@ -0,0 +1,326 @@
+"""Process-parallel self-play soak against the rules layer directly.
+
+``self_play_10000.py`` drives every sub-action through ``handle_api`` and the
+global Web ``STATE``, so most of its time goes to JSON snapshots. This harness
+plays the same frontend-shaped games (distinct 16-general draft pools, random
+affordable three-general teams, random formations, a dice roll, then each
+turn: every skill once, every attack once, skip) straight through
+``GameFlowController``, ``BattleSystem`` and ``BattleRulesService`` (and thus
+``turn_actions``), checking the ``validate_state`` invariants on the engine
+objects after every sub-action.
+
+Games are split into seed chunks across a spawn-safe process pool, so a soak
+scales with cores. ``--api-sample`` additionally plays a few games through the
+Web API in this process to keep the JSON contract covered. The summary reports
+games/sec overall and per worker, and the peak RSS of every worker process.
+"""
+
+from __future__ import annotations
+
+import argparse
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+import itertools
+import multiprocessing as mp
+import os
+import random
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(ROOT))
+
+from src.battle.battle_system import BattleSystem
+from src.battle.rules_service import BattleRulesService
+from src.game_data.generals_config import create_general_from_data
+from src.game_data.generals_data import GENERALS_DATA
+from src.game_data.skills_config import ALL_SKILLS
+from src.models.game_flow import GameFlowController
+from src.skills.skill_base import TargetType
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+POOL_SIZE = 16
+COST_LIMIT = 8.0
+
+
+def peak_rss_mib():
+    """Peak resident set size of this process, or ``None`` where unsupported."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes.
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def choose_team(pool, rng, team_size=3, cost_limit=COST_LIMIT):
+    """Same choice rule as the API harness: non-empty and within the cost cap."""
+    affordable = [
+        combo for combo in itertools.combinations(pool, team_size)
+        if sum(general.cost for general in combo) <= cost_limit
+    ]
+    if not affordable:
+        affordable = [(min(pool, key=lambda general: general.cost),)]
+    return list(rng.choice(affordable))
+
+
+def validate_engine(controller, battle_system):
+    """The ``validate_state`` invariants, read from engine objects."""
+    for player in (controller.player1, controller.player2):
+        team = player.team
+        if not 0 <= team.current_morale <= team.max_morale:
+            raise AssertionError(f"invalid morale: {team.team_name} {team.current_morale}/{team.max_morale}")
+        for general in team.generals:
+            if not 0 <= general.current_hp <= general.max_hp:
+                raise AssertionError(f"invalid hp: {general.name} {general.current_hp}/{general.max_hp}")
+            if general.is_alive != (general.current_hp > 0):
+                raise AssertionError(f"alive/hp mismatch: {general.name}")
+        seen = set()
+        for row, cells in enumerate(team.formation):
+            for col, general in enumerate(cells):
+                if general is None:
+                    continue
+                if general not in team.generals:
+                    raise AssertionError(f"foreign general in formation: {team.team_name} {(row, col)}")
+                if id(general) in seen:
+                    raise AssertionError(f"general occupies two cells: {team.team_name} {general.name}")
+                seen.add(id(general))
+    if battle_system.turn_count > battle_system.max_turns:
+        raise AssertionError(f"turn overflow: {battle_system.turn_count}")
+
+
+def setup_game(rng):
+    """Draft, formation and dice exactly as the Web API sequence does."""
+    controller = GameFlowController()
+    shuffled = list(GENERALS_DATA)
+    random.shuffle(shuffled)
+    pools = (shuffled[:POOL_SIZE], shuffled[POOL_SIZE:POOL_SIZE * 2])
+    rosters = []
+    for player, pool_data in zip((controller.player1, controller.player2), pools):
+        team = choose_team([create_general_from_data(data) for data in pool_data], rng)
+        for general in team:
+            player.add_general_to_team(general)
+        rosters.append([general.name for general in team])
+    for player in (controller.player1, controller.player2):
+        cells = rng.sample([(row, col) for row in range(3) for col in range(4)], len(player.selected_generals))
+        for general, (row, col) in zip(player.selected_generals, cells):
+            if not player.team.position_general(general, row, col):
+                raise AssertionError(f"formation rejected: {general.name} {(row, col)}")
+        player.team.complete_formation_setup()
+    d1 = d2 = 0
+    while d1 == d2:
+        d1, d2 = random.randint(1, 6), random.randint(1, 6)
+    first, second = (
+        (controller.player1, controller.player2) if d1 > d2
+        else (controller.player2, controller.player1)
+    )
+    controller.first_player, controller.second_player = first, second
+    second.team.max_morale += 2
+    second.team.current_morale += 2
+    battle_system = BattleSystem(
+        team1=controller.player1.team, team2=controller.player2.team,
+        callbacks=None, first_player_team_name=first.team.team_name,
+    )
+    battle_system.turn_count = 1
+    battle_system.current_side.update_effects()
+    return controller, battle_system, rosters
+
+
+def play_turn(rules, battle_system, rng, used_skills, check):
+    """One frontend-shaped turn; returns the number of sub-actions played."""
+    actions = 0
+    side = battle_system.current_side
+    for caster in list(side.generals):
+        if battle_system._is_game_over():
+            return actions
+        if not caster.can_use_active_skill() or not caster.can_use_skill():
+            continue
+        if side.current_morale < caster.active_skill.morale_cost:
+            continue
+        selection = {}
+        if caster.active_skill.target_type == TargetType.AREA_ENEMY:
+            selection = {
+                "row": rng.randrange(3), "col": rng.randrange(4),
+                "skill_row": rng.randrange(3), "guess": rng.choice(("奇", "偶")),
+            }
+        result = rules.skill(caster, **selection)
+        actions += 1
+        check()
+        if result.get("success"):
+            used_skills.add(caster.active_skill.name)
+    for attacker in list(side.generals):
+        if battle_system._is_game_over():
+            return actions
+        if not attacker.can_attack():
+            continue
+        targets = battle_system._get_attack_targets_for_attacker(attacker)
+        if not targets:
+            break
+        guess = None
+        if attacker.has_buff_type("attack_speed_judgment") or attacker.has_debuff_type("attack_speed_required"):
+            guess = rng.choice(("奇", "偶"))
+        rules.attack(attacker, rng.choice(targets), guess=guess)
+        actions += 1
+        check()
+    return actions
+
+
+def play_one(game_seed, max_turns=300):
+    rng = random.Random(game_seed)
+    random.seed(game_seed)
+    controller, battle_system, rosters = setup_game(rng)
+    rules = BattleRulesService(battle_system)
+    used_skills = set()
+
+    def check():
+        validate_engine(controller, battle_system)
+
+    check()
+    actions = 0
+    while True:
+        actions += play_turn(rules, battle_system, rng, used_skills, check)
+        outcome = rules.outcome()
+        if outcome.done or battle_system.turn_count >= max_turns:
+            break
+        rules.end_turn()
+        actions += 1
+        check()
+    return {
+        "completed": outcome.done,
+        "turns": battle_system.turn_count,
+        "winner": "平局" if outcome.timeout else (outcome.winner or ""),
+        "actions": actions,
+        "selected_names": {name for roster in rosters for name in roster},
+        "used_skills": used_skills,
+        "rosters": tuple(rosters),
+    }
+
+
+def play_chunk(seeds, max_turns):
+    """Worker entry point: play a seed chunk and return aggregated stats."""
+    stats = {
+        "pid": os.getpid(), "games": 0, "completed": 0, "actions": 0, "max_turn": 0,
+        "winners": Counter(), "selected": set(), "skills": set(),
+        "crashes": [], "stalls": [], "crash_count": 0, "stall_count": 0,
+    }
+    started = time.perf_counter()
+    for seed in seeds:
+        stats["games"] += 1
+        try:
+            result = play_one(seed, max_turns)
+        except Exception as error:
+            stats["crash_count"] += 1
+            if len(stats["crashes"]) < 10:
+                stats["crashes"].append((seed, repr(error)))
+            continue
+        stats["actions"] += result["actions"]
+        stats["max_turn"] = max(stats["max_turn"], result["turns"])
+        stats["selected"] |= result["selected_names"]
+        stats["skills"] |= result["used_skills"]
+        if result["completed"]:
+            stats["completed"] += 1
+            stats["winners"][result["winner"]] += 1
+        else:
+            stats["stall_count"] += 1
+            if len(stats["stalls"]) < 10:
+                stats["stalls"].append((seed, result["turns"], result["rosters"]))
+    stats["seconds"] = time.perf_counter() - started
+    stats["peak_rss_mib"] = peak_rss_mib()
+    return stats
+
+
+def run_api_sample(games, seed, max_turns):
+    """Play a few games through ``handle_api`` to keep the Web contract covered."""
+    from tools.testing.self_play_10000 import play_one as play_api
+
+    failures = []
+    for number in range(games):
+        game_seed = seed + number
+        try:
+            result = play_api(game_seed, max_turns)
+            if not result["completed"]:
+                failures.append((game_seed, f"stalled at turn {result['turns']}"))
+        except Exception as error:
+            failures.append((game_seed, repr(error)))
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-n", "--games", type=int, default=10_000)
+    parser.add_argument("--seed", type=int, default=20260716)
+    parser.add_argument("--max-turns", type=int, default=300)
+    parser.add_argument("-j", "--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--chunk", type=int, default=250, help="games per worker task")
+    parser.add_argument("--api-sample", type=int, default=20,
+                        help="games also played through the Web API in this process (0 disables)")
+    args = parser.parse_args()
+
+    seeds = [args.seed + number for number in range(1, args.games + 1)]
+    chunks = [seeds[index:index + args.chunk] for index in range(0, len(seeds), args.chunk)]
+    workers = max(1, min(args.workers, len(chunks)))
+    started = time.perf_counter()
+    results = []
+    with ProcessPoolExecutor(workers, mp_context=mp.get_context("spawn")) as pool:
+        for stats in pool.map(play_chunk, chunks, itertools.repeat(args.max_turns)):
+            results.append(stats)
+            done = sum(item["games"] for item in results)
+            print(f"{done}/{args.games} rate={done / (time.perf_counter() - started):.1f} games/s", flush=True)
+    elapsed = time.perf_counter() - started
+
+    completed = sum(item["completed"] for item in results)
+    crashes = [crash for item in results for crash in item["crashes"]][:10]
+    stalls = [stall for item in results for stall in item["stalls"]][:10]
+    crash_count = sum(item["crash_count"] for item in results)
+    stall_count = sum(item["stall_count"] for item in results)
+    winners = sum((item["winners"] for item in results), Counter())
+    selected = set().union(*(item["selected"] for item in results))
+    skills = set().union(*(item["skills"] for item in results))
+    per_worker = {}
+    for item in results:
+        entry = per_worker.setdefault(item["pid"], {"games": 0, "seconds": 0.0, "peak_rss_mib": None})
+        entry["games"] += item["games"]
+        entry["seconds"] += item["seconds"]
+        entry["peak_rss_mib"] = item["peak_rss_mib"]  # getrusage peak is monotonic per process
+
+    expected_generals = {data["name"] for data in GENERALS_DATA}
+    expected_skills = {ALL_SKILLS[data["skill_id"]].name for data in GENERALS_DATA}
+    missing_generals = sorted(expected_generals - selected)
+    missing_skills = sorted(expected_skills - skills)
+    failures = args.games - completed
+
+    print("\nDIRECT ENGINE SELF-PLAY SUMMARY")
+    print(f"games={args.games} completed={completed} failures={failures} "
+          f"stalls={stall_count} crashes={crash_count} "
+          f"max_turn={max((item['max_turn'] for item in results), default=0)}")
+    print(f"actions={sum(item['actions'] for item in results)} elapsed={elapsed:.2f}s "
+          f"rate={args.games / elapsed:.1f} games/s workers={workers}")
+    for pid, entry in sorted(per_worker.items()):
+        rss = "n/a" if entry["peak_rss_mib"] is None else f"{entry['peak_rss_mib']:.1f}MiB"
+        print(f"worker pid={pid} games={entry['games']} "
+              f"rate={entry['games'] / max(entry['seconds'], 1e-9):.1f} games/s peak_rss={rss}")
+    print(f"general_coverage={len(selected)}/{len(expected_generals)} missing={missing_generals}")
+    print(f"skill_coverage={len(skills)}/{len(expected_skills)} missing={missing_skills}")
+    print(f"winners={dict(winners)}")
+    if stalls:
+        print(f"stalls={stalls}")
+    if crashes:
+        print(f"crashes={crashes}")
+
+    api_failures = []
+    if args.api_sample > 0:
+        api_started = time.perf_counter()
+        api_failures = run_api_sample(args.api_sample, args.seed + args.games + 1, args.max_turns)
+        print(f"api_sample games={args.api_sample} failures={len(api_failures)} "
+              f"elapsed={time.perf_counter() - api_started:.2f}s")
+        if api_failures:
+            print(f"api_failures={api_failures[:10]}")
+    return 1 if failures or missing_generals or missing_skills or api_failures else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())